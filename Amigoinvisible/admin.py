@@ -1,18 +1,19 @@
 import streamlit as st
-import random
 import pandas as pd
 # Importa tus funciones utils y ADMIN_PASSWORD aquí
-from utils import cargar_datos, guardar_datos, ADMIN_PASSWORD
+from utils import cargar_datos, guardar_datos, obtener_servicio, ADMIN_PASSWORD
+from emparejamiento import sortear, restricciones_efectivas, SinSolucion
+from sorteos import numerar
 import json
 
 # --- La función generar_amigo_invisible() y otras funciones de utilidad se mantienen IGUAL. ---
 # Asegúrate de que las funciones cargar_datos, guardar_datos, generar_amigo_invisible y ADMIN_PASSWORD
 # están definidas o importadas correctamente desde utils.py o al inicio de admin.py.
 # ---
-def generar_amigo_invisible(nombres: list, restricciones: dict, max_intentos=10):
+def generar_amigo_invisible(nombres: list, restricciones: dict, ciclo_unico=False):
     """
-    Intenta generar el Amigo Invisible con restricciones.
-    Retorna (emparejamientos_numerados, emparejamientos_originales) o None.
+    Genera el Amigo Invisible con restricciones (ver emparejamiento.py).
+    Retorna (emparejamientos_numerados, emparejamientos_originales) o (None, None).
     """
     
     # 1. Validación inicial
@@ -23,54 +24,36 @@ def generar_amigo_invisible(nombres: list, restricciones: dict, max_intentos=10)
         st.warning("La lista de nombres contiene duplicados. Por favor, elimínelos.")
         return None, None
 
-    emparejamientos = None
-    
-    # 2. Algoritmo de reintentos
-    for _ in range(max_intentos):
-        regaladores = nombres.copy()
-        receptores = nombres.copy()
-        random.shuffle(regaladores) 
-        emparejamientos_intento = {}
-        
-        exito = True
-        for regalador in regaladores:
-            opciones = [r for r in receptores 
-                        if r != regalador 
-                        and r not in restricciones.get(regalador, [])]
-            
-            if not opciones:
-                exito = False
-                break
-                
-            elegido = random.choice(opciones)
-            emparejamientos_intento[regalador] = elegido
-            receptores.remove(elegido)
-
-        if exito and not receptores:
-            emparejamientos = emparejamientos_intento
-            break
-            
-    if emparejamientos is None:
-        st.error(f"⚠️ No se pudo generar una asignación válida después de {max_intentos} intentos. "
-                 f"Revisa tus restricciones.")
+    # 2. Emparejamiento: o encuentra una asignación válida o demuestra que no existe
+    try:
+        emparejamientos = sortear(nombres, restricciones, ciclo_unico=ciclo_unico)
+    except SinSolucion as e:
+        st.error(f"⚠️ No se puede hacer el sorteo con estas restricciones: {e}.")
+        if e.receptores is not None:
+            receptores = ", ".join(e.receptores) if e.receptores else "nadie"
+            st.markdown(f"**{', '.join(e.regaladores)}** solo pueden regalar a: **{receptores}**. "
+                        f"Quita alguna restricción de estas personas.")
+        elif e.regaladores:
+            st.markdown(f"Personas afectadas: **{', '.join(e.regaladores)}**.")
         return None, None
 
-    # 3. Asignación de Números Secretos
-    numeros_asignados = set()
-    emparejamientos_numerados = {}
-    
-    for nombre, amigo in emparejamientos.items():
-        while True:
-            numero = random.randint(00, 99) 
-            if numero not in numeros_asignados:
-                numeros_asignados.add(numero)
-                emparejamientos_numerados[str(numero)] = [nombre, amigo] 
-                break
+    # 3. Asignación de Números Secretos (todos de golpe, sin repetidos ni reintentos)
+    emparejamientos_numerados = numerar(emparejamientos)
 
     return emparejamientos_numerados, emparejamientos
+def leer_grupos(texto: str, nombres: list) -> dict:
+    """Convierte las líneas `Grupo: A, B, C` en {grupo: [miembros]} (solo nombres de la lista)."""
+    grupos = {}
+    for i, linea in enumerate(l for l in texto.splitlines() if l.strip()):
+        grupo, _, miembros = linea.rpartition(":")
+        miembros = [m.strip() for m in miembros.split(",") if m.strip() in nombres]
+        if len(miembros) > 1:
+            grupos[grupo.strip() or f"Grupo {i + 1}"] = miembros
+    return grupos
+
 # --- Interfaz de Administración ---
 
-def admin_interface():
+def admin_interface(sorteo):
     st.subheader("⚙️ Área de Administración (Sorteo y Configuración)")
     
     # 1. Autenticación (se mantiene igual)
@@ -82,7 +65,21 @@ def admin_interface():
         
     st.success("Contraseña correcta. ¡Bienvenido!")
     
-    datos_persistentes = cargar_datos()
+    datos_persistentes = cargar_datos(sorteo)
+
+    # Nuevo sorteo independiente (otro grupo, otra oficina...)
+    with st.expander("➕ Crear otro sorteo"):
+        nombre_sorteo = st.text_input("Nombre del sorteo", key="nombre_sorteo_nuevo")
+        if st.button("Crear sorteo") and nombre_sorteo.strip():
+            st.session_state.sorteo_nuevo = obtener_servicio().crear(nombre_sorteo.strip())
+            st.rerun()
+    st.caption(f"Editando el sorteo **{datos_persistentes.get('nombre', sorteo)}**.")
+
+    # El estado de edición es de un sorteo: al cambiar de sorteo se vuelve a cargar
+    if st.session_state.get('sorteo_admin') != sorteo:
+        for clave in ('nombres_input', 'restricciones', 'grupos_input', 'nombres_text_area', 'grupos_text_area'):
+            st.session_state.pop(clave, None)
+        st.session_state.sorteo_admin = sorteo
     
     # --- Inicialización del Estado de Sesión ---
     
@@ -90,12 +87,13 @@ def admin_interface():
     if 'nombres_input' not in st.session_state:
         st.session_state.nombres_input = ", ".join(datos_persistentes.get("nombres", [])) if datos_persistentes.get("nombres") else ""
         
-    # Inicializar el estado para las restricciones con Checkboxes (NUEVO ESTADO)
-    # Este estado guardará las restricciones del último sorteo para precargar los checkboxes.
-    if 'restricciones_checkboxes' not in st.session_state:
-        # Aquí usaremos un diccionario anidado para rastrear el estado de las restricciones
-        # {Regalador: {Receptor: True/False, ...}}
-        st.session_state.restricciones_checkboxes = {}
+    # Restricciones dispersas: solo las parejas prohibidas {Regalador: [Receptores]} y los grupos
+    if 'restricciones' not in st.session_state:
+        st.session_state.restricciones = {r: list(rs) for r, rs in datos_persistentes.get("restricciones", {}).items()}
+    if 'grupos_input' not in st.session_state:
+        st.session_state.grupos_input = "\n".join(
+            f"{grupo}: {', '.join(miembros)}" for grupo, miembros in datos_persistentes.get("grupos", {}).items()
+        )
 
 
     # 2. Configuración de Nombres (se mantiene igual)
@@ -116,67 +114,64 @@ def admin_interface():
         # Si no hay nombres, no mostramos la sección de restricciones ni el botón de generar
         return 
 
-    # 3. Configuración de Restricciones (¡MODIFICADO: Usamos Checkboxes!)
+    # 3. Configuración de Restricciones (dispersas: solo se guardan las parejas prohibidas)
     st.markdown("---")
     st.markdown("### 2. Restricciones de Emparejamiento 🛑")
-    st.markdown("Marca la casilla si el **Regalador** (fila) NO puede regalar al **Receptor** (columna).")
-    
-    # Crear un diccionario temporal para las restricciones que se enviarán al algoritmo
-    restricciones_algoritmo = {nombre: [] for nombre in nombres}
-    
-    # 3.1 Encabezado de la Matriz (Nombres de Receptores)
-    # Creamos las columnas para el diseño de matriz
-    cols = st.columns([1] + [1] * len(nombres))
-    
-    # Primera columna (vacía) + Nombres de Receptores
-    cols[0].write("**Regalador ↓**")
-    for i, receptor in enumerate(nombres):
-        cols[i+1].write(f"**{receptor}**")
 
-    st.markdown("---")
-
-    # 3.2 Cuerpo de la Matriz (Filas de Checkboxes)
-
-    # Recorrer cada nombre como el Regalador
-    for regalador in nombres:
-        # Crear la fila de columnas para el Regalador actual
-        row_cols = st.columns([1] + [1] * len(nombres))
-        row_cols[0].write(f"**{regalador}**") # Nombre del Regalador
+    # 3.1 Grupos: los miembros de un mismo grupo (familia, casa...) no se regalan entre sí
+    st.markdown("**Grupos** (una línea por grupo, `Familia: Juan, María`): nadie regala a alguien de su grupo.")
+    st.session_state.grupos_input = st.text_area(
+        "Grupos", st.session_state.grupos_input, key="grupos_text_area", label_visibility="collapsed"
+    )
+    grupos = leer_grupos(st.session_state.grupos_input, nombres)
+
+    # 3.2 Una persona cada vez: un solo multiselect, no uno por pareja
+    st.markdown("**Restricciones individuales**")
+    restricciones = st.session_state.restricciones
+    persona = st.selectbox("Regalador", nombres, key="persona_restricciones")
+    prohibidos = st.multiselect(
+        f"{persona} NO puede regalar a",
+        [n for n in nombres if n != persona],
+        default=[n for n in restricciones.get(persona, []) if n in nombres and n != persona],
+        key=f"restricciones_{persona}",
+    )
+    restricciones[persona] = prohibidos
+
+    # 3.3 Importación masiva: CSV con columnas regalador,receptor (una fila por pareja prohibida)
+    archivo_csv = st.file_uploader("Importar restricciones (CSV con columnas regalador, receptor)", type=["csv"])
+    if archivo_csv is not None and st.button("📥 Añadir restricciones del CSV"):
+        try:
+            parejas = pd.read_csv(archivo_csv, dtype=str).rename(columns=str.lower)[["regalador", "receptor"]].dropna()
+        except (KeyError, ValueError, pd.errors.ParserError, pd.errors.EmptyDataError):
+            st.error("El CSV debe tener las columnas 'regalador' y 'receptor'.")
+        else:
+            parejas = parejas.apply(lambda columna: columna.str.strip())
+            validas = parejas[parejas["regalador"].isin(nombres) & parejas["receptor"].isin(nombres)
+                              & (parejas["regalador"] != parejas["receptor"])]
+            for regalador, receptores in validas.groupby("regalador")["receptor"]:
+                restricciones[regalador] = sorted(set(restricciones.get(regalador, [])) | set(receptores))
+            # El multiselect de la persona elegida debe reflejar lo importado
+            st.session_state.pop(f"restricciones_{persona}", None)
+            st.success(f"{len(validas)} restricciones importadas ({len(parejas) - len(validas)} filas ignoradas).")
+            st.rerun()
+
+    # 3.4 Resumen: una fila por pareja prohibida
+    restricciones_algoritmo = restricciones_efectivas(
+        {r: [n for n in rs if n in nombres] for r, rs in restricciones.items() if r in nombres}, grupos
+    )
+    parejas = [(r, receptor) for r, receptores in restricciones_algoritmo.items() for receptor in sorted(receptores)]
+    with st.expander(f"Ver las {len(parejas)} parejas prohibidas"):
+        st.dataframe(pd.DataFrame(parejas, columns=["Regalador", "Receptor"]), use_container_width=True, hide_index=True)
 
-        # Recorrer cada nombre como el Receptor
-        for i, receptor in enumerate(nombres):
-            # 1. Creamos la clave única
-            checkbox_key = f"restrict_{regalador}_{receptor}"
-            
-            # 2. **¡Solución al KeyError!** Inicializar la clave SI NO EXISTE
-            # Esto asegura que si la lista de nombres cambia (y las claves también),
-            # siempre habrá un valor inicial (False) antes de acceder.
-            if checkbox_key not in st.session_state:
-                st.session_state[checkbox_key] = False
-
-            # No permitir que una persona se regale a sí misma (siempre restringido)
-            is_disabled = (regalador == receptor)
-            
-            # Creamos la etiqueta descriptiva, aunque se oculte
-            unique_label = f"Restricción: {regalador} no regala a {receptor}"
-            
-            # 3. Crear el checkbox, usando el valor de sesión ya inicializado
-            is_restricted = row_cols[i+1].checkbox(
-                label=unique_label, 
-                value=st.session_state[checkbox_key], # <-- ¡Ahora el valor existe siempre!
-                key=checkbox_key, 
-                disabled=is_disabled,
-                label_visibility="collapsed" 
-            )
-            
-            # 4. Procesar el estado del Checkbox
-            if is_restricted:
-                # La inicialización del diccionario ya se hizo antes del bucle
-                restricciones_algoritmo[regalador].append(receptor)
+    if st.button("💾 Guardar participantes y restricciones"):
+        guardar_datos(nombres, datos_persistentes.get("emparejamientos", {}), restricciones, grupos, sorteo)
+        st.success("Participantes y restricciones guardados.")
 
 
     # 4. Generación y Guardado
     st.markdown("---")
+    ciclo_unico = st.checkbox("Un único ciclo (cada uno regala al siguiente y nadie se intercambia regalos)",
+                              key="ciclo_unico")
     if st.button("✨ Generar y Guardar Amigo Invisible", use_container_width=True):
         
         if not nombres:
@@ -186,13 +181,13 @@ def admin_interface():
         # La generación ocurre aquí...
         # ... (código de generación se mantiene igual) ...
 
-        emparejamientos_numerados, emparejamientos_originales = generar_amigo_invisible(nombres, restricciones_algoritmo)
+        emparejamientos_numerados, emparejamientos_originales = generar_amigo_invisible(nombres, restricciones_algoritmo, ciclo_unico)
         
         if emparejamientos_numerados:
             st.success("¡Amigo Invisible Generado con éxito!")
             
             # GUARDAR DATOS PERSISTENTEMENTE
-            guardar_datos(nombres, emparejamientos_numerados)
+            guardar_datos(nombres, emparejamientos_numerados, restricciones, grupos, sorteo)
             
             # Actualizar el estado de la sesión para la consulta inmediata
             st.session_state.nombres = nombres
@@ -229,6 +224,6 @@ def admin_interface():
     st.markdown("### Estado Actual del Sorteo Guardado")
     if datos_persistentes.get("emparejamientos"):
         st.info(f"Hay **{len(datos_persistentes['nombres'])}** participantes cargados y **{len(datos_persistentes['emparejamientos'])}** emparejamientos generados.")
-        st.caption("Esta información proviene del último sorteo guardado en 'data.json'.")
+        st.caption("Esta información proviene del último sorteo guardado.")
     else:
         st.info("Aún no se ha generado ningún sorteo.")
\ No newline at end of file
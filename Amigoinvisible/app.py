@@ -1,7 +1,7 @@
 import streamlit as st
 from admin import admin_interface
 from user_interface import user_interface
-from utils import cargar_datos
+from utils import cargar_datos, obtener_servicio, SORTEO_POR_DEFECTO
 
 # --- Lógica principal ---
 if __name__ == "__main__":
@@ -15,8 +15,13 @@ if __name__ == "__main__":
     )
     st.title("Asignador de Amigo Invisible 🎄")
     
-    # 2. Cargar datos persistentes
-    datos = cargar_datos()
+    # 2. Elegir sorteo (cada grupo u oficina tiene el suyo) y cargar sus datos
+    sorteos = obtener_servicio().sorteos() or {SORTEO_POR_DEFECTO: "Amigo Invisible"}
+    if "sorteo_nuevo" in st.session_state:
+        # El admin acaba de crear uno: se selecciona antes de dibujar el selector
+        st.session_state.sorteo = st.session_state.pop("sorteo_nuevo")
+    sorteo = st.sidebar.selectbox("Sorteo", list(sorteos), format_func=sorteos.get, key="sorteo")
+    datos = cargar_datos(sorteo)
     
     # Inicializar el estado de la sesión con los datos persistentes
     st.session_state.nombres = datos["nombres"]
@@ -33,9 +38,9 @@ if __name__ == "__main__":
 
     # 4. Enrutamiento
     if page == "Administración (Sorteo)":
-        admin_interface() 
+        admin_interface(sorteo) 
     else:
-        user_interface() 
+        user_interface(sorteo) 
 
     # 5. Decoración (Mejor uso de emojis y estilos Streamlit)
     st.sidebar.markdown("""
@@ -0,0 +1,239 @@
+"""
+Banco de pruebas del sorteo (no es un test: se ejecuta a mano).
+
+    python benchmark.py                      # barrido completo
+    python benchmark.py --rapido             # menos tamaños y repeticiones
+    python benchmark.py --guardar            # guarda el resultado como referencia
+    python benchmark.py --comparar           # avisa si empeora respecto a la referencia
+
+Mide, para cada tamaño y densidad de restricciones, el tiempo por sorteo
+(p50/p99), los sorteos por segundo y la tasa de fallos. Un fallo solo es
+legítimo si viene con una prueba de Hall correcta; cualquier otro (o una
+asignación inválida) cuenta como fallo espurio. Además comprueba con una
+chi-cuadrado que las asignaciones salen uniformes.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+
+from emparejamiento import SinSolucion, sortear
+
+REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_referencia.json")
+
+# Empeoramientos que se consideran regresión al comparar con la referencia
+TOLERANCIA_TIEMPO = 1.5  # p50 un 50% más lento
+P_MINIMO = 0.001  # p-valor de la chi-cuadrado por debajo del cual no es uniforme
+
+
+# --- Estadística ---
+
+def _gamma_inferior_regularizada(a: float, x: float) -> float:
+    """P(a, x) por su serie de potencias (converge para todo x > 0)."""
+    if x <= 0:
+        return 0.0
+    termino = suma = 1.0 / a
+    n = 0
+    while abs(termino) > abs(suma) * 1e-15 and n < 10000:
+        n += 1
+        termino *= x / (a + n)
+        suma += termino
+    return min(1.0, suma * math.exp(-x + a * math.log(x) - math.lgamma(a)))
+
+
+def p_valor_chi2(estadistico: float, grados: int) -> float:
+    """Probabilidad de una chi-cuadrado de `grados` grados de libertad mayor que `estadistico`."""
+    return max(0.0, 1.0 - _gamma_inferior_regularizada(grados / 2, estadistico / 2))
+
+
+def chi2(observados: list, esperado: float) -> tuple:
+    estadistico = sum((o - esperado) ** 2 / esperado for o in observados)
+    grados = len(observados) - 1
+    return estadistico, grados, p_valor_chi2(estadistico, grados)
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+# --- Casos ---
+
+def restricciones_aleatorias(nombres: list, densidad: float, rng: random.Random) -> dict:
+    """Cada persona tiene prohibida una fracción `densidad` de las demás."""
+    k = int(densidad * (len(nombres) - 1))
+    return {nombre: rng.sample([otro for otro in nombres if otro != nombre], k) for nombre in nombres} if k else {}
+
+
+def restricciones_en_anillo(nombres: list, k: int) -> dict:
+    """Cada persona solo puede regalar a las k siguientes del corro: quedan muy pocas asignaciones válidas."""
+    return {nombre: [otro for d, otro in enumerate(nombres[i + 1:] + nombres[:i], 1) if d > k]
+            for i, nombre in enumerate(nombres)}
+
+
+def valida(asignacion: dict, nombres: list, restricciones: dict) -> bool:
+    return (sorted(asignacion) == sorted(nombres) and sorted(asignacion.values()) == sorted(nombres)
+            and all(a != b and b not in restricciones.get(a, ()) for a, b in asignacion.items()))
+
+
+def prueba_de_hall_correcta(error: SinSolucion, nombres: list, restricciones: dict) -> bool:
+    """Comprueba la prueba: entre todos los regaladores solo pueden regalar a menos personas que ellos."""
+    if error.receptores is None:
+        return False
+    alcanzables = {b for a in error.regaladores for b in nombres if b != a and b not in restricciones.get(a, ())}
+    return alcanzables <= set(error.receptores) and len(error.receptores) < len(error.regaladores)
+
+
+def medir(n: int, densidad: float, repeticiones: int, ciclo_unico: bool, rng: random.Random) -> dict:
+    nombres = [f"p{i}" for i in range(n)]
+    tiempos, fallos, espurios = [], 0, 0
+    for _ in range(repeticiones):
+        restricciones = restricciones_aleatorias(nombres, densidad, rng)
+        inicio = time.perf_counter()
+        try:
+            asignacion = sortear(nombres, restricciones, ciclo_unico=ciclo_unico, rng=rng)
+        except SinSolucion as e:
+            tiempos.append(time.perf_counter() - inicio)
+            fallos += 1
+            # En modo ciclo único no hay prueba: se cuenta aparte como fallo, no como espurio
+            if not ciclo_unico and not prueba_de_hall_correcta(e, nombres, restricciones):
+                espurios += 1
+            continue
+        tiempos.append(time.perf_counter() - inicio)
+        if not valida(asignacion, nombres, restricciones):
+            espurios += 1
+    return {
+        "n": n,
+        "densidad": densidad,
+        "ciclo_unico": ciclo_unico,
+        "repeticiones": repeticiones,
+        "p50_ms": round(percentil(tiempos, 50) * 1000, 3),
+        "p99_ms": round(percentil(tiempos, 99) * 1000, 3),
+        "sorteos_por_segundo": round(len(tiempos) / sum(tiempos), 1),
+        "tasa_fallos": fallos / repeticiones,
+        "fallos_espurios": espurios,
+    }
+
+
+def uniformidad(nombres: list, restricciones: dict, sorteos: int, ciclo_unico: bool, rng: random.Random) -> dict:
+    """Chi-cuadrado de las frecuencias frente a todas las asignaciones válidas (enumeradas)."""
+    validas = []
+    for permutacion in itertools.permutations(nombres):
+        asignacion = dict(zip(nombres, permutacion))
+        if valida(asignacion, nombres, restricciones):
+            if ciclo_unico:
+                actual, pasos = asignacion[nombres[0]], 1
+                while actual != nombres[0]:
+                    actual, pasos = asignacion[actual], pasos + 1
+                if pasos != len(nombres):
+                    continue
+            validas.append(tuple(permutacion))
+    conjunto = set(validas)
+    cuenta = Counter()
+    for _ in range(sorteos):
+        asignacion = sortear(nombres, restricciones, ciclo_unico=ciclo_unico, rng=rng)
+        cuenta[tuple(asignacion[nombre] for nombre in nombres)] += 1
+    estadistico, grados, p = chi2([cuenta[v] for v in validas], sorteos / len(validas))
+    return {
+        "n": len(nombres),
+        "restricciones": sum(len(prohibidos) for prohibidos in restricciones.values()),
+        "ciclo_unico": ciclo_unico,
+        "asignaciones_validas": len(validas),
+        "sorteos": sorteos,
+        "fuera_de_las_validas": sum(c for v, c in cuenta.items() if v not in conjunto),
+        "chi2": round(estadistico, 2),
+        "grados_libertad": grados,
+        "p_valor": round(p, 4),
+    }
+
+
+# --- Referencia ---
+
+def comparar(actual: dict, referencia: dict) -> list:
+    avisos = []
+    previas = {(m["n"], m["densidad"], m["ciclo_unico"]): m for m in referencia.get("rendimiento", [])}
+    for m in actual["rendimiento"]:
+        previa = previas.get((m["n"], m["densidad"], m["ciclo_unico"]))
+        if previa and m["p50_ms"] > previa["p50_ms"] * TOLERANCIA_TIEMPO:
+            avisos.append(f"n={m['n']} densidad={m['densidad']} ciclo={m['ciclo_unico']}: "
+                          f"p50 {previa['p50_ms']} -> {m['p50_ms']} ms")
+        if m["fallos_espurios"]:
+            avisos.append(f"n={m['n']} densidad={m['densidad']}: {m['fallos_espurios']} fallos espurios")
+    for u in actual["uniformidad"]:
+        if u["p_valor"] < P_MINIMO or u["fuera_de_las_validas"]:
+            avisos.append(f"uniformidad n={u['n']} ciclo={u['ciclo_unico']} "
+                          f"restricciones={u.get('restricciones', 0)}: p={u['p_valor']}")
+    return avisos
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Banco de pruebas del sorteo de Amigo Invisible")
+    parser.add_argument("--rapido", action="store_true")
+    parser.add_argument("--semilla", type=int, default=12345)
+    parser.add_argument("--guardar", nargs="?", const=REFERENCIA, help="Guarda el resultado como referencia")
+    parser.add_argument("--comparar", nargs="?", const=REFERENCIA, help="Compara con una referencia guardada")
+    args = parser.parse_args(argumentos)
+    rng = random.Random(args.semilla)
+
+    tamaños = [10, 100, 500] if args.rapido else [10, 50, 100, 500, 1000, 2000]
+    densidades = [0.0, 0.3, 0.9] if args.rapido else [0.0, 0.1, 0.3, 0.6, 0.9, 0.99]
+    repeticiones = 20 if args.rapido else 100
+    sorteos_uniformidad = 5000 if args.rapido else 30000
+
+    resultado = {
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "rendimiento": [],
+        "uniformidad": [],
+    }
+    print(f"{'n':>6} {'dens':>5} {'ciclo':>5} {'p50 ms':>9} {'p99 ms':>9} {'sorteos/s':>10} {'fallos':>7} {'espurios':>8}")
+    for n in tamaños:
+        for densidad in densidades:
+            for ciclo_unico in (False, True):
+                m = medir(n, densidad, max(5, repeticiones * 100 // max(n, 100)), ciclo_unico, rng)
+                resultado["rendimiento"].append(m)
+                print(f"{n:>6} {densidad:>5} {str(ciclo_unico):>5} {m['p50_ms']:>9} {m['p99_ms']:>9} "
+                      f"{m['sorteos_por_segundo']:>10} {m['tasa_fallos']:>7.0%} {m['fallos_espurios']:>8}")
+
+    # Los de n = 3 y 4 y los del corro (donde intercambiar dos receptores casi nunca da otra
+    # asignación válida) son los que delatan una mezcla sesgada
+    casos = [
+        (list("ABC"), {}, False),
+        (list("ABCD"), {}, False),
+        (list("ABCDEF"), {}, False),
+        (list("ABCDEF"), {}, True),
+        (list("ABCDEF"), {"A": ["B", "C"], "B": ["A"], "D": ["E", "F"]}, False),
+        (list("ABCDEFG"), restricciones_en_anillo(list("ABCDEFG"), 3), False),
+        (list("ABCDEFG"), restricciones_en_anillo(list("ABCDEFG"), 2), False),
+    ]
+    rng = random.Random(args.semilla)  # Los mismos sorteos con y sin --rapido, sin depender de lo anterior
+    for nombres, restricciones, ciclo_unico in casos:
+        u = uniformidad(nombres, restricciones, sorteos_uniformidad, ciclo_unico, rng)
+        resultado["uniformidad"].append(u)
+        print(f"Uniformidad n={u['n']} ciclo={ciclo_unico} restricciones={u['restricciones']}: "
+              f"{u['asignaciones_validas']} válidas, chi2={u['chi2']} ({u['grados_libertad']} gl), p={u['p_valor']}")
+
+    codigo = 0
+    if args.comparar:
+        with open(args.comparar, "r") as f:
+            avisos = comparar(resultado, json.load(f))
+        for aviso in avisos:
+            print(f"⚠️ Regresión: {aviso}", file=sys.stderr)
+        print("Sin regresiones respecto a la referencia" if not avisos else f"{len(avisos)} regresiones")
+        codigo = 1 if avisos else 0
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump(resultado, f, indent=2)
+        print(f"Referencia guardada en {args.guardar}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
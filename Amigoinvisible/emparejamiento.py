@@ -0,0 +1,285 @@
+"""
+Sorteo del Amigo Invisible como emparejamiento perfecto en el grafo de
+parejas permitidas (regalador -> receptor, nunca uno mismo ni una pareja
+restringida).
+
+1. Emparejamiento inicial: reparto voraz en orden aleatorio y, para los que se
+   quedan sin receptor, caminos de aumento. Los caminos se buscan sobre el
+   complementario de las restricciones, así que el coste depende del número
+   de restricciones y no de n².
+2. Si no hay emparejamiento perfecto, el último camino fallido da un conjunto
+   que incumple la condición de Hall: k personas que entre todas solo pueden
+   regalar a k - 1. Es la prueba de que no hay solución.
+3. Sorteo uniforme entre todas las asignaciones válidas: exacto por rechazo
+   o enumerándolas si son pocas; si no, con una cadena de Markov de
+   intercambios y rotaciones (ver `_mezclar`).
+4. Ciclo único (opcional): se unen los ciclos intercambiando receptores entre
+   ciclos distintos y se mezcla moviendo personas dentro del ciclo.
+"""
+import random
+
+INTENTOS_RECHAZO = 100  # Permutaciones al azar que se prueban antes de enumerar
+MAX_ENUMERAR = 12  # Personas hasta las que se intenta enumerar las asignaciones válidas...
+TRABAJO_ENUMERAR = 100_000  # ...si caben en estas comprobaciones; si no, cadena de Markov
+
+
+class SinSolucion(Exception):
+    """
+    No hay asignación válida. Si `receptores` no es None, es la prueba: los
+    `regaladores` solo pueden regalar a `receptores`, que son menos.
+    """
+
+    def __init__(self, mensaje: str, regaladores=(), receptores=None):
+        super().__init__(mensaje)
+        self.regaladores = sorted(regaladores)
+        self.receptores = sorted(receptores) if receptores is not None else None
+
+
+def restricciones_efectivas(restricciones: dict, grupos: dict) -> dict:
+    """Une las restricciones individuales con las de grupo: {regalador: set(receptores)}."""
+    efectivas = {regalador: set(receptores) for regalador, receptores in restricciones.items() if receptores}
+    for miembros in grupos.values():
+        for miembro in miembros:
+            efectivas.setdefault(miembro, set()).update(m for m in miembros if m != miembro)
+    return efectivas
+
+
+def sortear(nombres: list, restricciones: dict, ciclo_unico=False, pasos_mezcla=None, rng=None) -> dict:
+    """
+    Devuelve {regalador: receptor}. `restricciones` es {regalador: receptores prohibidos}.
+    Lanza SinSolucion si no existe ninguna asignación válida.
+    """
+    if len(nombres) < 2:
+        raise ValueError("Se necesitan al menos dos nombres")
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("La lista de nombres contiene duplicados")
+    rng = rng or random.Random()
+    n = len(nombres)
+    posicion = {nombre: i for i, nombre in enumerate(nombres)}
+    # prohibidos[i]: receptores que i no puede tener (él mismo incluido)
+    prohibidos = [{i} for i in range(n)]
+    for regalador, receptores in restricciones.items():
+        if regalador in posicion:
+            prohibidos[posicion[regalador]].update(posicion[r] for r in receptores if r in posicion)
+
+    receptor = _emparejar(n, prohibidos, rng, nombres)
+    pasos = (20 * n + 100) if pasos_mezcla is None else pasos_mezcla
+    if ciclo_unico:
+        orden = _unir_ciclos(receptor, prohibidos, rng, nombres)
+        _mezclar_ciclo(orden, prohibidos, pasos, rng)
+        return {nombres[orden[k]]: nombres[orden[(k + 1) % n]] for k in range(n)}
+    _mezclar(receptor, prohibidos, pasos, rng)
+    return {nombres[i]: nombres[receptor[i]] for i in range(n)}
+
+
+def _emparejar(n: int, prohibidos: list, rng: random.Random, nombres: list) -> list:
+    receptor = [-1] * n  # regalador -> receptor
+    regalador = [-1] * n  # receptor -> regalador
+
+    # Voraz: cada uno prueba unos pocos receptores libres al azar
+    libres = list(range(n))
+    orden = list(range(n))
+    rng.shuffle(orden)
+    for i in orden:
+        for _ in range(min(8, len(libres))):
+            k = rng.randrange(len(libres))
+            j = libres[k]
+            if j not in prohibidos[i]:
+                libres[k] = libres[-1]
+                libres.pop()
+                receptor[i], regalador[j] = j, i
+                break
+
+    # Caminos de aumento para los que se han quedado sin receptor
+    for i in orden:
+        if receptor[i] == -1:
+            _aumentar(i, receptor, regalador, prohibidos, nombres)
+    return receptor
+
+
+def _aumentar(origen: int, receptor: list, regalador: list, prohibidos: list, nombres: list):
+    """
+    Búsqueda en anchura por caminos alternos desde `origen`. Cada receptor se
+    visita una vez y de cada regalador solo se miran los receptores aún sin
+    visitar, saltando sus prohibidos: O(n + restricciones) por camino.
+    """
+    sin_visitar = set(range(len(receptor)))
+    padre = {}  # receptor -> regalador desde el que se llegó
+    cola = [origen]
+    visitados = [origen]
+    while cola:
+        siguiente = []
+        for i in cola:
+            alcanzados = [j for j in sin_visitar if j not in prohibidos[i]]
+            for j in alcanzados:
+                sin_visitar.discard(j)
+                padre[j] = i
+                if regalador[j] == -1:
+                    # Camino encontrado: se invierte hasta el origen
+                    while j != -1:
+                        i = padre[j]
+                        anterior = receptor[i]
+                        receptor[i], regalador[j] = j, i
+                        j = anterior
+                    return
+                siguiente.append(regalador[j])
+                visitados.append(regalador[j])
+        cola = siguiente
+    # Sin camino: los visitados solo llegan a los receptores visitados, que son uno menos
+    raise SinSolucion(
+        f"{len(visitados)} personas solo pueden regalar a {len(padre)}",
+        regaladores=[nombres[i] for i in visitados],
+        receptores=[nombres[j] for j in padre],
+    )
+
+
+def _mezclar(receptor: list, prohibidos: list, pasos: int, rng: random.Random):
+    """
+    Sustituye `receptor` (una asignación válida) por otra elegida al azar de
+    forma uniforme entre todas las válidas, con el primer método que sirva:
+
+    1. Rechazo: una permutación uniforme que se descarta en cuanto alguien
+       recibe a un prohibido (Fisher-Yates, así que los intentos fallidos
+       cuestan unos pocos pasos). La que se acepta es uniforme entre las
+       válidas por construcción. Sin restricciones se acepta una de cada e.
+    2. Si las restricciones dejan pocas válidas (el rechazo casi nunca
+       acierta), se enumeran todas por vuelta atrás y se elige una: también
+       exacto. Solo se intenta con pocas personas y trabajo acotado.
+    3. Si no, `pasos` pasos de una cadena de Markov desde la asignación
+       actual: cada paso propone intercambiar los receptores de dos
+       regaladores o rotar los de tres (a recibe el de b, b el de c y c el
+       de a) y se queda si es válida. Cada propuesta es tan probable como la
+       que la deshace (el intercambio es su propio inverso; la rotación
+       (a, b, c) se deshace con (a, c, b)), así que la uniforme es
+       estacionaria, y las propuestas rechazadas la hacen aperiódica. Es
+       irreducible sin restricciones (intercambios y rotaciones generan
+       todas las permutaciones) y con restricciones moderadas, pero no con
+       cualquier restricción: dos asignaciones válidas pueden diferir solo en
+       un ciclo largo sin ninguna válida en medio. Por eso es el último
+       recurso, cuando hay demasiadas personas para los métodos exactos.
+    """
+    n = len(receptor)
+    permutacion = list(range(n))
+    for _ in range(INTENTOS_RECHAZO):
+        for i in range(n):
+            k = rng.randrange(i, n)
+            permutacion[i], permutacion[k] = permutacion[k], permutacion[i]
+            if permutacion[i] in prohibidos[i]:
+                break
+        else:
+            receptor[:] = permutacion
+            return
+    if n <= MAX_ENUMERAR:
+        validas, trabajo = [], [TRABAJO_ENUMERAR]
+        if _enumerar(0, [], set(), prohibidos, validas, trabajo):
+            receptor[:] = rng.choice(validas)
+            return
+    for _ in range(pasos):
+        a, b, c = rng.randrange(n), rng.randrange(n), rng.randrange(n)
+        ra, rb, rc = receptor[a], receptor[b], receptor[c]
+        if a == b:
+            continue
+        if rng.random() < 0.5:
+            if rb not in prohibidos[a] and ra not in prohibidos[b]:
+                receptor[a], receptor[b] = rb, ra
+        elif c != a and c != b and rb not in prohibidos[a] and rc not in prohibidos[b] and ra not in prohibidos[c]:
+            receptor[a], receptor[b], receptor[c] = rb, rc, ra
+
+
+def _enumerar(i: int, parcial: list, usados: set, prohibidos: list, validas: list, trabajo: list) -> bool:
+    """
+    Todas las asignaciones válidas por vuelta atrás desde el regalador `i`.
+    Devuelve False si se acaba el `trabajo` (comprobaciones) antes de terminar.
+    """
+    if i == len(prohibidos):
+        validas.append(list(parcial))
+        return True
+    trabajo[0] -= len(prohibidos)
+    if trabajo[0] < 0:
+        return False
+    for j in range(len(prohibidos)):
+        if j not in usados and j not in prohibidos[i]:
+            parcial.append(j)
+            usados.add(j)
+            completo = _enumerar(i + 1, parcial, usados, prohibidos, validas, trabajo)
+            usados.discard(j)
+            parcial.pop()
+            if not completo:
+                return False
+    return True
+
+
+def _ciclos(receptor: list) -> list:
+    visto = [False] * len(receptor)
+    ciclos = []
+    for inicio in range(len(receptor)):
+        if not visto[inicio]:
+            ciclo, i = [], inicio
+            while not visto[i]:
+                visto[i] = True
+                ciclo.append(i)
+                i = receptor[i]
+            ciclos.append(ciclo)
+    return ciclos
+
+
+def _unir_ciclos(receptor: list, prohibidos: list, rng: random.Random, nombres: list) -> list:
+    """
+    Une los ciclos de la asignación hasta dejar uno: si a está en un ciclo y b
+    en otro, cambiar a -> receptor[b] y b -> receptor[a] los funde en uno.
+    Devuelve el orden del ciclo (cada uno regala al siguiente).
+    """
+    n = len(receptor)
+    ciclo_de = [0] * n
+    ciclos = _ciclos(receptor)
+    for c, ciclo in enumerate(ciclos):
+        for i in ciclo:
+            ciclo_de[i] = c
+    vivos = len(ciclos)
+    while vivos > 1:
+        # Se empieza por el ciclo más pequeño: es el que menos opciones tiene
+        pequeño = min((c for c in set(ciclo_de)), key=lambda c: len(ciclos[c]))
+        otros = [i for i in range(n) if ciclo_de[i] != pequeño]
+        rng.shuffle(otros)
+        union = next(
+            ((a, b) for a in ciclos[pequeño] for b in otros
+             if receptor[b] not in prohibidos[a] and receptor[a] not in prohibidos[b]),
+            None,
+        )
+        if union is None:
+            raise SinSolucion(
+                "No se ha encontrado un ciclo único: estas personas no se pueden enlazar con el resto",
+                regaladores=[nombres[i] for i in ciclos[pequeño]],
+            )
+        a, b = union
+        receptor[a], receptor[b] = receptor[b], receptor[a]
+        destino = ciclo_de[b]
+        ciclos[destino] = ciclos[destino] + ciclos[pequeño]
+        for i in ciclos[pequeño]:
+            ciclo_de[i] = destino
+        vivos -= 1
+
+    orden, i = [0], receptor[0]
+    while i != 0:
+        orden.append(i)
+        i = receptor[i]
+    return orden
+
+
+def _mezclar_ciclo(orden: list, prohibidos: list, pasos: int, rng: random.Random):
+    """Intercambia dos personas de sitio en el ciclo si las aristas nuevas están permitidas."""
+    n = len(orden)
+    if n < 4:
+        return  # Con tres o menos solo hay un ciclo posible por sentido
+
+    def permitida(i, j):
+        return orden[j % n] not in prohibidos[orden[i % n]]
+
+    for _ in range(pasos):
+        p, q = rng.randrange(n), rng.randrange(n)
+        if p == q:
+            continue
+        orden[p], orden[q] = orden[q], orden[p]
+        # Aristas que tocan p y q (si son vecinos, alguna se repite: da igual comprobarla dos veces)
+        if not (permitida(p - 1, p) and permitida(p, p + 1) and permitida(q - 1, q) and permitida(q, q + 1)):
+            orden[p], orden[q] = orden[q], orden[p]
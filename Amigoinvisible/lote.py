@@ -0,0 +1,157 @@
+"""
+Sorteos por lotes sin interfaz, para organizaciones grandes.
+
+    python lote.py participantes.csv --por departamento --restricciones restricciones.csv --salida resultados
+
+- participantes.csv: columna `nombre` y, opcionalmente, `grupo` (los del mismo
+  grupo no se regalan entre sí) y la columna indicada en `--por`, que separa
+  los sorteos independientes (un departamento, una oficina...).
+- restricciones.csv: columnas `regalador` y `receptor`, una fila por pareja prohibida.
+
+Cada sorteo se resuelve en un proceso aparte y escribe su propio archivo en
+`--salida` fila a fila (una por regalador con su código secreto), así que el
+proceso principal nunca tiene todos los resultados en memoria. Con
+`--base-datos` los sorteos también se guardan para consultarlos en la app.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from almacen import RUTA_POR_DEFECTO, abrir
+from emparejamiento import SinSolucion, restricciones_efectivas, sortear
+from sorteos import ServicioSorteos, numerar
+
+
+def leer_participantes(ruta: str, por=None) -> dict:
+    """
+    {sorteo: {"nombres": [...], "grupos": {grupo: [...]}}} leyendo el CSV fila a fila.
+    ValueError si a la cabecera le falta `nombre` o la columna de `por`.
+    """
+    sorteos = defaultdict(lambda: {"nombres": [], "grupos": defaultdict(list)})
+    with open(ruta, newline="", encoding="utf-8") as f:
+        lector = csv.DictReader(f)
+        faltan = [columna for columna in ("nombre", por) if columna and columna not in (lector.fieldnames or [])]
+        if faltan:
+            raise ValueError(f"a {ruta} le falta la columna {', '.join(faltan)} "
+                             f"(columnas: {', '.join(lector.fieldnames or []) or 'ninguna'})")
+        for fila in lector:
+            nombre = fila["nombre"].strip()
+            if not nombre:
+                continue
+            sorteo = sorteos[fila[por].strip() if por else "sorteo"]
+            sorteo["nombres"].append(nombre)
+            if fila.get("grupo", "").strip():
+                sorteo["grupos"][fila["grupo"].strip()].append(nombre)
+    return sorteos
+
+
+def leer_restricciones(ruta: str) -> dict:
+    restricciones = defaultdict(set)
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            restricciones[fila["regalador"].strip()].add(fila["receptor"].strip())
+    return restricciones
+
+
+def _nombre_archivo(sorteo: str) -> str:
+    return re.sub(r"[^\w-]+", "-", sorteo).strip("-") or "sorteo"
+
+
+def resolver_sorteo(sorteo: str, nombres: list, restricciones: dict, grupos: dict, salida: str,
+                    formato="csv", con_receptor=False, ciclo_unico=False, base_datos=None) -> dict:
+    """Resuelve un sorteo y escribe su archivo. Se ejecuta en un proceso del pool."""
+    inicio = time.perf_counter()
+    try:
+        emparejamientos = sortear(nombres, restricciones_efectivas(restricciones, grupos), ciclo_unico=ciclo_unico)
+    except (SinSolucion, ValueError) as e:
+        detalle = f" ({', '.join(e.regaladores)})" if isinstance(e, SinSolucion) and e.regaladores else ""
+        return {"sorteo": sorteo, "participantes": len(nombres), "error": f"{e}{detalle}"}
+    resuelto = time.perf_counter()
+
+    numerados = numerar(emparejamientos)
+    ruta = os.path.join(salida, f"{_nombre_archivo(sorteo)}.{formato}")
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        if formato == "csv":
+            escritor = csv.writer(f)
+            escritor.writerow(["sorteo", "regalador", "codigo"] + (["receptor"] if con_receptor else []))
+            for codigo, (regalador, receptor) in numerados.items():
+                escritor.writerow([sorteo, regalador, codigo] + ([receptor] if con_receptor else []))
+        else:  # JSON Lines: un objeto por regalador
+            for codigo, (regalador, receptor) in numerados.items():
+                fila = {"sorteo": sorteo, "regalador": regalador, "codigo": codigo}
+                if con_receptor:
+                    fila["receptor"] = receptor
+                f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+    if base_datos:
+        # Los procesos del pool escriben a la vez: cada guardado espera su turno en SQLite
+        ServicioSorteos(abrir(base_datos)).guardar(
+            _nombre_archivo(sorteo).lower(), nombre=sorteo, nombres=nombres, emparejamientos=numerados,
+            restricciones={r: sorted(rs) for r, rs in restricciones.items()}, grupos=grupos,
+        )
+    return {
+        "sorteo": sorteo,
+        "participantes": len(nombres),
+        "archivo": ruta,
+        "ms_sorteo": round((resuelto - inicio) * 1000, 1),
+        "ms_total": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Sorteos de Amigo Invisible por lotes")
+    parser.add_argument("participantes", help="CSV con la columna nombre (y opcionalmente grupo)")
+    parser.add_argument("--restricciones", help="CSV con las columnas regalador y receptor")
+    parser.add_argument("--por", help="Columna que separa los sorteos (p. ej. departamento)")
+    parser.add_argument("--salida", default="resultados", help="Directorio de salida")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--con-receptor", action="store_true", help="Incluye el receptor (copia privada del admin)")
+    parser.add_argument("--ciclo-unico", action="store_true")
+    parser.add_argument("--base-datos", nargs="?", const=RUTA_POR_DEFECTO,
+                        help="Guarda también cada sorteo en esta base de datos (sin ruta, la de las apps)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    args = parser.parse_args(argumentos)
+
+    inicio = time.perf_counter()
+    try:
+        sorteos = leer_participantes(args.participantes, args.por)
+    except ValueError as e:
+        parser.error(str(e))
+    restricciones = leer_restricciones(args.restricciones) if args.restricciones else {}
+    lectura = time.perf_counter()
+    os.makedirs(args.salida, exist_ok=True)
+    print(f"{sum(len(s['nombres']) for s in sorteos.values())} participantes en {len(sorteos)} sorteos "
+          f"(lectura: {(lectura - inicio) * 1000:.0f} ms)")
+
+    errores = 0
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        # A cada proceso solo le llegan las restricciones de los participantes de su sorteo
+        futuros = [
+            pool.submit(resolver_sorteo, sorteo, datos["nombres"],
+                        {r: restricciones[r] for r in datos["nombres"] if r in restricciones}, dict(datos["grupos"]),
+                        args.salida, args.formato, args.con_receptor, args.ciclo_unico, args.base_datos)
+            for sorteo, datos in sorteos.items()
+        ]
+        sorteos.clear()  # Ya están en los procesos del pool
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            if "error" in resultado:
+                errores += 1
+                print(f"✗ {resultado['sorteo']} ({resultado['participantes']}): {resultado['error']}", file=sys.stderr)
+            else:
+                print(f"✓ {resultado['sorteo']} ({resultado['participantes']}): "
+                      f"{resultado['ms_sorteo']} ms sorteo, {resultado['ms_total']} ms total -> {resultado['archivo']}")
+
+    total = time.perf_counter() - inicio
+    print(f"{len(futuros) - errores}/{len(futuros)} sorteos en {total:.2f} s")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
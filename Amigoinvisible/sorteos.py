@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import secrets
+
+from almacen import Documentos
+
+# Los códigos se eligen en un espacio al menos 100 veces mayor que el número de
+# participantes: adivinar uno al azar tiene menos de un 1% de acierto
+FACTOR_ESPACIO = 100
+MIN_DIGITOS = 4
+
+_azar = secrets.SystemRandom()
+
+
+def generar_codigos(cantidad: int) -> list:
+    """
+    `cantidad` códigos secretos distintos, todos con el mismo número de dígitos.
+    Se sacan de una vez con `sample` sobre un range (no se materializa ni hay reintentos).
+    """
+    digitos = max(MIN_DIGITOS, len(str(cantidad * FACTOR_ESPACIO - 1)))
+    return [f"{codigo:0{digitos}d}" for codigo in _azar.sample(range(10 ** digitos), cantidad)]
+
+
+def numerar(emparejamientos: dict) -> dict:
+    """{regalador: receptor} -> {código: [regalador, receptor]}"""
+    codigos = generar_codigos(len(emparejamientos))
+    return {codigo: [regalador, receptor] for codigo, (regalador, receptor) in zip(codigos, emparejamientos.items())}
+
+
+def _vacio(nombre: str) -> dict:
+    return {"nombre": nombre, "nombres": [], "emparejamientos": {}, "restricciones": {}, "grupos": {}}
+
+
+class ServicioSorteos:
+    """
+    Muchos sorteos independientes, un documento por sorteo en el almacén
+    compartido. Mientras nadie guarde, consultar un código no toca el disco
+    más que para comprobar el contador de cambios: el sorteo ya leído sale de
+    la caché del proceso. Guardar es una transacción, así que quien lee nunca
+    ve un sorteo a medias y dos guardados a la vez no se pisan.
+    """
+
+    def __init__(self, bd, archivo_antiguo=None):
+        self.bd = bd
+        self.documentos = Documentos(bd, "sorteos")
+        # Una sola vez, el antiguo data.json. Sin él (lote.py) no se marca la migración como
+        # hecha: la app lo importará al arrancar aunque la línea de comandos haya guardado antes.
+        if archivo_antiguo is not None:
+            bd.migrar("sorteos", [lambda con: self._migrar(archivo_antiguo)])
+
+    # --- Consultas ---
+
+    def sorteos(self) -> dict:
+        """{id: nombre} de todos los sorteos, por orden de id."""
+        return self.bd.cacheado("sorteos", "nombres", lambda: {
+            sorteo: self.obtener(sorteo)["nombre"] for sorteo in self.documentos.claves()
+        })
+
+    def obtener(self, sorteo: str) -> dict:
+        """Los datos del sorteo (compartidos con otras sesiones: no los modifiques)."""
+        datos = self.documentos.leer(sorteo)
+        return _vacio(sorteo) if datos is None else {**_vacio(sorteo), **datos}
+
+    def consultar(self, sorteo: str, codigo: str):
+        """[regalador, receptor] para un código, o None si no existe."""
+        return self.obtener(sorteo)["emparejamientos"].get(codigo.strip())
+
+    def digitos(self, sorteo: str) -> int:
+        """Longitud de los códigos del sorteo (para el campo de consulta)."""
+        emparejamientos = self.obtener(sorteo)["emparejamientos"]
+        return max((len(codigo) for codigo in emparejamientos), default=MIN_DIGITOS)
+
+    # --- Escrituras ---
+
+    def guardar(self, sorteo: str, **campos):
+        """Actualiza los campos dados (nombres, emparejamientos, restricciones, grupos, nombre)."""
+        with self.bd.transaccion():
+            self.documentos.guardar(sorteo, {**self.obtener(sorteo), **campos})
+
+    def crear(self, nombre: str) -> str:
+        """Crea un sorteo vacío y devuelve su id (derivado del nombre)."""
+        base = re.sub(r"[^\w-]+", "-", nombre.lower()).strip("-") or "sorteo"
+        with self.bd.transaccion():
+            existentes = set(self.documentos.claves())
+            sorteo, i = base, 1
+            while sorteo in existentes:
+                i += 1
+                sorteo = f"{base}-{i}"
+            self.guardar(sorteo, **_vacio(nombre))
+        return sorteo
+
+    def borrar(self, sorteo: str):
+        self.documentos.borrar(sorteo)
+
+    def _migrar(self, archivo_antiguo):
+        if os.path.exists(archivo_antiguo) and self.documentos.leer("principal") is None:
+            # El antiguo data.json (un único sorteo) pasa a ser el sorteo 'principal'
+            with open(archivo_antiguo, "r") as f:
+                datos = json.load(f)
+            self.guardar("principal", **{**_vacio("Amigo Invisible"), **datos})
@@ -1,12 +1,12 @@
 import streamlit as st
-from utils import cargar_datos
+from utils import cargar_datos, obtener_servicio
 
-def user_interface():
+def user_interface(sorteo):
     st.title("Consulta de Amigo Invisible 🎁")
     st.subheader("Ingresa tu número secreto para ver a quién regalar")
     
-    # Cargar datos de la fuente de verdad (JSON)
-    datos = cargar_datos()
+    # Datos del sorteo (en memoria mientras su archivo no cambie)
+    datos = cargar_datos(sorteo)
     emparejamientos_numerados = datos["emparejamientos"]
 
     if not emparejamientos_numerados:
@@ -14,7 +14,9 @@ def user_interface():
         return
 
     # Usar un input de texto para el número, evitando que se vea como un contador
-    numero_str = st.text_input("Ingrese su Número Secreto (por ejemplo, 12)", max_chars=2, key="user_number_input")
+    digitos = obtener_servicio().digitos(sorteo)
+    numero_str = st.text_input(f"Ingrese su Número Secreto (por ejemplo, {'0123456789'[:digitos]})",
+                               max_chars=digitos, key="user_number_input").strip()
 
     if st.button("Consultar Mi Amigo Invisible"):
         if not numero_str.isdigit():
@@ -1,6 +1,7 @@
 import json
-import os
 import streamlit as st
+from almacen import abrir
+from sorteos import ServicioSorteos
 
 # --- Configuración Secreta ---
 # NOTA: En una aplicación real, esta contraseña debería ser una variable de entorno
@@ -8,38 +9,40 @@ import streamlit as st
 ADMIN_PASSWORD = "admin123" 
 
 # --- Rutas y Nombres de Archivos ---
-DATA_FILE = 'data.json'
+# Los sorteos van en la base de datos compartida con las otras apps (un documento por sorteo);
+# el formato antiguo se importa una vez
+DATA_FILE = 'data.json'  # Un único sorteo: pasa a ser el sorteo 'principal'
+SORTEO_POR_DEFECTO = 'principal'
 
-def cargar_datos():
-    """Carga los datos de emparejamientos y nombres desde el archivo JSON."""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r') as f:
-                datos = json.load(f)
-                
-            # Asegurar que el formato JSON cargado sea correcto para la app
-            if not isinstance(datos.get("emparejamientos"), dict):
-                st.error("Error en el formato del archivo data.json.")
-                return {"nombres": [], "emparejamientos": {}}
+@st.cache_resource
+def obtener_servicio():
+    # Compartido por todas las sesiones: las consultas no releen el sorteo si no ha cambiado
+    return ServicioSorteos(abrir(), archivo_antiguo=DATA_FILE)
 
-            return {
-                # Lista de nombres cargados
-                "nombres": datos.get("nombres", []), 
-                # Diccionario {numero: [regalador, receptor]}
-                "emparejamientos": datos.get("emparejamientos", {}) 
-            }
-        except json.JSONDecodeError:
-            st.error(f"Error al decodificar JSON en {DATA_FILE}. Archivo corrupto.")
-            return {"nombres": [], "emparejamientos": {}}
-    
-    # Devuelve la estructura inicial si el archivo no existe
-    return {"nombres": [], "emparejamientos": {}}
+def cargar_datos(sorteo=SORTEO_POR_DEFECTO):
+    """Carga los datos de emparejamientos y nombres de un sorteo."""
+    vacio = {"nombres": [], "emparejamientos": {}, "restricciones": {}, "grupos": {}}
+    try:
+        datos = obtener_servicio().obtener(sorteo)
+    except json.JSONDecodeError:
+        st.error(f"Error al decodificar JSON del sorteo '{sorteo}'. Archivo corrupto.")
+        return vacio
 
-def guardar_datos(nombres: list, emparejamientos_numerados: dict):
-    """Guarda los datos en el archivo JSON."""
-    data_to_save = {
-        "nombres": nombres, 
-        "emparejamientos": emparejamientos_numerados
-    }
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data_to_save, f, indent=4)
\ No newline at end of file
+    # Asegurar que el formato JSON cargado sea correcto para la app
+    if not isinstance(datos.get("emparejamientos"), dict):
+        st.error(f"Error en el formato del sorteo '{sorteo}'.")
+        return vacio
+
+    # {nombre, nombres, emparejamientos {numero: [regalador, receptor]}, restricciones, grupos}
+    return datos
+
+def guardar_datos(nombres: list, emparejamientos_numerados: dict, restricciones=None, grupos=None,
+                 sorteo=SORTEO_POR_DEFECTO):
+    """Guarda los datos del sorteo (en una transacción: las consultas nunca ven medio sorteo)."""
+    obtener_servicio().guardar(
+        sorteo,
+        nombres=nombres,
+        emparejamientos=emparejamientos_numerados,
+        restricciones={r: sorted(receptores) for r, receptores in (restricciones or {}).items() if receptores},
+        grupos=grupos or {},
+    )
@@ -1,96 +1,43 @@
 import streamlit as st
-import json
-import os
+
+from compartido import ADMIN_PASSWORD, leer_resultado, obtener_registro
+from cuadro import Cuadro
+from dibujo import html_cuadro
+from registro import Conflicto
 
 # Configuración de la página
 st.set_page_config(
     page_title="XVI Grand Prix Peñero 2024",
     page_icon="🏆",
-    layout="centered",
+    layout="wide",
     initial_sidebar_state="collapsed",
 )
 
-# Constantes
-ADMIN_PASSWORD = "Admin1"
-TORNEO_FILE = "torneo.json"
-RONDAS = ['Octavos', 'Cuartos', 'Semifinal', 'Final']
-
 # Funciones auxiliares
-def cargar_torneo():
-    if os.path.exists(TORNEO_FILE):
-        with open(TORNEO_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def guardar_torneo(torneo):
-    with open(TORNEO_FILE, 'w') as f:
-        json.dump(torneo, f)
-
-def inicializar_equipo(nombre):
-    return {
-        "nombre": nombre,
-        "rondas": {ronda: {"cruces": []} for ronda in RONDAS}
-    }
-
-def crear_partido(torneo, ronda, equipo1, equipo2):
-    # Verificar si los equipos ya están en el cruce
-    for equipo in torneo:
-        if equipo["nombre"] == equipo1 or equipo["nombre"] == equipo2:
-            equipo["rondas"][ronda]["cruces"].append({"equipo1": equipo1, "equipo2": equipo2, "goles": [0, 0]})
-    return torneo
-
-def añadir_resultado(torneo, ronda, equipo1, equipo2, resultado):
-    for equipo in torneo:
-        for cruce in equipo["rondas"][ronda]["cruces"]:
-            if cruce["equipo1"] == equipo1 and cruce["equipo2"] == equipo2:
-                cruce["goles"] = [int(resultado.split('-')[0]), int(resultado.split('-')[1])]
-    return torneo
-
-def obtener_ganador(cruce):
-    goles1 = cruce["goles"][0]
-    goles2 = cruce["goles"][1]
-    if goles1 > goles2:
-        return cruce["equipo1"]
-    elif goles2 > goles1:
-        return cruce["equipo2"]
-    return None  # Empate
-
-def generar_siguientes_rondas(torneo):
-    for i, ronda in enumerate(RONDAS[:-1]):
-        siguiente_ronda = RONDAS[i + 1]
-        ganadores = []
-        for cruce in [cruce for equipo in torneo for cruce in equipo["rondas"][ronda]["cruces"]]:
-            if cruce["goles"] != [0, 0]:  # Solo considerar cruces con resultados
-                ganador = obtener_ganador(cruce)
-                if ganador:
-                    ganadores.append(ganador)
-
-        # Crear cruces para la siguiente ronda
-        for j in range(0, len(ganadores), 2):
-            if j + 1 < len(ganadores):  # Asegurarse de que haya un par
-                torneo = crear_partido(torneo, siguiente_ronda, ganadores[j], ganadores[j + 1])
-    return torneo
-
-# Cargar torneo al inicio
-if 'torneo' not in st.session_state:
-    st.session_state.torneo = cargar_torneo()
+def guardar_cambio(op, *args, base=None):
+    """Apunta un cambio en el torneo compartido; devuelve False (y avisa) si no se pudo."""
+    try:
+        obtener_registro().aplicar(op, *args, base=base)
+        return True
+    except (Conflicto, ValueError, TimeoutError) as e:
+        st.warning(str(e))
+        return False
+
+@st.cache_data(max_entries=8)
+def get_cuadro_html(firma, _torneo):
+    # Una sola renderización por versión del torneo, compartida por todas las sesiones
+    return html_cuadro(_torneo)
+
+# El torneo al día en cada ejecución (si nadie ha escrito, solo se mira el contador de cambios)
+torneo = obtener_registro().actual()
+# Versión que tenía el torneo cuando se pintó lo que el árbitro está viendo
+version_vista = st.session_state.get('version_vista')
 
 # Título principal
 st.markdown("<h1 style='text-align: center;'>🏆🐂 XVI Grand Prix Peñero 2024 🐂🏆</h1>", unsafe_allow_html=True)
 
-# Mostrar las eliminatorias
-for ronda in RONDAS:
-    st.markdown(f"<h3 style='text-align: center;'>{ronda}</h3>", unsafe_allow_html=True)
-    for equipo in st.session_state.torneo:
-        for cruce in equipo["rondas"][ronda]["cruces"]:
-            if cruce:
-                ganador = obtener_ganador(cruce)
-                color_equipo1 = 'green' if ganador == cruce['equipo1'] else 'red' if ganador == cruce['equipo2'] else 'black'
-                color_equipo2 = 'green' if ganador == cruce['equipo2'] else 'red' if ganador == cruce['equipo1'] else 'black'
-                st.markdown(f"<div style='border: 1px solid #ccc; padding: 10px; border-radius: 5px; text-align: center;'>"
-                             f"<h4 style='color: {color_equipo1};'>{cruce['equipo1']} {cruce['goles'][0]} - {cruce['goles'][1]} {cruce['equipo2']}</h4>"
-                             f"</div>", unsafe_allow_html=True)
-                st.markdown("---")
+# Mostrar las eliminatorias: el cuadro entero en un solo HTML
+st.html(get_cuadro_html(torneo.firma(), torneo))
 
 # Sección de administrador
 with st.expander("Opciones avanzadas"):
@@ -99,50 +46,57 @@ with st.expander("Opciones avanzadas"):
         nuevo_equipo = st.text_input("Añadir nuevo equipo")
         if st.button("Añadir equipo") and nuevo_equipo:
             # Verificar si el equipo ya existe
-            if any(equipo["nombre"] == nuevo_equipo for equipo in st.session_state.torneo):
+            if torneo.id_equipo(nuevo_equipo.strip()) is not None:
                 st.warning("El equipo ya existe.")
-            else:
-                st.session_state.torneo.append(inicializar_equipo(nuevo_equipo))
-                guardar_torneo(st.session_state.torneo)
+            elif guardar_cambio("añadir_equipo", nuevo_equipo):
                 st.success(f"Equipo {nuevo_equipo} añadido")
 
+        # Generar el cuadro entero con los equipos inscritos (por orden de inscripción = cabeza de serie)
+        if st.button("Generar cuadro con los equipos inscritos", help="Borra los partidos que haya"):
+            try:
+                obtener_registro().reemplazar(Cuadro.generar(list(torneo.equipos.values())))
+                torneo = obtener_registro().actual()
+                st.success(f"Cuadro de {len(torneo.rondas)} rondas generado")
+            except ValueError as e:
+                st.warning(str(e))
+
         # Crear partidos
-        ronda = st.selectbox("Seleccionar ronda para crear partido", options=RONDAS)
-        equipo1 = st.selectbox("Equipo 1", options=[e["nombre"] for e in st.session_state.torneo])
-        equipo2 = st.selectbox("Equipo 2", options=[e["nombre"] for e in st.session_state.torneo if e["nombre"] != equipo1])
+        ronda = st.selectbox("Seleccionar ronda para crear partido", options=torneo.rondas)
+        equipo1 = st.selectbox("Equipo 1", options=list(torneo.equipos.values()))
+        equipo2 = st.selectbox("Equipo 2", options=[e for e in torneo.equipos.values() if e != equipo1])
 
         if st.button("Crear partido"):
-            if equipo1 != equipo2:  # Asegurarse de que los equipos sean diferentes
-                st.session_state.torneo = crear_partido(st.session_state.torneo, ronda, equipo1, equipo2)
-                guardar_torneo(st.session_state.torneo)
-                st.success("Partido creado")
+            if equipo1 and equipo2 and equipo1 != equipo2:  # Asegurarse de que los equipos sean diferentes
+                if guardar_cambio("crear_partido", ronda, equipo1, equipo2):
+                    st.success("Partido creado")
             else:
                 st.warning("Por favor, selecciona dos equipos diferentes.")
 
         # Actualizar resultados
         st.subheader("Actualizar resultados")
-        ronda_resultado = st.selectbox("Seleccionar ronda para actualizar resultado", options=RONDAS)
-        partidos_en_ronda = []
-
-        # Crear una lista de partidos en el formato deseado
-        for e in st.session_state.torneo:
-            for cruce in e["rondas"][ronda_resultado]["cruces"]:
-                partidos_en_ronda.append(f"{cruce['equipo1']} vs {cruce['equipo2']}")
-
-        partido_seleccionado = st.selectbox("Seleccionar partido", options=partidos_en_ronda)
+        ronda_resultado = st.selectbox("Seleccionar ronda para actualizar resultado", options=torneo.rondas)
+        partido_seleccionado = st.selectbox(
+            "Seleccionar partido",
+            options=[partido["id"] for partido in torneo.jugables(ronda_resultado)],
+            format_func=lambda id_partido: torneo.etiqueta(torneo.partido(id_partido)),
+        )
 
         if partido_seleccionado:
-            equipo1, equipo2 = partido_seleccionado.split(" vs ")
             resultado = st.text_input("Resultado (formato: X-Y)")
 
             if st.button("Actualizar resultado"):
-                if resultado and '-' in resultado:
-                    st.session_state.torneo = añadir_resultado(st.session_state.torneo, ronda_resultado, equipo1, equipo2, resultado)
-                    st.session_state.torneo = generar_siguientes_rondas(st.session_state.torneo)
-                    guardar_torneo(st.session_state.torneo)
-                    st.success("Resultado actualizado y siguientes rondas generadas")
+                goles = leer_resultado(resultado)
+                if goles:
+                    # Solo se apunta este partido; el ganador pasa a su partido de la ronda siguiente
+                    if guardar_cambio("poner_resultado", partido_seleccionado, *goles, base=version_vista):
+                        st.success("Resultado actualizado y ganador en la siguiente ronda")
                 else:
                     st.warning("Por favor, ingresa un resultado válido en el formato X-Y.")
+            if st.button("Quitar resultado"):
+                if guardar_cambio("borrar_resultado", partido_seleccionado, base=version_vista):
+                    st.success("Resultado quitado")
+
+st.session_state.version_vista = torneo.version
 
 # Pie de página
 st.markdown("---")
@@ -0,0 +1,35 @@
+"""
+Lo que comparten la página principal y las de `pages/`: las constantes y los
+registros del torneo. Las fábricas viven solo aquí para que `st.cache_resource`
+dé el mismo registro (una sola copia en memoria por proceso) a todas las páginas.
+"""
+import streamlit as st
+
+from almacen import abrir
+from cuadro import Cuadro
+from grupos import FaseDeGrupos
+from registro import RegistroTorneo
+
+ADMIN_PASSWORD = "Admin1"
+TORNEO_FILE = "torneo.json"  # Formato antiguo, se importa una vez
+
+
+@st.cache_resource
+def obtener_registro():
+    # Un único torneo en memoria por proceso, compartido por todas las sesiones y páginas
+    # (torneo.json, en cualquiera de sus formatos, se importa la primera vez)
+    return RegistroTorneo(abrir(), "torneo", Cuadro, ruta_antigua=TORNEO_FILE)
+
+
+@st.cache_resource
+def obtener_registro_grupos():
+    # La fase de grupos se guarda igual que el cuadro: instantánea + diario de parches
+    return RegistroTorneo(abrir(), "grupos", FaseDeGrupos)
+
+
+def leer_resultado(resultado):
+    """'X-Y' -> (X, Y), o None si no tiene ese formato."""
+    partes = resultado.replace(' ', '').split('-')
+    if len(partes) != 2 or not all(parte.isdigit() for parte in partes):
+        return None
+    return int(partes[0]), int(partes[1])
@@ -0,0 +1,327 @@
+"""
+Cuadro del torneo normalizado: una tabla de equipos y otra de partidos.
+Cada partido existe una sola vez, con su ronda y su hueco en el cuadro (el
+hueco h de una ronda se cruza con el h ^ 1 y sus ganadores juegan el hueco
+h // 2 de la siguiente). Los índices por id, por equipo y por ronda hacen que
+buscar o actualizar un partido no recorra el resto del torneo.
+
+Al poner un resultado solo se mueve su ganador al partido de abajo (el
+camino hasta la final como mucho, nunca el cuadro entero). Si el resultado
+corrige otro anterior y el ganador cambia, el equipo que había avanzado se
+retira y los resultados que ya no valen se borran por el camino.
+"""
+import hashlib
+import json
+
+RONDAS = ['Octavos', 'Cuartos', 'Semifinal', 'Final']
+FORMATO = 2
+
+# Nombre de cada ronda según los equipos que quedan en ella
+NOMBRES_RONDAS = {2: 'Final', 4: 'Semifinal', 8: 'Cuartos', 16: 'Octavos', 32: 'Dieciseisavos', 64: 'Treintaidosavos'}
+
+
+def nombres_rondas(tamaño: int) -> list:
+    """Rondas de un cuadro de `tamaño` equipos (potencia de dos), de la primera a la final."""
+    rondas = []
+    while tamaño >= 2:
+        rondas.append(NOMBRES_RONDAS.get(tamaño, f"Ronda de {tamaño}"))
+        tamaño //= 2
+    return rondas
+
+
+def orden_siembra(tamaño: int) -> list:
+    """
+    Cabezas de serie (1..tamaño) en el orden en que se colocan en el cuadro:
+    el 1 contra el último, y el 1 y el 2 solo se cruzan en la final.
+    """
+    orden = [1]
+    while len(orden) < tamaño:
+        suma = 2 * len(orden) + 1
+        orden = [s for semilla in orden for s in (semilla, suma - semilla)]
+    return orden
+
+
+class Cuadro:
+    # Lo que se puede apuntar como parche en el registro; las de partido llevan su id delante
+    OPERACIONES_PARTIDO = {"poner_resultado", "borrar_resultado"}
+    OPERACIONES = OPERACIONES_PARTIDO | {"añadir_equipo", "crear_partido"}
+
+    def __init__(self, rondas=RONDAS):
+        self.rondas = list(rondas)
+        self.equipos = {}  # id -> nombre
+        self.partidos = {}  # id -> {"id", "ronda", "hueco", "equipo1", "equipo2", "goles", "version"}
+        self.version = 0  # La pone quien guarda el torneo; cada partido apunta la de su último cambio
+        self._id_equipo = {}  # nombre -> id
+        self._por_equipo = {}  # id equipo -> {ids de partido}
+        self._por_ronda = {ronda: {} for ronda in self.rondas}  # ronda -> {hueco: id partido}
+        self._siguiente_equipo = 1
+        self._siguiente_partido = 1
+        self._firma = None
+
+    def firma(self) -> str:
+        """Hash del contenido; se recalcula solo después de un cambio. Sirve de clave de caché."""
+        if self._firma is None:
+            contenido = json.dumps(self.a_dict(), sort_keys=True, ensure_ascii=False)
+            self._firma = hashlib.sha1(contenido.encode()).hexdigest()
+        return self._firma
+
+    @classmethod
+    def generar(cls, nombres: list) -> "Cuadro":
+        """
+        Cuadro completo con los equipos por orden de cabeza de serie. Si no son
+        potencia de dos, los mejores pasan directamente (bye) a la segunda ronda.
+        """
+        if len(nombres) < 2:
+            raise ValueError("Se necesitan al menos dos equipos")
+        tamaño = 1 << (len(nombres) - 1).bit_length()
+        cuadro = cls(nombres_rondas(tamaño))
+        ids = [cuadro.añadir_equipo(nombre) for nombre in nombres]
+        siembra = orden_siembra(tamaño)
+        for hueco in range(tamaño // 2):
+            equipo1, equipo2 = (ids[s - 1] if s <= len(ids) else None for s in siembra[2 * hueco:2 * hueco + 2])
+            partido = cuadro._alta_partido({
+                "id": cuadro._siguiente_partido, "ronda": cuadro.rondas[0], "hueco": hueco,
+                "equipo1": equipo1, "equipo2": equipo2, "goles": None, "bye": equipo2 is None,
+            })
+            if partido["bye"]:
+                cuadro._propagar(partido)
+        return cuadro
+
+    # --- Equipos ---
+
+    def añadir_equipo(self, nombre: str) -> int:
+        nombre = nombre.strip()
+        if not nombre:
+            raise ValueError("El nombre del equipo está vacío")
+        if nombre in self._id_equipo:
+            raise ValueError(f"El equipo {nombre} ya existe")
+        return self._alta_equipo(self._siguiente_equipo, nombre)
+
+    def _alta_equipo(self, id_equipo: int, nombre: str) -> int:
+        self._firma = None
+        self.equipos[id_equipo] = nombre
+        self._id_equipo[nombre] = id_equipo
+        self._por_equipo[id_equipo] = set()
+        self._siguiente_equipo = max(self._siguiente_equipo, id_equipo + 1)
+        return id_equipo
+
+    def id_equipo(self, nombre: str):
+        return self._id_equipo.get(nombre)
+
+    def nombre(self, id_equipo):
+        """Nombre del equipo, o None si el hueco aún no tiene equipo."""
+        return self.equipos.get(id_equipo)
+
+    # --- Partidos ---
+
+    def crear_partido(self, ronda: str, equipo1: str, equipo2: str, hueco=None) -> dict:
+        """Crea el partido en el primer hueco libre de la ronda (o en `hueco`)."""
+        if ronda not in self._por_ronda:
+            raise ValueError(f"Ronda desconocida: {ronda}")
+        if equipo1 == equipo2:
+            raise ValueError("Un equipo no puede jugar contra sí mismo")
+        ids = [self._id_equipo.get(equipo) for equipo in (equipo1, equipo2)]
+        if None in ids:
+            raise ValueError("Los dos equipos tienen que estar inscritos")
+        huecos = self._por_ronda[ronda]
+        if hueco is None:
+            hueco = next(h for h in range(len(huecos) + 1) if h not in huecos)
+        elif hueco in huecos:
+            raise ValueError(f"El hueco {hueco} de {ronda} ya tiene partido")
+        return self._alta_partido({
+            "id": self._siguiente_partido, "ronda": ronda, "hueco": hueco,
+            "equipo1": ids[0], "equipo2": ids[1], "goles": None,
+        })
+
+    def _alta_partido(self, partido: dict) -> dict:
+        self._firma = None
+        partido.setdefault("version", self.version)
+        self.partidos[partido["id"]] = partido
+        self._por_ronda[partido["ronda"]][partido["hueco"]] = partido["id"]
+        for equipo in (partido["equipo1"], partido["equipo2"]):
+            if equipo is not None:
+                self._por_equipo[equipo].add(partido["id"])
+        self._siguiente_partido = max(self._siguiente_partido, partido["id"] + 1)
+        return partido
+
+    def _cambiar_equipo(self, partido: dict, lado: str, equipo):
+        anterior = partido[lado]
+        if anterior == equipo:
+            return
+        self._firma = None
+        partido[lado] = equipo
+        partido["version"] = self.version
+        otro = partido["equipo2" if lado == "equipo1" else "equipo1"]
+        if anterior is not None and anterior != otro:
+            self._por_equipo[anterior].discard(partido["id"])
+        if equipo is not None:
+            self._por_equipo[equipo].add(partido["id"])
+
+    def partido(self, id_partido: int) -> dict:
+        return self.partidos[id_partido]
+
+    def partido_en(self, ronda: str, hueco: int):
+        id_partido = self._por_ronda[ronda].get(hueco)
+        return self.partidos[id_partido] if id_partido is not None else None
+
+    def partidos_de_ronda(self, ronda: str) -> list:
+        huecos = self._por_ronda[ronda]
+        return [self.partidos[huecos[hueco]] for hueco in sorted(huecos)]
+
+    def num_huecos(self, ronda: str) -> int:
+        """Huecos ocupados de la ronda contando los vacíos intermedios (el mayor hueco + 1)."""
+        return max(self._por_ronda[ronda], default=-1) + 1
+
+    def partidos_de_equipo(self, nombre: str) -> list:
+        id_equipo = self._id_equipo.get(nombre)
+        return sorted((self.partidos[p] for p in self._por_equipo.get(id_equipo, ())), key=lambda p: p["id"])
+
+    def poner_resultado(self, id_partido: int, goles1: int, goles2: int) -> dict:
+        """
+        Guarda el resultado y lleva al ganador a su sitio en la ronda siguiente.
+        Repetir el mismo resultado no cambia nada.
+        """
+        if goles1 < 0 or goles2 < 0:
+            raise ValueError("Los goles no pueden ser negativos")
+        partido = self.partidos[id_partido]
+        if None in (partido["equipo1"], partido["equipo2"]):
+            raise ValueError("El partido todavía no tiene los dos equipos")
+        partido["goles"] = [int(goles1), int(goles2)]
+        partido["version"] = self.version
+        self._firma = None
+        self._propagar(partido)
+        return partido
+
+    def borrar_resultado(self, id_partido: int) -> dict:
+        """Deja el partido sin jugar y retira a su ganador de las rondas siguientes."""
+        partido = self.partidos[id_partido]
+        partido["goles"] = None
+        partido["version"] = self.version
+        self._firma = None
+        self._propagar(partido)
+        return partido
+
+    def siguiente(self, partido: dict) -> tuple:
+        """(ronda, hueco, lado) donde juega el ganador, o None si es la final."""
+        i = self.rondas.index(partido["ronda"]) + 1
+        if i == len(self.rondas):
+            return None
+        return self.rondas[i], partido["hueco"] // 2, "equipo1" if partido["hueco"] % 2 == 0 else "equipo2"
+
+    def _propagar(self, partido: dict):
+        """
+        Pone al ganador de `partido` en su hueco de la ronda siguiente. Si allí
+        había otro equipo y el partido ya se había jugado, ese resultado deja de
+        valer: se borra y se sigue hacia la final con el mismo criterio.
+        """
+        ganador = self.ganador(partido)
+        while True:
+            destino = self.siguiente(partido)
+            if destino is None:
+                return
+            ronda, hueco, lado = destino
+            siguiente = self.partido_en(ronda, hueco)
+            if siguiente is None:
+                if ganador is None:
+                    return
+                siguiente = self._alta_partido({
+                    "id": self._siguiente_partido, "ronda": ronda, "hueco": hueco,
+                    "equipo1": None, "equipo2": None, "goles": None,
+                })
+            if siguiente[lado] == ganador:
+                return
+            self._cambiar_equipo(siguiente, lado, ganador)
+            if siguiente["goles"] is None:
+                return
+            siguiente["goles"] = None
+            partido, ganador = siguiente, None
+
+    def ganador(self, partido: dict):
+        """Id del ganador, o None si no se ha jugado o hay empate."""
+        if partido.get("bye"):
+            return partido["equipo1"] if partido["equipo1"] is not None else partido["equipo2"]
+        if partido["goles"] is None:
+            return None
+        goles1, goles2 = partido["goles"]
+        if goles1 > goles2:
+            return partido["equipo1"]
+        if goles2 > goles1:
+            return partido["equipo2"]
+        return None  # Empate
+
+    def etiqueta(self, partido: dict) -> str:
+        return f"{self.nombre(partido['equipo1']) or '?'} vs {self.nombre(partido['equipo2']) or '?'}"
+
+    def jugables(self, ronda: str) -> list:
+        """Partidos de la ronda que ya tienen los dos equipos (los que se pueden arbitrar)."""
+        return [p for p in self.partidos_de_ronda(ronda)
+                if not p.get("bye") and p["equipo1"] is not None and p["equipo2"] is not None]
+
+    # --- Formato en disco ---
+
+    def a_dict(self) -> dict:
+        return {
+            "formato": FORMATO,
+            "version": self.version,
+            "rondas": self.rondas,
+            "equipos": [{"id": id_equipo, "nombre": nombre} for id_equipo, nombre in self.equipos.items()],
+            "partidos": list(self.partidos.values()),
+        }
+
+    @classmethod
+    def desde_dict(cls, datos) -> "Cuadro":
+        """Lee el formato normalizado o migra el antiguo (lista de equipos con sus cruces)."""
+        if isinstance(datos, list):
+            return cls.migrar(datos)
+        cuadro = cls(datos.get("rondas", RONDAS))
+        cuadro.version = datos.get("version", 0)
+        for equipo in datos.get("equipos", []):
+            cuadro._alta_equipo(equipo["id"], equipo["nombre"])
+        for partido in datos.get("partidos", []):
+            cuadro._alta_partido(dict(partido))
+        return cuadro
+
+    @classmethod
+    def migrar(cls, antiguo: list) -> "Cuadro":
+        """
+        El formato antiguo guardaba una copia de cada cruce en los dos equipos.
+        Se queda una sola por pareja y ronda (la que tenga resultado, si alguna
+        lo tiene), se descartan los cruces de un equipo contra sí mismo y un
+        marcador de 0-0 pasa a ser "sin jugar", que es lo que significaba.
+        Los cruces de las rondas siguientes que ya venían en el archivo se
+        respetan; el ganador que no aparezca en la ronda siguiente pasa a su
+        hueco si está libre.
+        """
+        cuadro = cls()
+        for equipo in antiguo:
+            if equipo["nombre"] not in cuadro._id_equipo:
+                cuadro.añadir_equipo(equipo["nombre"])
+        for ronda in cuadro.rondas:
+            cruces = {}
+            for equipo in antiguo:
+                for cruce in equipo.get("rondas", {}).get(ronda, {}).get("cruces", []):
+                    if not cruce or cruce["equipo1"] == cruce["equipo2"]:
+                        continue
+                    clave = frozenset((cruce["equipo1"], cruce["equipo2"]))
+                    if clave not in cruces or cruce["goles"] != [0, 0]:
+                        cruces[clave] = cruce
+            for cruce in cruces.values():
+                for nombre in (cruce["equipo1"], cruce["equipo2"]):
+                    if nombre not in cuadro._id_equipo:
+                        cuadro.añadir_equipo(nombre)
+                partido = cuadro.crear_partido(ronda, cruce["equipo1"], cruce["equipo2"])
+                if cruce["goles"] != [0, 0]:
+                    partido["goles"] = [int(goles) for goles in cruce["goles"]]
+                    cuadro._firma = None
+        for ronda in cuadro.rondas[:-1]:
+            for partido in cuadro.partidos_de_ronda(ronda):
+                ganador = cuadro.ganador(partido)
+                if ganador is None:
+                    continue
+                ronda_siguiente, hueco, lado = cuadro.siguiente(partido)
+                if any(ganador in (p["equipo1"], p["equipo2"]) for p in cuadro.partidos_de_ronda(ronda_siguiente)):
+                    continue  # El archivo ya lo tenía en la ronda siguiente
+                siguiente = cuadro.partido_en(ronda_siguiente, hueco)
+                if siguiente is None or siguiente[lado] is None:
+                    cuadro._propagar(partido)
+        return cuadro
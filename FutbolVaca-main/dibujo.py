@@ -0,0 +1,78 @@
+"""
+El cuadro entero como un único documento HTML: la primera mitad de cada ronda
+a la izquierda, la segunda a la derecha en espejo y la final en el centro.
+Cada columna reparte sus huecos con flex, así que los partidos quedan a la
+altura de los dos de los que salen y las líneas del árbol son solo CSS.
+"""
+import html
+
+ESTILO = """
+<style>
+.cuadro { display: flex; gap: 18px; overflow-x: auto; padding: 8px 2px; font-family: sans-serif; font-size: 13px; }
+.cuadro .columna { display: flex; flex-direction: column; min-width: 130px; flex: 1; }
+.cuadro .ronda { text-align: center; font-weight: bold; margin-bottom: 6px; }
+.cuadro .huecos { display: flex; flex-direction: column; flex: 1; }
+.cuadro .par { display: flex; flex-direction: column; flex: 1; position: relative; }
+.cuadro .hueco { display: flex; align-items: center; flex: 1; position: relative; padding: 3px 0; }
+.cuadro .partido { width: 100%; border: 1px solid #ccc; border-radius: 5px; background: white; }
+.cuadro .equipo { display: flex; justify-content: space-between; padding: 3px 6px; color: black; }
+.cuadro .equipo + .equipo { border-top: 1px solid #eee; }
+.cuadro .gana { color: green; font-weight: bold; }
+.cuadro .pierde { color: red; }
+.cuadro .vacio { color: #aaa; }
+.cuadro .izquierda .hueco::after, .cuadro .derecha .hueco::after {
+    content: ""; position: absolute; top: 50%; width: 9px; border-top: 2px solid #bbb; }
+.cuadro .izquierda .hueco::after { right: -11px; }
+.cuadro .derecha .hueco::after { left: -11px; }
+.cuadro .izquierda .par::after, .cuadro .derecha .par::after {
+    content: ""; position: absolute; top: 25%; bottom: 25%; }
+.cuadro .izquierda .par::after { right: -11px; border-right: 2px solid #bbb; }
+.cuadro .derecha .par::after { left: -11px; border-left: 2px solid #bbb; }
+.cuadro .par.solo::after { display: none; }
+.cuadro .campeon { text-align: center; font-size: 16px; font-weight: bold; margin-top: 10px; }
+</style>
+"""
+
+
+def _equipo(cuadro, partido, lado: str, ganador) -> str:
+    if partido is None or partido[lado] is None:
+        texto = "pasa directo" if partido is not None and partido.get("bye") else "—"
+        return f"<div class='equipo vacio'><span>{texto}</span></div>"
+    clase = "" if ganador is None else "gana" if ganador == partido[lado] else "pierde"
+    goles = partido["goles"][0 if lado == "equipo1" else 1] if partido["goles"] else ""
+    return (f"<div class='equipo {clase}'><span>{html.escape(cuadro.nombre(partido[lado]))}</span>"
+            f"<span>{goles}</span></div>")
+
+
+def _partido(cuadro, partido) -> str:
+    ganador = cuadro.ganador(partido) if partido is not None else None
+    return (f"<div class='hueco'><div class='partido'>{_equipo(cuadro, partido, 'equipo1', ganador)}"
+            f"{_equipo(cuadro, partido, 'equipo2', ganador)}</div></div>")
+
+
+def _columna(cuadro, ronda: str, huecos: range, lado: str) -> str:
+    partidos = [_partido(cuadro, cuadro.partido_en(ronda, hueco)) for hueco in huecos]
+    # De dos en dos: cada pareja de huecos se une con la línea que va al partido siguiente
+    pares = "".join(f"<div class='par{'' if len(partidos) > 1 else ' solo'}'>{''.join(partidos[i:i + 2])}</div>"
+                    for i in range(0, len(partidos), 2))
+    return (f"<div class='columna {lado}'><div class='ronda'>{html.escape(ronda)}</div>"
+            f"<div class='huecos'>{pares}</div></div>")
+
+
+def html_cuadro(cuadro) -> str:
+    rondas = cuadro.rondas
+    izquierda, derecha = [], []
+    for i, ronda in enumerate(rondas[:-1]):
+        # Huecos que le tocan a la ronda en un cuadro completo (o más, si se crearon a mano)
+        total = max(2 ** (len(rondas) - 1 - i), cuadro.num_huecos(ronda))
+        total += total % 2
+        izquierda.append(_columna(cuadro, ronda, range(total // 2), "izquierda"))
+        derecha.insert(0, _columna(cuadro, ronda, range(total // 2, total), "derecha"))
+
+    final = cuadro.partido_en(rondas[-1], 0)
+    campeon = cuadro.ganador(final) if final is not None else None
+    centro = (f"<div class='columna'><div class='ronda'>{html.escape(rondas[-1])}</div>"
+              f"<div class='huecos'>{_partido(cuadro, final)}"
+              + (f"<div class='campeon'>🏆 {html.escape(cuadro.nombre(campeon))}</div>" if campeon is not None else "")
+              + "</div></div>")
+    return f"{ESTILO}<div class='cuadro'>{''.join(izquierda)}{centro}{''.join(derecha)}</div>"
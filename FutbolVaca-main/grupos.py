@@ -0,0 +1,242 @@
+"""
+Fase de grupos antes de las eliminatorias.
+
+- Reparto en grupos por bombos (en serpiente, según el orden de inscripción).
+- Calendario de cada grupo por el método del círculo: todos contra todos,
+  cada equipo juega una vez por jornada (con impares, uno descansa).
+- Campo y hora: las jornadas van seguidas y cada una empieza en una franja
+  nueva, así que nadie juega dos partidos a la vez.
+- Clasificación con NumPy (bincount sobre los partidos jugados): puntos,
+  enfrentamiento directo entre los empatados a puntos, diferencia de goles
+  y goles a favor. Cada grupo guarda la suya y un resultado solo borra la
+  del grupo afectado.
+- Siembra del cuadro final con los primeros de cada grupo, los segundos...
+  y los mejores de la siguiente posición hasta llenar una potencia de dos.
+"""
+import hashlib
+import json
+import string
+from datetime import datetime, timedelta
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+
+from cuadro import Cuadro
+
+PUNTOS_VICTORIA = 3
+PUNTOS_EMPATE = 1
+COLUMNAS_CLASIFICACION = ["Equipo", "PJ", "PG", "PE", "PP", "GF", "GC", "DG", "Pts"]
+
+
+def repartir(equipos: list, n_grupos: int) -> dict:
+    """{letra: equipos}. El orden de inscripción hace de bombo: 1º a A, 2º a B... y vuelta en sentido contrario."""
+    if not 1 <= n_grupos <= min(len(string.ascii_uppercase), len(equipos) // 2):
+        raise ValueError("Cada grupo necesita al menos dos equipos")
+    letras = string.ascii_uppercase[:n_grupos]
+    grupos = {letra: [] for letra in letras}
+    for i, equipo in enumerate(equipos):
+        vuelta, posicion = divmod(i, n_grupos)
+        grupos[letras[posicion if vuelta % 2 == 0 else n_grupos - 1 - posicion]].append(equipo)
+    return grupos
+
+
+def jornadas(equipos: list) -> list:
+    """Método del círculo: el primero queda fijo y el resto gira una posición por jornada."""
+    rueda = list(equipos) + ([None] if len(equipos) % 2 else [])
+    n = len(rueda)
+    resultado = []
+    for j in range(n - 1):
+        parejas = [(rueda[i], rueda[n - 1 - i]) for i in range(n // 2)]
+        # El fijo alterna de lado para no ser siempre el "local"
+        if j % 2:
+            parejas[0] = parejas[0][::-1]
+        resultado.append([pareja for pareja in parejas if None not in pareja])
+        rueda = [rueda[0], rueda[-1]] + rueda[1:-1]
+    return resultado
+
+
+def tabla(equipos: list, partidos: list) -> pd.DataFrame:
+    """Clasificación de un grupo, ya ordenada. `partidos` son los del grupo (jugados o no)."""
+    n = len(equipos)
+    indice = {equipo: i for i, equipo in enumerate(equipos)}
+    jugados = [p for p in partidos if p["goles"] is not None]
+    equipo1 = np.array([indice[p["equipo1"]] for p in jugados], dtype=int)
+    equipo2 = np.array([indice[p["equipo2"]] for p in jugados], dtype=int)
+    goles = np.array([p["goles"] for p in jugados], dtype=float).reshape(-1, 2)
+    goles1, goles2 = goles[:, 0], goles[:, 1]
+
+    def sumar(valor1, valor2, mascara=slice(None)):
+        return (np.bincount(equipo1[mascara], valor1[mascara], minlength=n)
+                + np.bincount(equipo2[mascara], valor2[mascara], minlength=n)).astype(int)
+
+    gana1, empate, gana2 = goles1 > goles2, goles1 == goles2, goles2 > goles1
+    puntos1 = PUNTOS_VICTORIA * gana1 + PUNTOS_EMPATE * empate
+    puntos2 = PUNTOS_VICTORIA * gana2 + PUNTOS_EMPATE * empate
+    puntos = sumar(puntos1, puntos2)
+    gf, gc = sumar(goles1, goles2), sumar(goles2, goles1)
+    # Enfrentamiento directo: los partidos entre equipos que están empatados a puntos
+    directo = puntos[equipo1] == puntos[equipo2]
+    puntos_directo = sumar(puntos1, puntos2, directo)
+    dg_directo = sumar(goles1 - goles2, goles2 - goles1, directo)
+
+    orden = np.lexsort((np.arange(n), -gf, -(gf - gc), -dg_directo, -puntos_directo, -puntos))
+    clasificacion = pd.DataFrame({
+        "Equipo": equipos,
+        "PJ": sumar(np.ones_like(goles1), np.ones_like(goles2)),
+        "PG": sumar(gana1.astype(float), gana2.astype(float)),
+        "PE": sumar(empate.astype(float), empate.astype(float)),
+        "PP": sumar(gana2.astype(float), gana1.astype(float)),
+        "GF": gf,
+        "GC": gc,
+        "DG": gf - gc,
+        "Pts": puntos,
+    }, columns=COLUMNAS_CLASIFICACION).iloc[orden].reset_index(drop=True)
+    clasificacion.index += 1
+    return clasificacion
+
+
+class FaseDeGrupos:
+    # Mismo contrato que Cuadro para poder guardarse en un RegistroTorneo
+    OPERACIONES_PARTIDO = {"poner_resultado", "borrar_resultado"}
+    OPERACIONES = OPERACIONES_PARTIDO
+
+    def __init__(self, grupos=None):
+        self.grupos = dict(grupos or {})  # letra -> equipos
+        self.partidos = {}  # id -> {"id", "grupo", "jornada", "equipo1", "equipo2", "hora", "campo", "goles", "version"}
+        self.version = 0
+        self._por_grupo = {letra: [] for letra in self.grupos}
+        self._clasificacion = {}  # letra -> DataFrame; un resultado solo borra la de su grupo
+        self._firma = None
+
+    @classmethod
+    def generar(cls, equipos: list, n_grupos: int, campos=1, inicio="10:00", minutos=30) -> "FaseDeGrupos":
+        """Grupos, calendario y a cada partido su campo y su hora."""
+        if campos < 1 or minutos < 1:
+            raise ValueError("Hace falta al menos un campo y una duración de partido")
+        fase = cls(repartir(equipos, n_grupos))
+        calendarios = {letra: jornadas(miembros) for letra, miembros in fase.grupos.items()}
+        hora = datetime.strptime(inicio, "%H:%M")
+        franja = 0
+        for j in range(max(len(c) for c in calendarios.values())):
+            # Los partidos de la jornada, alternando grupos para repartir los campos
+            listas = [[(letra, pareja) for pareja in c[j]] if j < len(c) else [] for letra, c in calendarios.items()]
+            partidos = [partido for fila in zip_longest(*listas) for partido in fila if partido is not None]
+            for k, (letra, (equipo1, equipo2)) in enumerate(partidos):
+                fase._alta_partido({
+                    "id": len(fase.partidos) + 1, "grupo": letra, "jornada": j + 1,
+                    "equipo1": equipo1, "equipo2": equipo2,
+                    "hora": (hora + timedelta(minutes=minutos * (franja + k // campos))).strftime("%H:%M"),
+                    "campo": k % campos + 1, "goles": None,
+                })
+            franja += -(-len(partidos) // campos)  # Cada jornada empieza en una franja nueva
+        return fase
+
+    def _alta_partido(self, partido: dict):
+        partido.setdefault("version", self.version)
+        self.partidos[partido["id"]] = partido
+        self._por_grupo[partido["grupo"]].append(partido["id"])
+
+    # --- Resultados ---
+
+    def poner_resultado(self, id_partido: int, goles1: int, goles2: int) -> dict:
+        if goles1 < 0 or goles2 < 0:
+            raise ValueError("Los goles no pueden ser negativos")
+        return self._cambiar(id_partido, [int(goles1), int(goles2)])
+
+    def borrar_resultado(self, id_partido: int) -> dict:
+        return self._cambiar(id_partido, None)
+
+    def _cambiar(self, id_partido: int, goles) -> dict:
+        partido = self.partidos[id_partido]
+        partido["goles"] = goles
+        partido["version"] = self.version
+        self._clasificacion.pop(partido["grupo"], None)
+        self._firma = None
+        return partido
+
+    # --- Consultas ---
+
+    def partidos_de_grupo(self, letra: str) -> list:
+        return [self.partidos[p] for p in self._por_grupo[letra]]
+
+    def clasificacion(self, letra: str) -> pd.DataFrame:
+        if letra not in self._clasificacion:
+            self._clasificacion[letra] = tabla(self.grupos[letra], self.partidos_de_grupo(letra))
+        return self._clasificacion[letra]
+
+    def calendario(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [{"Hora": p["hora"], "Campo": p["campo"], "Grupo": p["grupo"], "Jornada": p["jornada"],
+              "Partido": f"{p['equipo1']} - {p['equipo2']}",
+              "Resultado": f"{p['goles'][0]} - {p['goles'][1]}" if p["goles"] else ""}
+             for p in self.partidos.values()],
+            columns=["Hora", "Campo", "Grupo", "Jornada", "Partido", "Resultado"],
+        )
+
+    def terminada(self) -> bool:
+        return bool(self.partidos) and all(p["goles"] is not None for p in self.partidos.values())
+
+    def firma(self) -> str:
+        if self._firma is None:
+            contenido = json.dumps(self.a_dict(), sort_keys=True, ensure_ascii=False)
+            self._firma = hashlib.sha1(contenido.encode()).hexdigest()
+        return self._firma
+
+    # --- Paso a eliminatorias ---
+
+    def clasificados(self, por_grupo=2, extra=None) -> list:
+        """
+        [(equipo, grupo)] por orden de cabeza de serie: los primeros de grupo,
+        luego los segundos... y después los `extra` mejores de la posición
+        siguiente. Dentro de cada posición se ordena por puntos, diferencia de
+        goles y goles a favor. Por defecto `extra` completa una potencia de dos.
+        """
+        fijos = por_grupo * len(self.grupos)
+        if extra is None:
+            extra = min(len(self.grupos), (1 << (fijos - 1).bit_length()) - fijos)
+        resultado = []
+        for puesto in range(1, por_grupo + 2):
+            filas = [(letra, self.clasificacion(letra).loc[puesto]) for letra in self.grupos
+                     if puesto in self.clasificacion(letra).index]
+            filas.sort(key=lambda fila: (-fila[1]["Pts"], -fila[1]["DG"], -fila[1]["GF"]))
+            if puesto > por_grupo:
+                filas = filas[:extra]
+            resultado += [(fila["Equipo"], letra) for letra, fila in filas]
+        return resultado
+
+    def sembrar(self, por_grupo=2, extra=None) -> Cuadro:
+        """
+        El cuadro final con los clasificados. Se evita en lo posible que dos
+        del mismo grupo se crucen en la primera ronda, cambiando al rival más
+        débil por el de otro cruce.
+        """
+        clasificados = self.clasificados(por_grupo, extra)
+        if len(clasificados) < 2:
+            raise ValueError("No hay suficientes clasificados")
+        tamaño = 1 << (len(clasificados) - 1).bit_length()
+        # Cruce de la primera ronda: el cabeza de serie s contra el tamaño + 1 - s
+        for s in range(tamaño // 2):
+            rival = tamaño - 1 - s
+            if rival >= len(clasificados) or clasificados[s][1] != clasificados[rival][1]:
+                continue
+            for otro in range(tamaño // 2, len(clasificados)):
+                pareja = tamaño - 1 - otro
+                if (otro != rival and clasificados[otro][1] != clasificados[s][1]
+                        and clasificados[rival][1] != clasificados[pareja][1]):
+                    clasificados[rival], clasificados[otro] = clasificados[otro], clasificados[rival]
+                    break
+        return Cuadro.generar([equipo for equipo, _ in clasificados])
+
+    # --- Formato en disco ---
+
+    def a_dict(self) -> dict:
+        return {"version": self.version, "grupos": self.grupos, "partidos": list(self.partidos.values())}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "FaseDeGrupos":
+        fase = cls(datos.get("grupos", {}))
+        fase.version = datos.get("version", 0)
+        for partido in datos.get("partidos", []):
+            fase._alta_partido(dict(partido))
+        return fase
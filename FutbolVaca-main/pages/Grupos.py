@@ -0,0 +1,92 @@
+from datetime import time
+
+import streamlit as st
+from compartido import ADMIN_PASSWORD, leer_resultado, obtener_registro, obtener_registro_grupos
+from grupos import FaseDeGrupos
+from registro import Conflicto
+
+st.set_page_config(page_title="Fase de grupos", page_icon="⚽", layout="wide")
+
+registro_grupos, registro_torneo = obtener_registro_grupos(), obtener_registro()
+fase = registro_grupos.actual()
+version_vista = st.session_state.get('version_vista_grupos')
+
+st.markdown("<h1 style='text-align: center;'>⚽ Fase de grupos ⚽</h1>", unsafe_allow_html=True)
+
+if not fase.grupos:
+    st.info("Todavía no se han hecho los grupos.")
+else:
+    # Clasificaciones: cada una se recalcula solo cuando cambia un resultado de su grupo
+    columnas = st.columns(4)
+    for i, letra in enumerate(fase.grupos):
+        with columnas[i % 4]:
+            st.markdown(f"**Grupo {letra}**")
+            st.dataframe(fase.clasificacion(letra), width='stretch')
+
+    st.markdown("### Calendario")
+    calendario = fase.calendario()
+    filtro = st.selectbox("Grupo", ["Todos"] + list(fase.grupos))
+    if filtro != "Todos":
+        calendario = calendario[calendario["Grupo"] == filtro]
+    st.dataframe(calendario.sort_values(["Hora", "Campo"]), width='stretch', hide_index=True)
+
+# Sección de administrador
+with st.expander("Opciones avanzadas"):
+    password = st.text_input("Contraseña", type="password")
+    if password == ADMIN_PASSWORD:
+        st.subheader("Crear los grupos")
+        inscritos = list(registro_torneo.actual().equipos.values())
+        texto = st.text_area("Equipos, uno por línea (el orden hace de bombo)", value="\n".join(inscritos))
+        equipos = [linea.strip() for linea in texto.splitlines() if linea.strip()]
+        c1, c2, c3, c4 = st.columns(4)
+        n_grupos = c1.number_input("Grupos", min_value=1, value=max(1, len(equipos) // 4))
+        campos = c2.number_input("Campos", min_value=1, value=4)
+        inicio = c3.time_input("Primer partido", value=time(10, 0), step=300)
+        minutos = c4.number_input("Minutos por partido", min_value=5, value=30, step=5)
+        if st.button("Generar grupos y calendario", help="Borra la fase de grupos que haya"):
+            try:
+                registro_grupos.reemplazar(FaseDeGrupos.generar(
+                    equipos, int(n_grupos), int(campos), inicio.strftime("%H:%M"), int(minutos)))
+                fase = registro_grupos.actual()
+                st.success(f"{len(fase.grupos)} grupos y {len(fase.partidos)} partidos")
+            except ValueError as e:
+                st.warning(str(e))
+
+        if fase.grupos:
+            st.subheader("Resultados")
+            grupo = st.selectbox("Grupo del partido", list(fase.grupos))
+            partido_seleccionado = st.selectbox(
+                "Partido",
+                options=[p["id"] for p in fase.partidos_de_grupo(grupo)],
+                format_func=lambda id_partido: "{hora} (campo {campo}) · {equipo1} - {equipo2}".format(**fase.partidos[id_partido]),
+            )
+            resultado = st.text_input("Resultado (formato: X-Y)")
+            if st.button("Actualizar resultado"):
+                goles = leer_resultado(resultado)
+                if not goles:
+                    st.warning("Por favor, ingresa un resultado válido en el formato X-Y.")
+                else:
+                    try:
+                        # Solo cambia este partido y la clasificación de su grupo
+                        registro_grupos.aplicar("poner_resultado", partido_seleccionado, *goles, base=version_vista)
+                        st.success("Resultado actualizado")
+                    except (Conflicto, ValueError, TimeoutError) as e:
+                        st.warning(str(e))
+
+            st.subheader("Pasar a eliminatorias")
+            c1, c2 = st.columns(2)
+            por_grupo = c1.number_input("Clasificados por grupo", min_value=1, value=2)
+            fijos = int(por_grupo) * len(fase.grupos)
+            extra = c2.number_input("Mejores de la siguiente posición", min_value=0, max_value=len(fase.grupos),
+                                    value=min(len(fase.grupos), (1 << (fijos - 1).bit_length()) - fijos))
+            if not fase.terminada():
+                st.caption("Aún quedan partidos de grupos por jugar: se usará la clasificación actual.")
+            if st.button("Sembrar el cuadro final", help="Sustituye el cuadro de eliminatorias"):
+                try:
+                    cuadro = fase.sembrar(int(por_grupo), int(extra))
+                    registro_torneo.reemplazar(cuadro)
+                    st.success(f"Cuadro de {len(cuadro.rondas)} rondas sembrado con los clasificados")
+                except ValueError as e:
+                    st.warning(str(e))
+
+st.session_state.version_vista_grupos = fase.version
@@ -0,0 +1,32 @@
+import streamlit as st
+from compartido import obtener_registro
+from prediccion import SIMULACIONES, simular
+
+st.set_page_config(page_title="Predicciones", page_icon="🔮", layout="centered")
+
+@st.cache_data(max_entries=4)
+def predecir(firma, _torneo):
+    # Se simula una vez por estado del torneo: un resultado nuevo cambia la firma
+    return simular(_torneo)
+
+st.markdown("<h1 style='text-align: center;'>🔮 Predicciones 🔮</h1>", unsafe_allow_html=True)
+
+torneo = obtener_registro().actual()
+if len(torneo.equipos) < 2 or not torneo.partidos:
+    st.info("Todavía no hay cuadro: las predicciones aparecen en cuanto se crean los partidos.")
+    st.stop()
+
+tabla = predecir(torneo.firma(), torneo)
+simulaciones = f"{SIMULACIONES:,}".replace(",", ".")
+st.caption(f"{simulaciones} simulaciones del resto del cuadro con los resultados que ya hay. "
+           "La fuerza de cada equipo (Elo) se ajusta con los goles de sus partidos.")
+
+st.markdown("### ¿Quién gana?")
+favoritos = tabla[tabla["Campeón"] > 0]["Campeón"].head(10)
+st.bar_chart(favoritos * 100, horizontal=True, y_label="% de ser campeón", x_label="")
+
+st.markdown("### Probabilidad de llegar a cada ronda")
+st.dataframe(tabla, width='stretch', column_config={
+    columna: st.column_config.ProgressColumn(columna, min_value=0, max_value=1, format="percent")
+    for columna in tabla.columns[1:]
+})
@@ -0,0 +1,173 @@
+"""
+Torneo compartido entre sesiones y procesos (el cuadro, o cualquier otro
+modelo con la misma forma: `version`, `partidos`, `a_dict`/`desde_dict` y
+sus OPERACIONES, como la fase de grupos), guardado en la base de datos
+compartida por las apps.
+
+- La instantánea es un documento con el torneo completo y su número de
+  versión.
+- Cada cambio (un resultado, un equipo, un partido) es una entrada en el
+  diario del torneo con la versión siguiente; no se reescribe el torneo.
+- Cada COMPACTAR_CADA parches se guarda una instantánea nueva y se vacía el
+  diario, todo en la misma transacción.
+- Las escrituras van en una transacción BEGIN IMMEDIATE de SQLite, así que
+  dos árbitros (aunque estén en procesos distintos) nunca pisan el mismo
+  número de versión.
+- Compare-and-swap por partido: quien escribe dice qué versión estaba viendo.
+  Si desde entonces otro ha cambiado ese mismo partido, se rechaza con
+  Conflicto. Si solo han cambiado otros partidos, el cambio se aplica sobre
+  la versión nueva (se reintenta, en vez de fallar).
+- La copia en memoria es única por proceso y se pone al día mirando el
+  contador de cambios del diario: sin cambios, leer el torneo es una
+  consulta por clave; con cambios, solo se leen las entradas nuevas.
+- Cada versión en memoria es una instantánea que no se vuelve a modificar:
+  los cambios (propios o leídos del diario) se aplican sobre una copia que
+  sustituye a la anterior de golpe. Quien la esté leyendo (pintando el
+  cuadro, calculando la firma, simulando) sigue con la suya sin bloqueos.
+- La primera vez se importa el antiguo `torneo.json`, si existe.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from almacen import Diario, Documentos
+from cuadro import Cuadro
+
+COMPACTAR_CADA = 200
+
+
+class Conflicto(Exception):
+    """Otro ha cambiado el partido después de que lo viera quien intenta escribir."""
+
+
+class RegistroTorneo:
+    def __init__(self, bd, clave: str, clase=Cuadro, ruta_antigua=None):
+        self.bd = bd
+        self.clave = clave
+        self.clase = clase
+        self.documentos = Documentos(bd, "futbolvaca", cache=False)  # El modelo se reconstruye y se modifica
+        self.diario = Diario(bd, f"futbolvaca/{clave}")
+        self._lock = threading.RLock()
+        self._cuadro = None
+        self._contador = None  # Contador de cambios del diario cuando se puso al día la copia
+        self._ultimo = 0  # id de la última entrada del diario ya aplicada
+        self._parches = 0  # parches desde la última instantánea
+        bd.migrar(f"futbolvaca/{clave}", [lambda con: self._importar(ruta_antigua)])
+
+    # --- Lectura ---
+
+    def actual(self):
+        """
+        El torneo al día, como instantánea de solo lectura: no cambia aunque
+        luego se escriba. No lo modifiques: los cambios van por `aplicar` o
+        `reemplazar`.
+        """
+        with self._lock:
+            return self._refrescar()
+
+    def _refrescar(self):
+        # El contador se lee primero: si alguien escribe mientras tanto, la próxima vez se vuelve a mirar
+        contador = self.bd.contador(self.diario.ambito)
+        if self._cuadro is not None and contador == self._contador:
+            return self._cuadro
+        instantanea = self.documentos.leer(self.clave) or {}
+        cuadro, ultimo, parches = self._cuadro, self._ultimo, self._parches
+        # Otra instantánea más nueva (se compactó o se reemplazó el torneo): se parte de ella
+        if cuadro is None or instantanea.get("version", 0) > cuadro.version:
+            cuadro = self.clase.desde_dict(instantanea) if instantanea else self.clase()
+            ultimo = parches = 0  # Lo que queda en el diario es todo posterior a la instantánea
+        entradas = self.diario.entradas(ultimo)
+        if entradas and cuadro is self._cuadro:
+            cuadro = self._copia(cuadro)  # La publicada no se toca: otros la pueden estar leyendo
+        for id_parche, parche in entradas:
+            self._aplicar_parche(cuadro, parche)
+            ultimo = id_parche
+            parches += 1
+        self._cuadro, self._ultimo, self._parches = cuadro, ultimo, parches
+        self._contador = contador
+        return cuadro
+
+    def _copia(self, cuadro):
+        # a_dict solo lee los datos (nunca las cachés que rellenan los lectores) y desde_dict copia cada partido
+        return self.clase.desde_dict(cuadro.a_dict())
+
+    @staticmethod
+    def _aplicar_parche(cuadro, parche: dict):
+        if parche["version"] <= cuadro.version:
+            return  # Ya está en la instantánea
+        cuadro.version = parche["version"]
+        getattr(cuadro, parche["op"])(*parche["args"])
+
+    # --- Escritura ---
+
+    def aplicar(self, op: str, *args, base=None) -> int:
+        """
+        Aplica una operación del modelo y la apunta en el diario. `base` es la
+        versión que veía quien escribe: si el partido ha cambiado desde
+        entonces, lanza Conflicto. Devuelve la versión nueva.
+        """
+        if op not in self.clase.OPERACIONES:
+            raise ValueError(f"Operación desconocida: {op}")
+        with self._lock:
+            with self._escritura():
+                cuadro = self._refrescar()
+                if base is not None and op in self.clase.OPERACIONES_PARTIDO:
+                    partido = cuadro.partidos.get(args[0])
+                    if partido is None or partido["version"] > base:
+                        raise Conflicto("Otro árbitro ha cambiado este partido; revisa el cuadro y vuelve a intentarlo")
+                # Se cambia una copia: si la operación falla, la publicada sigue como estaba
+                cuadro = self._copia(cuadro)
+                version = cuadro.version + 1
+                cuadro.version = version
+                getattr(cuadro, op)(*args)
+                self._ultimo = self.diario.anotar({"version": version, "op": op, "args": list(args)})
+                self._parches += 1
+                if self._parches >= COMPACTAR_CADA:
+                    self._compactar(cuadro)
+            self._cuadro = cuadro  # Ya confirmada en la base de datos
+            return version
+
+    def reemplazar(self, cuadro) -> int:
+        """
+        Sustituye el torneo entero (p. ej. al generar el cuadro) con una
+        instantánea nueva. `cuadro` pasa a ser la versión publicada: no lo
+        modifiques después.
+        """
+        with self._lock:
+            with self._escritura():
+                version = self._refrescar().version + 1
+                cuadro.version = version
+                for partido in cuadro.partidos.values():
+                    partido["version"] = version  # Cualquier vista anterior queda obsoleta
+                self._compactar(cuadro)
+            self._cuadro = cuadro
+            return version
+
+    @contextmanager
+    def _escritura(self):
+        """Una transacción de escritura; si no llega a confirmarse, la copia en memoria se descarta y se relee."""
+        try:
+            with self.bd.transaccion():
+                yield
+        except sqlite3.Error:
+            self._cuadro = None
+            raise
+        self._contador = None  # Nuestro propio cambio ha movido el contador
+
+    def _compactar(self, cuadro):
+        """Guarda la instantánea y vacía el diario. Se llama dentro de la transacción de escritura."""
+        self.documentos.guardar(self.clave, cuadro.a_dict())
+        self.diario.vaciar()
+        self._parches = 0
+
+    # --- Migración ---
+
+    def _importar(self, ruta_antigua):
+        """El antiguo `torneo.json` (de cualquier formato), como primera instantánea."""
+        if not ruta_antigua or not os.path.exists(ruta_antigua):
+            return
+        with open(ruta_antigua, "r") as f:
+            datos = json.load(f)
+        self._compactar(self.clase.desde_dict(datos) if datos else self.clase())
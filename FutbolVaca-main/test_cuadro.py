@@ -0,0 +1,22 @@
+import json
+import os
+
+from cuadro import Cuadro
+
+TORNEO_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "torneo.json")
+
+
+def test_migrar_lleva_los_ganadores_a_la_ronda_siguiente():
+    with open(TORNEO_FILE, "r") as f:
+        cuadro = Cuadro.desde_dict(json.load(f))
+    jugados = 0
+    for ronda in cuadro.rondas[:-1]:
+        for partido in cuadro.partidos_de_ronda(ronda):
+            ganador = cuadro.ganador(partido)
+            if ganador is None:
+                continue
+            jugados += 1
+            ronda_siguiente = cuadro.siguiente(partido)[0]
+            equipos = {p[lado] for p in cuadro.partidos_de_ronda(ronda_siguiente) for lado in ("equipo1", "equipo2")}
+            assert ganador in equipos, f"{cuadro.nombre(ganador)} no aparece en {ronda_siguiente}"
+    assert jugados > 0
@@ -1,10 +1,22 @@
-import streamlit as st
-import pandas as pd
+import json
 import os
 
+import pandas as pd
+import streamlit as st
+from archivo import DIRECTORIO_EDICIONES, ArchivoEdiciones
+from almacen import abrir
+from directo import arrancar_directo
+from marcador import Marcador
+from reglas import Reglas
+
+# Edición, pruebas, pesos, puntos por puesto y desempates
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "granprix.json")
+with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+    CONFIG = json.load(f)
+
 # Configuración de la página
 st.set_page_config(
-    page_title="XVI Grand Prix Peñero 2024",
+    page_title=CONFIG["edicion"],
     page_icon="🏆",
     layout="centered",  # Cambiado de "wide" a "centered"
     initial_sidebar_state="collapsed",  # Cambiado de "expanded" a "collapsed"
@@ -13,43 +25,36 @@ st.set_page_config(
 
 # Constantes
 ADMIN_PASSWORD = "Admin1"
+# Archivo antiguo, se importa una vez en la base de datos compartida (tabla y diario de cambios)
 PUNTUACIONES_FILE = "puntuaciones.csv"
-PRUEBAS = ['Columnas Locas', 'Atrapa el banderín', 'Cuerda y coraje', 'Encesta y Escapa', 'La Muerte']
+INTERVALO_DIRECTO = 3  # Segundos entre comprobaciones de la tabla en cada pantalla
+# Servidor de cambios (long-poll/SSE) para pantallas externas, desactivado si granprix.json no
+# tiene la sección "directo", p. ej. {"puerto": 8765, "host": "127.0.0.1", "origen": null, "max_conexiones": 16}
+CONFIG_DIRECTO = CONFIG.get("directo")
 
 # Funciones auxiliares
-def borrar_datos():
-    if os.path.exists(PUNTUACIONES_FILE):
-        os.remove(PUNTUACIONES_FILE)
-    if 'df_puntuaciones' in st.session_state:
-        del st.session_state.df_puntuaciones
-
-def cargar_puntuaciones():
-    if os.path.exists(PUNTUACIONES_FILE):
-        try:
-            df = pd.read_csv(PUNTUACIONES_FILE)
-            if not all(col in df.columns for col in ['Peñes'] + PRUEBAS + ['Total']):
-                raise KeyError
-            df['Total'] = df[PRUEBAS].sum(axis=1)
-        except (KeyError, pd.errors.EmptyDataError):
-            df = crear_df_vacio()
-            st.warning("Se ha detectado un cambio en las pruebas o un archivo corrupto. Se ha creado una nueva tabla de puntuaciones.")
-    else:
-        df = crear_df_vacio()
-    df = df.sort_values('Total', ascending=False).reset_index(drop=True)
-    df.index = df.index + 1  # Añadir esta línea para que el índice empiece en 1
-    return df
-
-def crear_df_vacio():
-    return pd.DataFrame(columns=['Peñes'] + PRUEBAS + ['Total'])
-
-def guardar_puntuaciones(df):
-    df.to_csv(PUNTUACIONES_FILE, index=False)
-
-def actualizar_puntuaciones(df):
-    df['Total'] = df[PRUEBAS].sum(axis=1)
-    df = df.sort_values('Total', ascending=False).reset_index(drop=True)
-    df.index = df.index + 1  # Añadir esta línea para que el índice empiece en 1
-    return df
+@st.cache_resource
+def obtener_marcador():
+    # Un único marcador por proceso: todos los jueces escriben sobre el mismo
+    return Marcador(Reglas(CONFIG), abrir(), PUNTUACIONES_FILE)
+
+def guardar(cambio, *args):
+    """Aplica un cambio del marcador; si no se ha podido guardar, avisa y devuelve None (la tabla sigue igual)."""
+    try:
+        return cambio(*args)
+    except TimeoutError as e:
+        st.error(f"No se ha guardado el cambio: {e}")
+        return None
+
+@st.cache_resource
+def obtener_archivo():
+    return ArchivoEdiciones(DIRECTORIO_EDICIONES)
+
+@st.cache_resource
+def obtener_directo():
+    if not CONFIG_DIRECTO:
+        return None
+    return arrancar_directo(obtener_marcador(), **CONFIG_DIRECTO)
 
 def highlight_max(s):
     is_max = s == s.max()
@@ -60,15 +65,41 @@ def highlight_first_team(df):
 
 def get_styled_df(df):
     return df.style\
-        .apply(highlight_max, subset=PRUEBAS + ['Total'])\
+        .apply(highlight_max, subset=df.columns[1:])\
         .apply(highlight_first_team, subset=['Peñes'])
 
+ESTILO_TABLA = [
+    {'selector': '', 'props': 'width: 100%; border-collapse: collapse; font-size: 14px;'},
+    {'selector': 'th, td', 'props': 'border-bottom: 1px solid rgba(128, 128, 128, 0.3); padding: 4px 8px;'},
+    {'selector': 'td', 'props': 'text-align: right;'},
+]
+
+@st.cache_data(max_entries=8)
+def get_tabla_html(version):
+    # Una sola renderización por versión de los datos, compartida por todas las sesiones
+    return get_styled_df(obtener_marcador().dataframe()).set_table_styles(ESTILO_TABLA).to_html()
+
+@st.fragment(run_every=INTERVALO_DIRECTO)
+def tabla_en_directo():
+    # Solo se vuelve a ejecutar este fragmento; la tabla se pide de nuevo solo si cambió la versión
+    marcador = obtener_marcador()
+    if st.session_state.get('version_tabla') != marcador.version:
+        st.session_state.version_tabla = marcador.version
+        st.session_state.tabla_html = get_tabla_html(marcador.version)
+    st.html(st.session_state.tabla_html)
+
 # Cargar puntuaciones al inicio
-if 'df_puntuaciones' not in st.session_state:
-    st.session_state.df_puntuaciones = cargar_puntuaciones()
+try:
+    marcador = obtener_marcador()
+except (ValueError, KeyError) as e:
+    st.error(f"No se ha podido leer la configuración del Grand Prix ({CONFIG_FILE}): {e}")
+    st.stop()
+obtener_directo()
+if marcador.aviso:
+    st.warning(marcador.aviso)
 
 # Título principal
-st.markdown("<h1 style='text-align: center; font-size: 24px;'>🏆🐂 XVI Grand Prix Peñero 2024 🐂🏆</h1>", unsafe_allow_html=True)
+st.markdown(f"<h1 style='text-align: center; font-size: 24px;'>🏆🐂 {CONFIG['edicion']} 🐂🏆</h1>", unsafe_allow_html=True)
 
 # Mostrar el dataframe principal
 st.markdown("<h2 style='text-align: center; font-size: 20px;'>Puntuaciones</h2>", unsafe_allow_html=True)
@@ -76,72 +107,123 @@ st.markdown("<h2 style='text-align: center; font-size: 20px;'>Puntuaciones</h2>"
 # Eliminamos las columnas y mostramos el dataframe a ancho completo
 #st.dataframe(get_styled_df(st.session_state.df_puntuaciones), use_container_width=True)
 
-st.table(get_styled_df(st.session_state.df_puntuaciones))
+tabla = st.empty()
 
 # Sección de administrador (disimulada)
 with st.expander("Opciones avanzadas"):
     password = st.text_input("Contraseña", type="password")
 
     if password == ADMIN_PASSWORD:
-        df = st.session_state.df_puntuaciones.copy()  # Trabajar con una copia
-        
         # Seleccionar la prueba a modificar
-        prueba_seleccionada = st.selectbox("Seleccionar prueba", PRUEBAS)
+        prueba_seleccionada = st.selectbox("Seleccionar prueba", marcador.pruebas)
         st.markdown(f"### Resultados para {prueba_seleccionada}")
-        
-        for peña in df['Peñes']:
-            puntuacion = st.number_input(f"Puntuación para {peña}", value=df.loc[df['Peñes'] == peña, prueba_seleccionada].values[0], key=f"{peña}_{prueba_seleccionada}_{df.index[df['Peñes'] == peña][0]}")
-            df.loc[df['Peñes'] == peña, prueba_seleccionada] = puntuacion  # Actualizar puntuación directamente
+        if prueba_seleccionada in marcador.reglas.por_puesto:
+            st.caption("En esta prueba se apunta la marca (0 = no presentada); los puntos salen del puesto.")
+
+        # Toda la prueba en una tabla editable, por orden alfabético para que las filas no se muevan.
+        # La tabla se queda como se cargó aunque otro juez guarde mientras tanto: así no se pierde lo
+        # que se está editando, y al guardar se compara con la versión de la que partió
+        clave_base = f"base_{prueba_seleccionada}"
+        clave_editor = f"editor_{prueba_seleccionada}"
+        if clave_base not in st.session_state or st.button("Recargar con los últimos datos"):
+            peñas_prueba = sorted(marcador.peñas)
+            st.session_state[clave_base] = (marcador.version, pd.DataFrame({
+                'Peñes': peñas_prueba,
+                prueba_seleccionada: [marcador.valor(peña, prueba_seleccionada) for peña in peñas_prueba],
+            }))
+            st.session_state.pop(clave_editor, None)
+        version_base, tabla_prueba = st.session_state[clave_base]
+        if marcador.version != version_base:
+            st.info("Otro juez ha guardado cambios desde que se cargó esta tabla: al actualizar se guardan "
+                    "solo las celdas que has tocado tú.")
+        editada = st.data_editor(tabla_prueba, disabled=['Peñes'], hide_index=True, width='stretch',
+                                 key=clave_editor)
+
+        archivo_csv = st.file_uploader("O cargar un CSV con las columnas Peñes y Puntuación", type=['csv'],
+                                       key=f"csv_{prueba_seleccionada}")
 
         if st.button("Actualizar puntuaciones"):
-            df = actualizar_puntuaciones(df)
-            st.success("Puntuaciones actualizadas")
-            guardar_puntuaciones(df)
-            st.session_state.df_puntuaciones = df  # Actualizar el estado
+            conflictos = []
+            if archivo_csv is not None:
+                try:
+                    cargada = pd.read_csv(archivo_csv)
+                    columna = prueba_seleccionada if prueba_seleccionada in cargada.columns else 'Puntuación'
+                    valores = dict(zip(cargada['Peñes'].astype(str), cargada[columna].fillna(0).astype(int)))
+                except (KeyError, ValueError, pd.errors.ParserError, pd.errors.EmptyDataError):
+                    st.error("El CSV debe tener las columnas Peñes y Puntuación (o el nombre de la prueba)")
+                    st.stop()
+                desconocidas = [peña for peña in valores if peña not in marcador]
+                if desconocidas:
+                    st.warning(f"Peñas que no están en la tabla (se ignoran): {', '.join(desconocidas)}")
+            else:
+                # Solo lo que ha cambiado este juez respecto a la tabla que cargó
+                base = dict(zip(tabla_prueba['Peñes'], tabla_prueba[prueba_seleccionada]))
+                nuevos = dict(zip(editada['Peñes'], editada[prueba_seleccionada].fillna(0).astype(int)))
+                valores = {peña: valor for peña, valor in nuevos.items() if valor != base[peña]}
+                # Si otro juez cambió la misma celda mientras tanto, se queda su valor
+                conflictos = [peña for peña, valor in valores.items()
+                              if peña in marcador and marcador.valor(peña, prueba_seleccionada) not in (base[peña], valor)]
+                for peña in conflictos:
+                    del valores[peña]
+                if conflictos:
+                    st.warning(f"Otro juez ya había cambiado {', '.join(conflictos)} en esta prueba: se mantiene su "
+                               "puntuación. Revisa la tabla recargada y vuelve a guardar si hace falta.")
+                elif not valores:
+                    st.info("No has cambiado ninguna puntuación.")
+            # Solo se tocan (y se guardan) las celdas que han cambiado
+            cambios = guardar(marcador.actualizar_prueba, prueba_seleccionada, valores) if valores else None
+            if cambios is not None:
+                st.success(f"Puntuaciones actualizadas ({cambios} cambios)")
+            if cambios is not None or conflictos:
+                st.session_state.pop(clave_base, None)  # La próxima vez la tabla se carga con lo guardado
 
         nueva_peña = st.text_input("Añadir nueva peña")
-        if st.button("Añadir peña") and nueva_peña and nueva_peña not in df['Peñes'].tolist():
-            nueva_fila = pd.DataFrame({'Peñes': [nueva_peña], **{prueba: [0] for prueba in PRUEBAS}, 'Total': [0]})
-            df = pd.concat([df, nueva_fila], ignore_index=True)
-            df = actualizar_puntuaciones(df)
-            st.success(f"Peña {nueva_peña} añadida")
-            guardar_puntuaciones(df)
-            st.session_state.df_puntuaciones = df  # Actualizar el estado
-
-        peña = st.selectbox("Seleccionar Peña para editar/eliminar", options=df['Peñes'].tolist())
+        if st.button("Añadir peña") and nueva_peña and nueva_peña not in marcador:
+            if guardar(marcador.añadir_peña, nueva_peña) is not None:
+                st.success(f"Peña {nueva_peña} añadida")
+
+        peña = st.selectbox("Seleccionar Peña para editar/eliminar", options=marcador.ranking())
         
         if peña:
             puntuaciones = {}
-            for prueba in PRUEBAS:
-                puntuaciones[prueba] = st.number_input(prueba, value=df.loc[df['Peñes'] == peña, prueba].values[0], key=f"{peña}_{prueba}")
+            for prueba in marcador.pruebas:
+                puntuaciones[prueba] = st.number_input(prueba, value=marcador.valor(peña, prueba), key=f"{peña}_{prueba}")
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Actualizar"):
-                    df.loc[df['Peñes'] == peña, PRUEBAS] = list(puntuaciones.values())
-                    df = actualizar_puntuaciones(df)
-                    st.success(f"Puntuaciones actualizadas para la peña {peña}")
-                    guardar_puntuaciones(df)
-                    st.session_state.df_puntuaciones = df  # Actualizar el estado
+                    if guardar(marcador.actualizar_peña, peña, puntuaciones) is not None:
+                        st.success(f"Puntuaciones actualizadas para la peña {peña}")
             
             with col2:
                 if st.button("Eliminar"):
-                    df = df[df['Peñes'] != peña]
-                    df = actualizar_puntuaciones(df)
-                    st.success(f"Peña {peña} eliminada")
-                    guardar_puntuaciones(df)
-                    st.session_state.df_puntuaciones = df  # Actualizar el estado
+                    if guardar(marcador.eliminar_peña, peña) is not None:
+                        st.success(f"Peña {peña} eliminada")
+
+        st.markdown("---")
+        st.markdown("### Archivar edición")
+        st.caption(f"Guarda la clasificación y los cambios de «{CONFIG['edicion']}» en el histórico "
+                   "(si ya estaba archivada, se reemplaza).")
+        if st.button("Archivar edición", disabled=not len(marcador)):
+            obtener_archivo().archivar(CONFIG['edicion'], CONFIG['año'], marcador)
+            st.success(f"Edición {CONFIG['edicion']} archivada")
 
         st.markdown("---")
         st.markdown("### Borrar todos los datos")
-        st.warning("¡Cuidado! Esta acción borrará todos los datos y no se puede deshacer.")
+        st.warning("¡Cuidado! Esta acción borrará todos los datos. La edición se archiva antes de borrarla.")
         
         confirmacion = st.checkbox("Estoy seguro de que quiero borrar todos los datos")
         
         if st.button("Borrar todos los datos", disabled=not confirmacion):
-            borrar_datos()
+            if len(marcador):
+                obtener_archivo().archivar(CONFIG['edicion'], CONFIG['año'], marcador)
+            marcador.borrar()
             st.success("Todos los datos han sido borrados")
-            st.experimental_rerun()
+            st.rerun()
+
+# La tabla se dibuja al final para que ya incluya los cambios de esta ejecución
+with tabla.container():
+    tabla_en_directo()
 
 # Pie de página
 st.markdown("---")
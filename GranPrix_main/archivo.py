@@ -0,0 +1,126 @@
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Junto a la app, se lance desde donde se lance
+DIRECTORIO_EDICIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ediciones")
+
+# Columnas del archivo: una fila por peña y prueba de cada edición
+COLUMNAS_PUNTOS = ["edicion", "año", "peña", "prueba", "marca", "puntos", "total", "puesto"]
+COLUMNAS_EVENTOS = ["edicion", "año", "hora", "op", "peña", "prueba", "valor"]
+
+
+def _nombre_archivo(edicion: str) -> str:
+    return re.sub(r"[^\w-]+", "-", edicion).strip("-") or "edicion"
+
+
+class ArchivoEdiciones:
+    """
+    Histórico de ediciones en Feather sin comprimir: dos archivos por edición
+    (puntos y eventos) que se leen con memory_map, así que abrirlos no copia
+    nada hasta que se usan las columnas.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _rutas(self, sufijo: str) -> list:
+        return sorted(
+            os.path.join(self.directorio, archivo)
+            for archivo in os.listdir(self.directorio) if archivo.endswith(sufijo)
+        )
+
+    def firma(self) -> tuple:
+        """Cambia en cuanto se archiva o se reemplaza una edición; sirve de clave de caché."""
+        return tuple((ruta, os.stat(ruta).st_mtime_ns) for ruta in self._rutas(".feather"))
+
+    def ediciones(self) -> list:
+        """Nombres de las ediciones archivadas, de la más antigua a la más reciente."""
+        puntos = self.puntos()
+        return list(puntos.sort_values("año")["edicion"].unique()) if len(puntos) else []
+
+    # --- Escritura ---
+
+    def archivar(self, edicion: str, año: int, marcador) -> str:
+        """Guarda (o reemplaza) una edición con sus puntos y su historial de cambios."""
+        df = marcador.dataframe()
+        marcas = pd.DataFrame([marcador.valores(peña) for peña in df['Peñes']], columns=marcador.pruebas)
+        n = len(df)
+        puntos = pd.DataFrame({
+            "edicion": edicion,
+            "año": int(año),
+            "peña": df['Peñes'].repeat(len(marcador.pruebas)).to_numpy(),
+            "prueba": marcador.pruebas * n,
+            "marca": marcas.to_numpy().ravel(),
+            "puntos": df[marcador.pruebas].to_numpy().ravel(),
+            "total": df['Total'].repeat(len(marcador.pruebas)).to_numpy(),
+            "puesto": df.index.repeat(len(marcador.pruebas)).to_numpy(),
+        }, columns=COLUMNAS_PUNTOS)
+        eventos = pd.DataFrame(marcador.historial(), columns=COLUMNAS_EVENTOS[2:])
+        eventos.insert(0, "año", int(año))
+        eventos.insert(0, "edicion", edicion)
+
+        base = os.path.join(self.directorio, _nombre_archivo(edicion))
+        self._escribir(puntos, base + ".puntos.feather")
+        self._escribir(eventos.astype({"prueba": object, "valor": "Int64"}), base + ".eventos.feather")
+        return base
+
+    @staticmethod
+    def _escribir(df: pd.DataFrame, ruta: str):
+        temporal = ruta + ".tmp"
+        feather.write_feather(df, temporal, compression="uncompressed")
+        os.replace(temporal, ruta)
+
+    # --- Lectura ---
+
+    def _leer(self, sufijo: str, columnas: list) -> pd.DataFrame:
+        tablas = [feather.read_table(ruta, memory_map=True) for ruta in self._rutas(sufijo)]
+        if not tablas:
+            return pd.DataFrame(columns=columnas)
+        return pa.concat_tables(tablas, promote_options="default").to_pandas()
+
+    def puntos(self) -> pd.DataFrame:
+        return self._leer(".puntos.feather", COLUMNAS_PUNTOS)
+
+    def eventos(self) -> pd.DataFrame:
+        return self._leer(".eventos.feather", COLUMNAS_EVENTOS)
+
+
+# --- Análisis (todo con group-bys, sin recorrer filas) ---
+
+def totales_por_edicion(puntos: pd.DataFrame) -> pd.DataFrame:
+    """Total de cada peña por edición (filas: ediciones por año, columnas: peñas); puede haber varias el mismo año."""
+    orden = puntos.drop_duplicates("edicion").sort_values("año", kind="stable")["edicion"]
+    totales = puntos.drop_duplicates(["edicion", "peña"]).pivot(index="edicion", columns="peña", values="total")
+    return totales.reindex(orden)
+
+
+def clasificacion_historica(puntos: pd.DataFrame) -> pd.DataFrame:
+    por_edicion = puntos.drop_duplicates(["edicion", "peña"])
+    clasificacion = por_edicion.groupby("peña").agg(
+        Ediciones=("edicion", "nunique"),
+        Victorias=("puesto", lambda puestos: int((puestos == 1).sum())),
+        Podios=("puesto", lambda puestos: int((puestos <= 3).sum())),
+        Puntos=("total", "sum"),
+        Mejor_puesto=("puesto", "min"),
+        Puesto_medio=("puesto", "mean"),
+    )
+    clasificacion = clasificacion.sort_values(["Victorias", "Podios", "Puntos"], ascending=False)
+    clasificacion.index.name = "Peñes"
+    return clasificacion.rename(columns={"Mejor_puesto": "Mejor puesto", "Puesto_medio": "Puesto medio"})
+
+
+def records_por_prueba(puntos: pd.DataFrame) -> pd.DataFrame:
+    """La mejor puntuación de cada prueba en todas las ediciones."""
+    mejores = puntos.loc[puntos.groupby("prueba")["puntos"].idxmax(), ["prueba", "puntos", "peña", "edicion"]]
+    return mejores.set_index("prueba").sort_index()
+
+
+def cambios_por_edicion(eventos: pd.DataFrame) -> pd.DataFrame:
+    """Cuántas veces se tocó cada prueba en cada edición."""
+    cambios = eventos[eventos["op"] == "puntos"]
+    return cambios.groupby(["edicion", "prueba"]).size().unstack(fill_value=0)
@@ -0,0 +1,101 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ESPERA_MAXIMA = 25  # Segundos que se retiene una petición de long-poll
+LATIDO = 15  # Segundos entre comentarios vacíos en el SSE para que no se cierre la conexión
+MAX_CONEXIONES = 16  # Pantallas conectadas a la vez; las demás reciben un 503
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    """
+    GET /cambios?desde=N   long-poll: responde en cuanto la versión deja de ser N
+    GET /eventos           SSE: un evento por cada cambio (admite Last-Event-ID)
+    Solo se envían las filas que han cambiado desde la versión del cliente.
+    """
+
+    marcador = None
+    origen = None  # Origen admitido por CORS; None no envía la cabecera
+    plazas = None  # threading.BoundedSemaphore con las conexiones que quedan libres
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path not in ("/cambios", "/eventos"):
+            self.send_error(404)
+            return
+        # Cada petición retiene un hilo hasta ESPERA_MAXIMA (o para siempre en SSE)
+        if not self.plazas.acquire(blocking=False):
+            self.send_error(503, "Demasiadas conexiones")
+            return
+        try:
+            if url.path == "/cambios":
+                self._long_poll(self._entero(parse_qs(url.query).get("desde", [None])[0]))
+            else:
+                self._sse(self._entero(self.headers.get("Last-Event-ID")))
+        finally:
+            self.plazas.release()
+
+    @staticmethod
+    def _entero(valor):
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+
+    def _cabeceras(self, tipo: str):
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Cache-Control", "no-cache")
+        if self.origen:
+            self.send_header("Access-Control-Allow-Origin", self.origen)
+
+    def _long_poll(self, desde):
+        if desde is not None:
+            self.marcador.esperar(desde, timeout=ESPERA_MAXIMA)
+        cuerpo = json.dumps(self.marcador.cambios_desde(desde), ensure_ascii=False).encode()
+        self._cabeceras("application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _sse(self, desde):
+        self._cabeceras("text/event-stream; charset=utf-8")
+        self.end_headers()
+        try:
+            while True:
+                if desde is None or desde != self.marcador.version:
+                    cambios = self.marcador.cambios_desde(desde)
+                    desde = cambios["version"]
+                    datos = json.dumps(cambios, ensure_ascii=False)
+                    self.wfile.write(f"id: {desde}\ndata: {datos}\n\n".encode())
+                elif not self.marcador.esperar(desde, timeout=LATIDO):
+                    self.wfile.write(b": latido\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente se ha ido
+
+    def log_message(self, format, *args):
+        pass  # Sin una línea por petición en la consola de Streamlit
+
+
+def arrancar_directo(marcador, puerto: int, host="127.0.0.1", origen=None, max_conexiones=MAX_CONEXIONES):
+    """
+    Arranca el servidor de cambios en un hilo aparte y lo devuelve, o None si
+    el puerto ya está ocupado (por ejemplo, por otra instancia de la app).
+    No tiene autenticación: por defecto solo escucha en la propia máquina;
+    para pantallas en otra, `host="0.0.0.0"` en una red de confianza.
+    `origen` es la web que puede leerlo desde el navegador (CORS).
+    """
+    manejador = type("Manejador", (_Manejador,), {
+        "marcador": marcador,
+        "origen": origen,
+        "plazas": threading.BoundedSemaphore(max_conexiones),
+    })
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), manejador)
+    except OSError:
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="granprix-directo", daemon=True).start()
+    return servidor
@@ -0,0 +1,353 @@
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from almacen import Diario, Documentos
+
+INSTANTANEA = "marcas"  # Documento con la tabla completa
+
+registro = logging.getLogger(__name__)
+
+
+class Marcador:
+    """
+    Tabla de puntuaciones en memoria con índice peña -> fila.
+    Se guarda lo que apuntan los jueces (`marcas`); los puntos, totales y el
+    ranking los calculan las `Reglas` de una vez para toda la tabla y solo
+    cuando se consultan después de un cambio. Cada cambio se apunta en el
+    diario de la base de datos (que hace también de historial de la edición)
+    y cada `eventos_por_snapshot` eventos se guarda la tabla completa con el
+    último evento que incluye.
+    Cada peña recuerda la versión de su último cambio, así que se puede pedir
+    solo lo que ha cambiado desde una versión (`cambios_desde`) o esperar a
+    que cambie algo (`esperar`).
+    """
+
+    def __init__(self, reglas, bd, ruta_csv=None, eventos_por_snapshot=50):
+        self.reglas = reglas
+        self.pruebas = reglas.pruebas
+        self.columna = reglas.columna  # También con los nombres anteriores de cada prueba
+        self.bd = bd
+        self.documentos = Documentos(bd, "granprix", cache=False)  # Solo se lee al arrancar
+        self.diario = Diario(bd, "granprix")
+        # El CSV de antes: se importa la primera vez
+        self.ruta_csv = ruta_csv
+        self.eventos_por_snapshot = eventos_por_snapshot
+        self.aviso = None  # Mensaje para el usuario si la tabla guardada no se pudo usar entera
+        self.version = 0  # Sube con cada cambio; sirve de clave para las cachés
+        self._lock = threading.RLock()
+        self._cambio = threading.Condition(self._lock)
+        self._version_base = 0  # Antes de esta versión no hay detalle: hay que pedirlo todo
+        self._reiniciar()
+        self._cargar()
+
+    def _reiniciar(self):
+        self.peñas = []  # fila -> peña
+        self.indice = {}  # peña -> fila
+        self.marcas = np.zeros((16, len(self.pruebas)), dtype=np.int64)
+        self._calculo = None  # (puntos, total, orden, puesto) o None si hay que recalcular
+        self._eventos_pendientes = 0
+        self._ultimo = 0  # id en el diario del último evento aplicado
+        self._version_peña = {}  # peña -> versión de su último cambio
+        self._bajas = {}  # peña eliminada -> versión en que se eliminó
+
+    # --- Consultas ---
+
+    def __len__(self):
+        return len(self.peñas)
+
+    def __contains__(self, peña):
+        return peña in self.indice
+
+    def valor(self, peña: str, prueba: str) -> int:
+        """Lo apuntado (puntos o marca) para una peña en una prueba."""
+        return int(self.marcas[self.indice[peña], self.columna[prueba]])
+
+    def valores(self, peña: str) -> dict:
+        fila = self.marcas[self.indice[peña]]
+        return {prueba: int(fila[j]) for j, prueba in enumerate(self.pruebas)}
+
+    def _calcular(self):
+        if self._calculo is None:
+            n = len(self.peñas)
+            puntos = self.reglas.puntos(self.marcas[:n])
+            total, orden = self.reglas.ordenar(puntos, self.peñas)
+            puesto = np.empty(n, dtype=np.int64)
+            puesto[orden] = np.arange(1, n + 1)
+            self._calculo = (puntos, total, orden, puesto)
+        return self._calculo
+
+    def posicion(self, peña: str) -> int:
+        """Puesto en el ranking (empezando en 1)."""
+        with self._lock:
+            return int(self._calcular()[3][self.indice[peña]])
+
+    def ranking(self) -> list:
+        """Peñas de primera a última."""
+        with self._lock:
+            return [self.peñas[fila] for fila in self._calcular()[2]]
+
+    def dataframe(self) -> pd.DataFrame:
+        """Los puntos (ya ponderados) ordenados por total, con el índice empezando en 1."""
+        with self._lock:
+            puntos, total, orden, _ = self._calcular()
+            df = pd.DataFrame(puntos[orden], columns=self.pruebas)
+            df.insert(0, 'Peñes', [self.peñas[fila] for fila in orden])
+            df['Total'] = total[orden]
+        df.index = df.index + 1
+        return df
+
+    def cambios_desde(self, desde=None) -> dict:
+        """
+        Filas que han cambiado después de la versión `desde`, las peñas eliminadas
+        y el ranking actual. Si `desde` es None o ya no sirve (se borró todo o el
+        proceso se reinició) se devuelven todas las filas con `completo=True`.
+        """
+        with self._lock:
+            completo = desde is None or desde < self._version_base or desde > self.version
+            if completo:
+                cambiadas = self.peñas
+                bajas = []
+            else:
+                cambiadas = [peña for peña, version in self._version_peña.items() if version > desde]
+                bajas = [peña for peña, version in self._bajas.items() if version > desde]
+            puntos, total, _, _ = self._calcular()
+            filas = [
+                {"peña": peña, **dict(zip(self.pruebas, puntos[self.indice[peña]].tolist())),
+                 "Total": total[self.indice[peña]].item()}
+                for peña in cambiadas
+            ]
+            return {"version": self.version, "completo": completo, "filas": filas,
+                    "bajas": bajas, "ranking": self.ranking()}
+
+    def esperar(self, desde: int, timeout=None) -> bool:
+        """Bloquea hasta que la versión deje de ser `desde`. Devuelve False si vence el timeout."""
+        with self._cambio:
+            return self._cambio.wait_for(lambda: self.version != desde, timeout)
+
+    # --- Cambios ---
+
+    def actualizar(self, peña: str, prueba: str, valor: int) -> bool:
+        """Cambia una celda. Devuelve False si el valor no cambia."""
+        with self._lock, self._deshacer_si_falla():
+            if not self._aplicar({"op": "puntos", "peña": peña, "prueba": prueba, "valor": int(valor)}):
+                return False
+            self._registrar({"op": "puntos", "peña": peña, "prueba": prueba, "valor": int(valor)})
+            return True
+
+    def actualizar_peña(self, peña: str, valores: dict) -> int:
+        """Cambia varias pruebas de una peña. Devuelve cuántas celdas cambiaron."""
+        return sum(self.actualizar(peña, prueba, valor) for prueba, valor in valores.items())
+
+    def actualizar_prueba(self, prueba: str, valores: dict) -> int:
+        """
+        Carga de golpe los resultados de una prueba ({peña: valor}). Se compara
+        con lo que hay en una sola operación vectorizada, solo se guardan las
+        celdas que cambian y los totales se recalculan una vez. Las peñas que
+        no existen se ignoran. Devuelve cuántas celdas cambiaron.
+        """
+        with self._lock, self._deshacer_si_falla():
+            conocidas = [peña for peña in valores if peña in self.indice]
+            if prueba not in self.columna or not conocidas:
+                return 0
+            filas = np.fromiter((self.indice[peña] for peña in conocidas), dtype=np.int64, count=len(conocidas))
+            nuevos = np.fromiter((int(valores[peña]) for peña in conocidas), dtype=np.int64, count=len(conocidas))
+            j = self.columna[prueba]
+            cambiadas = nuevos != self.marcas[filas, j]
+            if not cambiadas.any():
+                return 0
+            filas, nuevos = filas[cambiadas], nuevos[cambiadas]
+            self.marcas[filas, j] = nuevos
+            self._calculo = None
+            self._registrar(*[
+                {"op": "puntos", "peña": self.peñas[fila], "prueba": prueba, "valor": int(valor)}
+                for fila, valor in zip(filas, nuevos)
+            ])
+            return len(filas)
+
+    def añadir_peña(self, peña: str) -> bool:
+        with self._lock, self._deshacer_si_falla():
+            if not self._aplicar({"op": "alta", "peña": peña}):
+                return False
+            self._registrar({"op": "alta", "peña": peña})
+            return True
+
+    def eliminar_peña(self, peña: str) -> bool:
+        with self._lock, self._deshacer_si_falla():
+            if not self._aplicar({"op": "baja", "peña": peña}):
+                return False
+            self._registrar({"op": "baja", "peña": peña})
+            return True
+
+    def borrar(self):
+        """Borra todas las puntuaciones, en memoria y en la base de datos (las copias se conservan)."""
+        with self._lock:
+            with self.bd.transaccion():
+                self.documentos.borrar(INSTANTANEA)
+                self.diario.vaciar()
+            self._reiniciar()
+            self.version += 1
+            self._version_base = self.version
+            self._cambio.notify_all()
+
+    # --- Estado interno ---
+
+    def _aplicar(self, evento: dict) -> bool:
+        """Aplica un evento en memoria. Todos son idempotentes: repetirlos no cambia nada."""
+        peña = evento["peña"]
+        if evento["op"] == "puntos":
+            if peña not in self.indice or evento["prueba"] not in self.columna:
+                return False
+            fila, j = self.indice[peña], self.columna[evento["prueba"]]
+            if evento["valor"] == self.marcas[fila, j]:
+                return False
+            self.marcas[fila, j] = evento["valor"]
+        elif evento["op"] == "alta":
+            if peña in self.indice:
+                return False
+            fila = len(self.peñas)
+            if fila == len(self.marcas):
+                self.marcas = np.concatenate([self.marcas, np.zeros_like(self.marcas)])
+            self.peñas.append(peña)
+            self.indice[peña] = fila
+            self.marcas[fila] = 0
+        elif evento["op"] == "baja":
+            if peña not in self.indice:
+                return False
+            fila = self.indice.pop(peña)
+            # La última fila ocupa el hueco: no hay que desplazar nada
+            ultima = len(self.peñas) - 1
+            if fila != ultima:
+                self.peñas[fila] = self.peñas[ultima]
+                self.marcas[fila] = self.marcas[ultima]
+                self.indice[self.peñas[fila]] = fila
+            self.peñas.pop()
+        self._calculo = None
+        return True
+
+    # --- Persistencia ---
+
+    @contextmanager
+    def _deshacer_si_falla(self):
+        """Si el cambio no llega a guardarse en el diario, la tabla en memoria vuelve a como estaba."""
+        peñas, indice, marcas = list(self.peñas), dict(self.indice), self.marcas.copy()
+        try:
+            yield
+        except BaseException:
+            self.peñas, self.indice, self.marcas = peñas, indice, marcas
+            self._calculo = None
+            raise
+
+    def _registrar(self, *eventos: dict):
+        """
+        Apunta uno o varios eventos ya aplicados; cuentan como una sola versión.
+        Primero se guardan: la versión sube y las pantallas se enteran solo
+        cuando el cambio ya está en la base de datos.
+        """
+        hora = round(time.time(), 3)
+        self._ultimo = self.diario.anotar(*[{**evento, "hora": hora} for evento in eventos])
+        self.version += 1
+        for evento in eventos:
+            peña = evento["peña"]
+            if evento["op"] == "baja":
+                self._version_peña.pop(peña, None)
+                self._bajas[peña] = self.version
+            else:
+                self._bajas.pop(peña, None)
+                self._version_peña[peña] = self.version
+            # En las pruebas por puesto, una marca cambia los puntos de las demás peñas
+            if self.reglas.por_puesto and (evento["op"] == "baja" or evento.get("prueba") in self.reglas.por_puesto):
+                self._version_peña = dict.fromkeys(self.peñas, self.version)
+        self._cambio.notify_all()
+        self._eventos_pendientes += len(eventos)
+        if self._eventos_pendientes >= self.eventos_por_snapshot:
+            try:
+                self.guardar_snapshot()
+            except (sqlite3.Error, TimeoutError):
+                # El cambio ya está en el diario; la instantánea se reintenta con el siguiente
+                registro.exception("No se pudo guardar la instantánea del Grand Prix")
+
+    def guardar_snapshot(self):
+        """Guarda la tabla completa y hasta qué evento la incluye; al arrancar solo se reaplican los siguientes."""
+        with self._lock:
+            n = len(self.peñas)
+            self.documentos.guardar(INSTANTANEA, {
+                "peñas": self.peñas,
+                "pruebas": self.pruebas,
+                "marcas": self.marcas[:n].tolist(),
+                "hasta": self._ultimo,
+            })
+            self._eventos_pendientes = 0
+
+    def historial(self) -> list:
+        """Todos los eventos de la edición, en orden (el diario no se vacía al guardar la tabla)."""
+        return [evento for _, evento in self.diario.entradas()]
+
+    def _cargar(self):
+        # Una sola vez: lo que hubiera en el CSV de antes
+        self.bd.migrar("granprix", [self._importar])
+        instantanea = self.documentos.leer(INSTANTANEA)
+        if instantanea:
+            # Las pruebas se emparejan por nombre (actual o anterior); las nuevas empiezan a 0
+            conocidas = [(k, prueba) for k, prueba in enumerate(instantanea["pruebas"]) if prueba in self.columna]
+            sobrantes = [prueba for prueba in instantanea["pruebas"] if prueba not in self.columna]
+            for peña, fila in zip(instantanea["peñas"], instantanea["marcas"]):
+                self._aplicar({"op": "alta", "peña": peña})
+                for k, prueba in conocidas:
+                    self._aplicar({"op": "puntos", "peña": peña, "prueba": prueba, "valor": int(fila[k])})
+            if sobrantes:
+                # Pruebas que ya no están en la configuración: se guarda una copia antes de perderlas
+                copia = f"{INSTANTANEA}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+                self.documentos.guardar(copia, instantanea)
+                self.aviso = (f"Las pruebas {', '.join(sobrantes)} ya no están en la configuración. "
+                              f"Sus puntuaciones se han guardado en la copia '{copia}'.")
+        self._ultimo = instantanea["hasta"] if instantanea else 0
+        for id_evento, evento in self.diario.entradas(self._ultimo):
+            self._aplicar(evento)
+            self._ultimo = id_evento
+            self._eventos_pendientes += 1
+        if instantanea and instantanea["pruebas"] != self.pruebas:
+            # Ya con las pruebas de ahora (y la copia hecha): en el próximo arranque no hay nada que migrar
+            self.guardar_snapshot()
+
+    def _importar(self, con):
+        """
+        Migración desde el CSV (con sus columnas emparejadas como siempre): la
+        tabla resultante queda como primera instantánea.
+        """
+        if self.ruta_csv and os.path.exists(self.ruta_csv):
+            try:
+                df = pd.read_csv(self.ruta_csv)
+                if 'Peñes' not in df.columns:
+                    raise KeyError
+                conocidas = [col for col in df.columns if col in self.columna]
+                sobrantes = [col for col in df.columns if col not in self.columna and col not in ('Peñes', 'Total')]
+                for fila in df.to_dict('records'):
+                    peña = str(fila['Peñes'])
+                    self._aplicar({"op": "alta", "peña": peña})
+                    for col in conocidas:
+                        if pd.notna(fila[col]):
+                            self._aplicar({"op": "puntos", "peña": peña, "prueba": col, "valor": int(fila[col])})
+            except (KeyError, ValueError, pd.errors.EmptyDataError):
+                self._reiniciar()
+                copia = self._copiar_csv()
+                self.aviso = ("El archivo de puntuaciones está dañado. Se ha creado una nueva tabla "
+                              f"y el archivo anterior se ha guardado en {copia}.")
+                return
+            if sobrantes:
+                copia = self._copiar_csv()
+                self.aviso = (f"Las pruebas {', '.join(sobrantes)} ya no están en la configuración. "
+                              f"Sus puntuaciones se han guardado en {copia}.")
+        self.guardar_snapshot()
+        self._reiniciar()  # Se vuelve a cargar desde la base de datos, como en cualquier arranque
+
+    def _copiar_csv(self) -> str:
+        copia = f"{self.ruta_csv}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+        shutil.copyfile(self.ruta_csv, copia)
+        return copia
@@ -0,0 +1,51 @@
+import streamlit as st
+from archivo import (DIRECTORIO_EDICIONES, ArchivoEdiciones, cambios_por_edicion, clasificacion_historica,
+                     records_por_prueba, totales_por_edicion)
+
+st.set_page_config(page_title="Historial del Grand Prix", page_icon="📊", layout="centered")
+
+@st.cache_resource
+def obtener_archivo():
+    return ArchivoEdiciones(DIRECTORIO_EDICIONES)
+
+@st.cache_data(max_entries=4)
+def analizar(firma):
+    # Se recalcula solo cuando se archiva una edición: la firma cambia con los archivos
+    archivo = obtener_archivo()
+    puntos, eventos = archivo.puntos(), archivo.eventos()
+    return {
+        "ediciones": puntos.drop_duplicates("edicion").sort_values("año")[["año", "edicion"]],
+        "totales": totales_por_edicion(puntos),
+        "clasificacion": clasificacion_historica(puntos),
+        "records": records_por_prueba(puntos),
+        "cambios": cambios_por_edicion(eventos),
+    }
+
+st.markdown("<h1 style='text-align: center; font-size: 24px;'>📊 Historial del Grand Prix 📊</h1>", unsafe_allow_html=True)
+
+archivo = obtener_archivo()
+firma = archivo.firma()
+if not firma:
+    st.info("Todavía no hay ediciones archivadas.")
+    st.stop()
+
+analisis = analizar(firma)
+st.caption(f"{len(analisis['ediciones'])} ediciones archivadas")
+
+st.markdown("### Clasificación de todos los tiempos")
+st.dataframe(analisis["clasificacion"], width='stretch', column_config={
+    "Puesto medio": st.column_config.NumberColumn(format="%.1f"),
+})
+
+st.markdown("### Evolución por peña")
+totales = analisis["totales"]
+por_defecto = list(analisis["clasificacion"].index[:5])
+elegidas = st.multiselect("Peñas", list(totales.columns), default=por_defecto)
+if elegidas:
+    st.line_chart(totales[elegidas])
+
+st.markdown("### Récords por prueba")
+st.dataframe(analisis["records"], width='stretch')
+
+with st.expander("Cambios de puntuación por edición"):
+    st.dataframe(analisis["cambios"], width='stretch')
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class Reglas:
+    """
+    Reglas de puntuación leídas de la configuración y preparadas una sola vez
+    para calcular toda la tabla con NumPy:
+
+    - cada prueba tiene un `peso` (1 por defecto) que multiplica sus puntos;
+    - si tiene `puntos_por_puesto`, lo que se apunta es la marca (más es mejor,
+      o menos si `orden` es "menor") y los puntos salen del puesto, con los
+      empates compartiendo el mejor puesto; una marca de 0 es no presentada;
+    - sin tabla, lo que se apunta son directamente los puntos;
+    - `antes` son nombres anteriores de la prueba, para no perder datos al renombrarla;
+    - `desempate` es la lista de pruebas que deciden, en orden, los empates a
+      total; si siguen empatadas, por orden alfabético.
+    """
+
+    def __init__(self, config: dict):
+        pruebas = config.get("pruebas", [])
+        if not pruebas:
+            raise ValueError("La configuración no tiene pruebas")
+        self.pruebas = [prueba["nombre"] for prueba in pruebas]
+        if len(set(self.pruebas)) != len(self.pruebas):
+            raise ValueError("Hay pruebas repetidas en la configuración")
+
+        # Nombre (actual o anterior) -> columna
+        self.columna = {}
+        for j, prueba in enumerate(pruebas):
+            for nombre in [prueba["nombre"], *prueba.get("antes", [])]:
+                self.columna.setdefault(nombre, j)
+
+        self.pesos = np.array([prueba.get("peso", 1) for prueba in pruebas], dtype=np.float64)
+        # Por cada prueba con tabla: (columna, puntos por puesto con un 0 al final, menor es mejor)
+        self.tablas = [
+            (j, np.append(np.asarray(prueba["puntos_por_puesto"], dtype=np.float64), 0),
+             prueba.get("orden", "mayor") == "menor")
+            for j, prueba in enumerate(pruebas) if prueba.get("puntos_por_puesto")
+        ]
+        self.por_puesto = {self.pruebas[j] for j, _, _ in self.tablas}
+        self.enteros = bool(np.all(self.pesos == np.round(self.pesos))) and all(
+            np.all(tabla == np.round(tabla)) for _, tabla, _ in self.tablas
+        )
+
+        desconocidas = [prueba for prueba in config.get("desempate", []) if prueba not in self.columna]
+        if desconocidas:
+            raise ValueError(f"Pruebas de desempate que no existen: {', '.join(desconocidas)}")
+        self.desempate = [self.columna[prueba] for prueba in config.get("desempate", [])]
+
+    def puntos(self, valores: np.ndarray) -> np.ndarray:
+        """Puntos ya ponderados de cada peña (filas) en cada prueba (columnas)."""
+        puntos = valores.astype(np.float64)
+        for j, tabla, menor_mejor in self.tablas:
+            marcas = valores[:, j]
+            presentadas = marcas != 0
+            # Puesto = cuántas marcas presentadas son estrictamente mejores (empates al mejor puesto)
+            claves = marcas if menor_mejor else -marcas
+            ordenadas = np.sort(claves[presentadas])
+            puesto = np.searchsorted(ordenadas, claves, side="left")
+            puntos[:, j] = np.where(presentadas, tabla[np.minimum(puesto, len(tabla) - 1)], 0)
+        puntos *= self.pesos
+        return puntos.astype(np.int64) if self.enteros else puntos
+
+    def ordenar(self, puntos: np.ndarray, nombres: list) -> tuple:
+        """Devuelve (total, orden) con `orden` las filas de primera a última."""
+        total = puntos.sum(axis=1)
+        # np.lexsort ordena por la última clave primero: total, después los desempates y al final el nombre
+        claves = [np.asarray(nombres, dtype=str)] + [-puntos[:, j] for j in reversed(self.desempate)] + [-total]
+        return total, np.lexsort(claves)
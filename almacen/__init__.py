@@ -0,0 +1,19 @@
+"""
+Almacén compartido por las cuatro apps: un único archivo SQLite (modo WAL)
+en lugar de un JSON o un CSV por app que se reescribía entero y se releía en
+cada rerun.
+
+- `abrir(ruta)` da la base de datos del proceso, con un pool de conexiones
+  que se toman para cada operación y se reutilizan entre reruns (y con ellas
+  sus sentencias preparadas).
+- `migrar(modulo, pasos)` lleva la versión del esquema de cada app; los
+  pasos pueden ser funciones, y así es como se importan una vez los
+  archivos antiguos.
+- Cada escritura sube un contador de cambios de su ámbito en la misma
+  transacción; `cacheado` sirve las lecturas desde memoria mientras ese
+  contador no se mueva.
+- `Documentos` (JSON por clave) y `Diario` (entradas que solo se añaden)
+  cubren lo que guardaban las apps en archivos sueltos.
+"""
+from .base import RUTA_POR_DEFECTO, BaseDatos, abrir
+from .documentos import Diario, Documentos
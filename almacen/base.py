@@ -0,0 +1,192 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Junto a las carpetas de las apps, se lancen desde donde se lancen
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_POR_DEFECTO = os.path.join(RAIZ, "datos.db")
+MAX_CACHE = 1024  # Entradas de la caché de lecturas antes de vaciarla
+MAX_LIBRES = 8  # Conexiones que se guardan para reutilizar; las que sobran se cierran
+
+# Tablas del propio almacén; cada app añade las suyas con `migrar`
+MIGRACIONES = [
+    """
+    CREATE TABLE IF NOT EXISTS cambios (
+        ambito   TEXT PRIMARY KEY,
+        contador INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS documentos (
+        coleccion TEXT NOT NULL,
+        clave     TEXT NOT NULL,
+        valor     TEXT NOT NULL,
+        PRIMARY KEY (coleccion, clave)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS diario (
+        id      INTEGER PRIMARY KEY AUTOINCREMENT,
+        ambito  TEXT NOT NULL,
+        entrada TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS diario_por_ambito ON diario (ambito, id)
+    """,
+]
+
+_bases = {}
+_lock = threading.Lock()
+
+
+def abrir(ruta=RUTA_POR_DEFECTO) -> "BaseDatos":
+    """La base de datos de `ruta`. Hay una sola por proceso: todas las apps y sesiones comparten conexiones y caché."""
+    ruta = os.path.abspath(ruta)
+    with _lock:
+        if ruta not in _bases:
+            _bases[ruta] = BaseDatos(ruta)
+        return _bases[ruta]
+
+
+class BaseDatos:
+    """
+    Un archivo SQLite en modo WAL: los lectores no esperan a quien escribe y
+    las escrituras (BEGIN IMMEDIATE) se ponen en cola entre procesos.
+
+    Cada escritura sube el contador de su ámbito (`tocar`) dentro de la misma
+    transacción. Las lecturas que pasan por `cacheado` se guardan para todo el
+    proceso junto con ese contador, así que mientras nadie escriba leer es
+    una consulta a la tabla `cambios` por su clave.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._libres = queue.LifoQueue(MAX_LIBRES)  # Conexiones abiertas para todo el proceso
+        self._local = threading.local()  # La conexión de la transacción abierta en este hilo, si la hay
+        self._cache = {}  # (ámbito, clave) -> (contador, valor)
+        self.migrar("almacen", MIGRACIONES)
+
+    def _nueva_conexion(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None,
+                              check_same_thread=False, cached_statements=256)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA foreign_keys=ON")
+        return con
+
+    @contextmanager
+    def conexion(self):
+        """
+        Una conexión del proceso para una operación. Se devuelve al terminar,
+        así que la reutiliza el siguiente rerun aunque Streamlit lo ejecute en
+        otro hilo (con sus PRAGMAs y sus sentencias ya preparadas). Dentro de
+        una transacción es la de esa transacción.
+        """
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            yield con
+            return
+        try:
+            con = self._libres.get_nowait()
+        except queue.Empty:
+            con = self._nueva_conexion()
+        try:
+            yield con
+        finally:
+            if con.in_transaction:  # Algo falló a medias: no se le pasa a otro
+                con.close()
+            else:
+                try:
+                    self._libres.put_nowait(con)
+                except queue.Full:
+                    con.close()
+
+    def filas(self, sql: str, parametros=()) -> list:
+        """Todas las filas de una lectura."""
+        with self.conexion() as con:
+            return con.execute(sql, parametros).fetchall()
+
+    def fila(self, sql: str, parametros=()):
+        """La primera fila de una lectura, o None."""
+        with self.conexion() as con:
+            return con.execute(sql, parametros).fetchone()
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Transacción de escritura. Dentro de otra, se suma a ella: así una
+        operación de una app puede tocar varias tablas y confirmarse de una vez.
+        """
+        with self.conexion() as con:
+            if con.in_transaction:
+                yield con
+                return
+            try:
+                con.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:  # Otro proceso sigue escribiendo pasado el timeout
+                raise TimeoutError("La base de datos está ocupada; inténtalo de nuevo") from e
+            self._local.con = con
+            try:
+                yield con
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            else:
+                con.execute("COMMIT")
+            finally:
+                self._local.con = None
+
+    def migrar(self, modulo: str, pasos: list):
+        """
+        Aplica los pasos de `modulo` que falten, en orden y en una transacción.
+        Cada paso es SQL (una o varias sentencias separadas por `;`) o una
+        función que recibe la conexión, p. ej. para importar los archivos de
+        antes. La versión de cada módulo es el número de pasos aplicados.
+        """
+        with self.transaccion() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS esquema (modulo TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            fila = con.execute("SELECT version FROM esquema WHERE modulo = ?", (modulo,)).fetchone()
+            hechos = fila[0] if fila else 0
+            for paso in pasos[hechos:]:
+                if callable(paso):
+                    paso(con)
+                else:
+                    for sentencia in paso.split(";"):
+                        if sentencia.strip():
+                            con.execute(sentencia)
+            if len(pasos) > hechos:
+                con.execute("INSERT OR REPLACE INTO esquema (modulo, version) VALUES (?, ?)", (modulo, len(pasos)))
+
+    # --- Contadores de cambios y caché de lecturas ---
+
+    def tocar(self, con: sqlite3.Connection, ambito: str):
+        """Marca un cambio en `ambito`. Se llama dentro de la transacción que escribe."""
+        con.execute(
+            "INSERT INTO cambios (ambito, contador) VALUES (?, 1) "
+            "ON CONFLICT (ambito) DO UPDATE SET contador = contador + 1",
+            (ambito,),
+        )
+
+    def contador(self, ambito: str) -> int:
+        fila = self.fila("SELECT contador FROM cambios WHERE ambito = ?", (ambito,))
+        return fila[0] if fila else 0
+
+    def cacheado(self, ambito: str, clave, calcular):
+        """
+        `calcular()` guardado para todo el proceso hasta que cambie el contador
+        de `ambito`. El valor es compartido: no lo modifiques.
+        """
+        # El contador se lee antes que los datos: como mucho se recalcula de más, nunca se sirve algo viejo
+        contador = self.contador(ambito)
+        en_cache = self._cache.get((ambito, clave))
+        if en_cache is not None and en_cache[0] == contador:
+            return en_cache[1]
+        valor = calcular()
+        if getattr(self._local, "con", None) is not None:
+            return valor  # Puede que aún se deshaga: no se guarda
+        if len(self._cache) >= MAX_CACHE:
+            self._cache.clear()
+        self._cache[(ambito, clave)] = (contador, valor)
+        return valor
@@ -0,0 +1,89 @@
+import json
+
+
+class Documentos:
+    """
+    Documentos JSON por clave dentro de una colección (un sorteo, la
+    instantánea de un torneo...). Las lecturas pasan por la caché del proceso
+    salvo con `cache=False`, para quien vaya a modificar lo que lee.
+    """
+
+    def __init__(self, bd, coleccion: str, cache=True):
+        self.bd = bd
+        self.coleccion = coleccion
+        self.cache = cache
+
+    def leer(self, clave: str, defecto=None):
+        if not self.cache:
+            return self._leer(clave, defecto)
+        return self.bd.cacheado(self.coleccion, ("documento", clave), lambda: self._leer(clave, defecto))
+
+    def _leer(self, clave: str, defecto):
+        fila = self.bd.fila(
+            "SELECT valor FROM documentos WHERE coleccion = ? AND clave = ?", (self.coleccion, clave)
+        )
+        return json.loads(fila[0]) if fila else defecto
+
+    def claves(self) -> list:
+        return self.bd.cacheado(self.coleccion, "claves", lambda: [fila[0] for fila in self.bd.filas(
+            "SELECT clave FROM documentos WHERE coleccion = ? ORDER BY clave", (self.coleccion,)
+        )])
+
+    def guardar(self, clave: str, valor):
+        with self.bd.transaccion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO documentos (coleccion, clave, valor) VALUES (?, ?, ?)",
+                (self.coleccion, clave, json.dumps(valor, ensure_ascii=False)),
+            )
+            self.bd.tocar(con, self.coleccion)
+
+    def borrar(self, clave=None):
+        """Borra un documento, o la colección entera si no se da clave."""
+        with self.bd.transaccion() as con:
+            if clave is None:
+                con.execute("DELETE FROM documentos WHERE coleccion = ?", (self.coleccion,))
+            else:
+                con.execute("DELETE FROM documentos WHERE coleccion = ? AND clave = ?", (self.coleccion, clave))
+            self.bd.tocar(con, self.coleccion)
+
+
+class Diario:
+    """
+    Entradas JSON que solo se añaden, numeradas con un id que nunca se
+    reutiliza: quien ya ha leído hasta un id pide solo las siguientes.
+    """
+
+    def __init__(self, bd, ambito: str):
+        self.bd = bd
+        self.ambito = ambito
+
+    def anotar(self, *entradas) -> int:
+        """Añade las entradas en una sola transacción y devuelve el id de la última."""
+        with self.bd.transaccion() as con:
+            cursor = con.executemany(
+                "INSERT INTO diario (ambito, entrada) VALUES (?, ?)",
+                [(self.ambito, json.dumps(entrada, ensure_ascii=False)) for entrada in entradas],
+            )
+            ultimo = con.execute("SELECT last_insert_rowid()").fetchone()[0] if cursor.rowcount else self.ultimo()
+            self.bd.tocar(con, self.ambito)
+        return ultimo
+
+    def entradas(self, desde=0) -> list:
+        """[(id, entrada)] con id mayor que `desde`, en orden."""
+        filas = self.bd.filas(
+            "SELECT id, entrada FROM diario WHERE ambito = ? AND id > ? ORDER BY id", (self.ambito, desde)
+        )
+        return [(id_entrada, json.loads(entrada)) for id_entrada, entrada in filas]
+
+    def ultimo(self) -> int:
+        fila = self.bd.fila("SELECT MAX(id) FROM diario WHERE ambito = ?", (self.ambito,))
+        return fila[0] or 0
+
+    def vaciar(self, hasta=None):
+        """Borra las entradas hasta el id `hasta` (incluido), o todas."""
+        with self.bd.transaccion() as con:
+            if hasta is None:
+                con.execute("DELETE FROM diario WHERE ambito = ?", (self.ambito,))
+            else:
+                con.execute("DELETE FROM diario WHERE ambito = ? AND id <= ?", (self.ambito, hasta))
+            self.bd.tocar(con, self.ambito)
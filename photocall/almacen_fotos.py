@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import time
+
+AMBITO = "fotos"  # Contador de cambios de la galería
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS fotos (
+    nombre   TEXT PRIMARY KEY,
+    uploader TEXT NOT NULL,
+    archivo  TEXT,
+    estado   TEXT NOT NULL DEFAULT 'lista',
+    creada   REAL NOT NULL,
+    likes    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS fotos_por_likes ON fotos (likes DESC, creada);
+CREATE INDEX IF NOT EXISTS fotos_por_fecha ON fotos (creada DESC);
+CREATE INDEX IF NOT EXISTS fotos_por_uploader ON fotos (uploader);
+
+CREATE TABLE IF NOT EXISTS votos (
+    foto    TEXT NOT NULL REFERENCES fotos (nombre) ON DELETE CASCADE,
+    votante TEXT NOT NULL,
+    PRIMARY KEY (foto, votante)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS votos_por_votante ON votos (votante);
+
+CREATE TABLE IF NOT EXISTS huellas (
+    foto      TEXT PRIMARY KEY REFERENCES fotos (nombre) ON DELETE CASCADE,
+    phash     TEXT NOT NULL,
+    dhash     TEXT NOT NULL,
+    similar_a TEXT
+);
+"""
+
+COLUMNAS = "nombre, uploader, archivo, estado, creada, likes"
+
+# Órdenes de la galería, cada uno respaldado por un índice
+ORDENES = {
+    "likes": "likes DESC, creada",
+    "nuevas": "creada DESC",
+}
+
+
+class AlmacenFotos:
+    """
+    Fotos y votos en las tablas de la galería dentro del almacén compartido.
+    Cada voto es una fila con clave única (foto, votante), así que un voto
+    repetido se ignora, y `fotos.likes` es un contador mantenido en la misma
+    transacción para ordenar por índice. Las consultas se sirven desde la
+    caché del proceso hasta que alguien sube, vota o borra.
+    """
+
+    def __init__(self, bd, ruta_json_antiguo=None):
+        self.bd = bd
+        # Primero las tablas; después, una sola vez, lo que hubiera en los archivos de antes
+        self.bd.migrar("photocall", [ESQUEMA, lambda con: self._migrar(con, ruta_json_antiguo)])
+
+    # --- Consultas ---
+
+    def fotos(self, orden="likes", limite=None, desplazamiento=0, solo_listas=False, uploader=None) -> list:
+        """
+        Una página de fotos. Por defecto ordenadas por likes (las más antiguas
+        primero en caso de empate); `orden="nuevas"` para las más recientes.
+        """
+        where, parametros = self._filtro(solo_listas, uploader)
+        return self._consulta(
+            f"SELECT {COLUMNAS} FROM fotos {where} ORDER BY {ORDENES[orden]} LIMIT ? OFFSET ?",
+            (*parametros, -1 if limite is None else limite, desplazamiento),
+        )
+
+    def contar(self, solo_listas=False, uploader=None) -> int:
+        where, parametros = self._filtro(solo_listas, uploader)
+        sql = f"SELECT COUNT(*) FROM fotos {where}"
+        return self.bd.cacheado(AMBITO, (sql, *parametros),
+                                lambda: self.bd.fila(sql, parametros)[0])
+
+    @staticmethod
+    def _filtro(solo_listas: bool, uploader):
+        condiciones, parametros = [], []
+        if solo_listas:
+            condiciones.append("estado = 'lista'")
+        if uploader is not None:
+            condiciones.append("uploader = ?")
+            parametros.append(uploader)
+        return ("WHERE " + " AND ".join(condiciones)) if condiciones else "", parametros
+
+    def foto(self, nombre: str):
+        filas = self._consulta(f"SELECT {COLUMNAS} FROM fotos WHERE nombre = ?", (nombre,))
+        return filas[0] if filas else None
+
+    def fotos_de(self, uploader: str) -> list:
+        return self._consulta(f"SELECT {COLUMNAS} FROM fotos WHERE uploader = ? ORDER BY creada", (uploader,))
+
+    def votos_de(self, votante: str) -> set:
+        """Nombres de las fotos que ya ha votado `votante`."""
+        return {fila["foto"] for fila in self._consulta("SELECT foto FROM votos WHERE votante = ?", (votante,))}
+
+    def total(self) -> int:
+        return self.contar()
+
+    def _consulta(self, sql: str, parametros=()) -> list:
+        """Filas como diccionarios, desde la caché si la galería no ha cambiado. No las modifiques."""
+        return self.bd.cacheado(AMBITO, (sql, *parametros),
+                                lambda: [dict(fila) for fila in self.bd.filas(sql, parametros)])
+
+    # --- Escrituras ---
+
+    def añadir_foto(self, nombre: str, uploader: str, estado="lista", archivo=None) -> bool:
+        """Devuelve False si ya existe una foto con ese nombre."""
+        try:
+            with self.bd.transaccion() as con:
+                con.execute(
+                    "INSERT INTO fotos (nombre, uploader, archivo, estado, creada) VALUES (?, ?, ?, ?, ?)",
+                    (nombre, uploader, archivo, estado, time.time()),
+                )
+                self.bd.tocar(con, AMBITO)
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def actualizar_foto(self, nombre: str, **campos):
+        """Actualiza `archivo` y/o `estado` de una foto (si sigue existiendo)."""
+        campos = {campo: valor for campo, valor in campos.items() if campo in ("archivo", "estado")}
+        if not campos:
+            return
+        asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+        with self.bd.transaccion() as con:
+            con.execute(f"UPDATE fotos SET {asignaciones} WHERE nombre = ?", (*campos.values(), nombre))
+            self.bd.tocar(con, AMBITO)
+
+    def borrar_foto(self, nombre: str):
+        with self.bd.transaccion() as con:
+            con.execute("DELETE FROM fotos WHERE nombre = ?", (nombre,))
+            self.bd.tocar(con, AMBITO)
+
+    def votar(self, nombre: str, votante: str) -> bool:
+        """Registra un voto. Devuelve False si ese votante ya había votado esa foto."""
+        try:
+            with self.bd.transaccion() as con:
+                cursor = con.execute("INSERT OR IGNORE INTO votos (foto, votante) VALUES (?, ?)", (nombre, votante))
+                if cursor.rowcount == 0:
+                    return False
+                con.execute("UPDATE fotos SET likes = likes + 1 WHERE nombre = ?", (nombre,))
+                self.bd.tocar(con, AMBITO)
+            return True
+        except sqlite3.IntegrityError:  # La foto ya no existe
+            return False
+
+    # --- Huellas perceptuales ---
+
+    def huellas(self) -> list:
+        """Todas las huellas como (foto, phash, dhash) para construir el índice."""
+        filas = self.bd.filas("SELECT foto, phash, dhash FROM huellas")
+        return [(foto, int(phash, 16), int(dhash, 16)) for foto, phash, dhash in filas]
+
+    def guardar_huella(self, nombre: str, phash: int, dhash: int, similar_a=None):
+        with self.bd.transaccion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO huellas (foto, phash, dhash, similar_a) VALUES (?, ?, ?, ?)",
+                (nombre, f"{phash:016x}", f"{dhash:016x}", similar_a),
+            )
+            self.bd.tocar(con, AMBITO)
+
+    def fotos_sin_huella(self) -> list:
+        return self._consulta(
+            f"SELECT {COLUMNAS} FROM fotos WHERE estado = 'lista' "
+            "AND nombre NOT IN (SELECT foto FROM huellas)"
+        )
+
+    def parecidas(self) -> list:
+        """Fotos marcadas como parecidas a otra, como (foto, similar_a)."""
+        filas = self._consulta(
+            "SELECT foto, similar_a FROM huellas WHERE similar_a IS NOT NULL AND similar_a IN (SELECT nombre FROM fotos)"
+        )
+        return [(fila["foto"], fila["similar_a"]) for fila in filas]
+
+    # --- Migración ---
+
+    def _migrar(self, con: sqlite3.Connection, ruta_json_antiguo):
+        if ruta_json_antiguo and os.path.exists(ruta_json_antiguo):
+            self._migrar_json(con, ruta_json_antiguo)
+        self.bd.tocar(con, AMBITO)
+
+    @staticmethod
+    def _migrar_json(con: sqlite3.Connection, ruta_json: str):
+        """Importa el antiguo info_fotos.json (los likes duplicados se cuentan una vez)."""
+        with open(ruta_json, "r") as f:
+            info_fotos = json.load(f)
+        ahora = time.time()
+        for orden, (nombre, info) in enumerate(info_fotos.items()):
+            votantes = set(info.get("likes", []))
+            con.execute(
+                "INSERT OR IGNORE INTO fotos (nombre, uploader, archivo, estado, creada, likes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (nombre, info["uploader"], info.get("archivo", nombre + ".png"),
+                 info.get("estado", "lista"), ahora + orden / 1000, len(votantes)),
+            )
+            con.executemany(
+                "INSERT OR IGNORE INTO votos (foto, votante) VALUES (?, ?)",
+                [(nombre, votante) for votante in votantes],
+            )
@@ -0,0 +1,116 @@
+import logging
+import os
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados de una foto subida
+PENDIENTE = "pendiente"
+LISTA = "lista"
+FALLIDA = "fallida"
+
+EXTENSION_STAGING = ".subida"
+
+registro = logging.getLogger(__name__)
+
+
+class ColaSubidas:
+    """
+    Procesa las fotos subidas en segundo plano con un número limitado de hilos.
+    Las subidas se copian primero a una carpeta de staging, así la sesión del
+    usuario no espera a PIL. Si ya hay `max_pendientes` fotos esperando, `encolar`
+    las rechaza en vez de acumular trabajo sin límite.
+    """
+
+    def __init__(self, directorio_staging: str, procesar, al_terminar, trabajadores=None, max_pendientes=32):
+        # PIL libera el GIL al decodificar, redimensionar y codificar, así que
+        # varios hilos aprovechan todos los núcleos sin tener que serializar nada.
+        self.directorio_staging = directorio_staging
+        self.procesar = procesar  # procesar(origen, nombre) -> informe
+        self.al_terminar = al_terminar  # al_terminar(nombre, informe | None, error | None)
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores or os.cpu_count(), thread_name_prefix="subidas")
+        self._huecos = threading.BoundedSemaphore(max_pendientes)
+        self._estados = {}  # nombre -> {'estado', 'informe', 'error'}
+        self._recuperadas = deque()  # (nombre, ruta) de staging que esperan un hueco libre
+        self._lock = threading.Lock()
+        os.makedirs(directorio_staging, exist_ok=True)
+        self._recuperar()
+
+    def encolar(self, nombre: str, origen) -> bool:
+        """Copia la subida al staging y la encola. Devuelve False si la cola está llena."""
+        if not self._huecos.acquire(blocking=False):
+            return False
+        ruta = os.path.join(self.directorio_staging, nombre + EXTENSION_STAGING)
+        try:
+            origen.seek(0)
+            with open(ruta, "wb") as f:
+                shutil.copyfileobj(origen, f, 1024 * 1024)
+        except Exception:
+            self._huecos.release()
+            raise
+        self._lanzar(nombre, ruta)
+        return True
+
+    def estado(self, nombre: str):
+        """Estado en memoria de una subida reciente, o None si no pasó por esta cola."""
+        with self._lock:
+            return self._estados.get(nombre)
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return sum(1 for e in self._estados.values() if e["estado"] == PENDIENTE)
+
+    def _lanzar(self, nombre: str, ruta: str):
+        with self._lock:
+            self._estados[nombre] = {"estado": PENDIENTE, "informe": None, "error": None}
+        self._pool.submit(self._trabajo, nombre, ruta)
+
+    def _trabajo(self, nombre: str, ruta: str):
+        informe, error = None, None
+        try:
+            with open(ruta, "rb") as f:
+                informe = self.procesar(f, nombre)
+            self.al_terminar(nombre, informe, None)
+        except Exception as e:
+            registro.exception("No se pudo procesar o registrar la foto %s", nombre)
+            error = str(e) or e.__class__.__name__
+            self._avisar_fallo(nombre, error)
+        finally:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            self._huecos.release()
+            self._lanzar_recuperadas()
+        with self._lock:
+            self._estados[nombre] = {"estado": LISTA if error is None else FALLIDA, "informe": informe, "error": error}
+
+    def _avisar_fallo(self, nombre: str, error: str):
+        """`al_terminar` con el error, para que la foto quede como fallida también fuera de la cola."""
+        try:
+            self.al_terminar(nombre, None, error)
+        except Exception:
+            registro.exception("No se pudo marcar como fallida la foto %s", nombre)
+
+    def _recuperar(self):
+        """
+        Vuelve a encolar lo que quedó en staging si el servidor se reinició a
+        medias. Lo que no cabe en la cola espera y entra según se liberan huecos.
+        """
+        for archivo in sorted(os.listdir(self.directorio_staging)):
+            if archivo.endswith(EXTENSION_STAGING):
+                nombre = archivo[: -len(EXTENSION_STAGING)]
+                self._recuperadas.append((nombre, os.path.join(self.directorio_staging, archivo)))
+                with self._lock:
+                    self._estados[nombre] = {"estado": PENDIENTE, "informe": None, "error": None}
+        self._lanzar_recuperadas()
+
+    def _lanzar_recuperadas(self):
+        while self._recuperadas and self._huecos.acquire(blocking=False):
+            try:
+                nombre, ruta = self._recuperadas.popleft()
+            except IndexError:  # Otro hilo se llevó la última
+                self._huecos.release()
+                break
+            self._lanzar(nombre, ruta)
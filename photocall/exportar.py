@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import zipfile
+
+# Formatos ya comprimidos: recomprimirlos cuesta CPU y no ahorra nada
+YA_COMPRIMIDOS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+# Streamlit no sirve archivos estáticos de más de 200 MB: cada volumen se queda por debajo
+MAX_VOLUMEN = 190 * 1024 * 1024
+CABECERAS_ZIP = 200  # Bytes aproximados por foto, además del nombre (cabecera local y directorio central)
+
+
+def _firma(ruta: str) -> list:
+    stat = os.stat(ruta)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _sha1(ruta: str) -> str:
+    sha = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class ExportacionZip:
+    """
+    Mantiene las fotos en uno o varios zips (volúmenes de menos de
+    MAX_VOLUMEN, cada uno se abre por separado) que se actualizan de forma
+    incremental. Un manifiesto guarda por cada foto su tamaño, mtime, hash y
+    volumen: las fotos nuevas se añaden al final del último volumen (o abren
+    uno nuevo) y si alguna cambió o se borró solo se reconstruye su volumen.
+    """
+
+    def __init__(self, directorio: str, ruta_manifiesto: str):
+        self.directorio = directorio
+        self.ruta_manifiesto = ruta_manifiesto
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        self._manifiesto = self._cargar_manifiesto()
+
+    def ruta_volumen(self, volumen: int) -> str:
+        # Nombre difícil de adivinar: el directorio se sirve como estático
+        return os.path.join(self.directorio, f"fotos-{self._manifiesto['token']}-{volumen:03d}.zip")
+
+    def volumenes(self) -> list:
+        """Números de los volúmenes, en orden."""
+        return sorted({foto["volumen"] for foto in self._manifiesto["fotos"].values()})
+
+    def _cargar_manifiesto(self) -> dict:
+        try:
+            with open(self.ruta_manifiesto, "r") as f:
+                manifiesto = json.load(f)
+            if all("volumen" in foto for foto in manifiesto["fotos"].values()):
+                return manifiesto
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+        # Sin manifiesto (o de un solo zip): se empieza de cero y el zip anterior se borra al actualizar
+        return {"token": secrets.token_urlsafe(16), "fotos": {}}
+
+    def _guardar_manifiesto(self):
+        temporal = self.ruta_manifiesto + ".tmp"
+        with open(temporal, "w") as f:
+            json.dump(self._manifiesto, f)
+        os.replace(temporal, self.ruta_manifiesto)
+
+    def actualizar(self, fotos: dict) -> dict:
+        """
+        Sincroniza los zips con `fotos` ({nombre_en_zip: ruta}). Solo hace `stat`
+        de cada foto salvo que haya cambios; las que no están en disco se
+        omiten. Devuelve qué se ha hecho.
+        """
+        with self._lock:
+            conocidas = self._manifiesto["fotos"]
+            presentes, nuevas, retocadas = {}, [], []
+            a_reconstruir = set()
+            for nombre, ruta in fotos.items():
+                try:
+                    firma = _firma(ruta)
+                except FileNotFoundError:
+                    continue  # Foto sin archivo: no entra en la exportación
+                presentes[nombre] = ruta
+                if nombre not in conocidas:
+                    nuevas.append(nombre)
+                elif conocidas[nombre]["firma"] != firma:
+                    # Si solo cambió el mtime pero no el contenido, basta con apuntarlo
+                    if conocidas[nombre]["sha1"] == _sha1(ruta):
+                        conocidas[nombre]["firma"] = firma
+                        retocadas.append(nombre)
+                    else:
+                        a_reconstruir.add(conocidas[nombre]["volumen"])
+            borradas = [nombre for nombre in conocidas if nombre not in presentes]
+            a_reconstruir.update(conocidas[nombre]["volumen"] for nombre in borradas)
+            a_reconstruir.update(v for v in {foto["volumen"] for foto in conocidas.values()}
+                                 if not os.path.exists(self.ruta_volumen(v)))
+            for nombre in borradas:
+                del conocidas[nombre]
+
+            for volumen in sorted(a_reconstruir):
+                self._reconstruir(volumen, presentes)
+            añadidas = self._añadir_nuevas(nuevas, presentes)
+            self._limpiar()
+
+            if añadidas or borradas or retocadas or a_reconstruir:
+                self._guardar_manifiesto()
+            return {"reconstruidos": len(a_reconstruir), "añadidas": añadidas,
+                    "omitidas": len(fotos) - len(presentes)}
+
+    def _añadir_nuevas(self, nuevas: list, fotos: dict) -> int:
+        """Añade al final del último volumen mientras quepan; después, en volúmenes nuevos."""
+        if not nuevas:
+            return 0
+        conocidas = self._manifiesto["fotos"]
+        volumen = max((foto["volumen"] for foto in conocidas.values()), default=1)
+        ocupado = self._tamaño_volumen(volumen)
+        pendientes = list(nuevas)
+        while pendientes:
+            lote = []
+            while pendientes:
+                nombre = pendientes[0]
+                tamaño = os.path.getsize(fotos[nombre]) + len(nombre.encode()) * 2 + CABECERAS_ZIP
+                if lote or ocupado:  # Un volumen vacío acepta al menos una foto, quepa o no
+                    if ocupado + tamaño > MAX_VOLUMEN:
+                        break
+                lote.append(pendientes.pop(0))
+                ocupado += tamaño
+            if lote:
+                try:
+                    with zipfile.ZipFile(self.ruta_volumen(volumen), "a") as zip_f:
+                        for nombre in lote:
+                            self._añadir(zip_f, nombre, fotos[nombre], volumen)
+                except zipfile.BadZipFile:
+                    # Un añadido interrumpido deja el volumen inservible: se rehace
+                    for nombre in lote:
+                        self._apuntar(nombre, fotos[nombre], volumen)
+                    self._reconstruir(volumen, fotos)
+            volumen += 1
+            ocupado = 0
+        return len(nuevas)
+
+    def _reconstruir(self, volumen: int, fotos: dict):
+        """Rehace un volumen con sus fotos que siguen existiendo; si no queda ninguna, lo borra."""
+        ruta = self.ruta_volumen(volumen)
+        conocidas = self._manifiesto["fotos"]
+        miembros = [nombre for nombre, foto in conocidas.items() if foto["volumen"] == volumen]
+        if not miembros:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            return
+        temporal = ruta + ".tmp"
+        with zipfile.ZipFile(temporal, "w") as zip_f:
+            for nombre in miembros:
+                self._añadir(zip_f, nombre, fotos[nombre], volumen)
+        os.replace(temporal, ruta)
+
+    def _añadir(self, zip_f: zipfile.ZipFile, nombre: str, ruta: str, volumen: int):
+        extension = os.path.splitext(nombre)[1].lower()
+        compresion = zipfile.ZIP_STORED if extension in YA_COMPRIMIDOS else zipfile.ZIP_DEFLATED
+        zip_f.write(ruta, arcname=nombre, compress_type=compresion)
+        self._apuntar(nombre, ruta, volumen)
+
+    def _apuntar(self, nombre: str, ruta: str, volumen: int):
+        self._manifiesto["fotos"][nombre] = {"firma": _firma(ruta), "sha1": _sha1(ruta), "volumen": volumen}
+
+    def _limpiar(self):
+        """Borra los zips que ya no son ningún volumen (p. ej. el zip único de antes)."""
+        vigentes = {self.ruta_volumen(volumen) for volumen in self.volumenes()}
+        for archivo in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, archivo)
+            if archivo.startswith("fotos-") and archivo.endswith(".zip") and ruta not in vigentes:
+                os.remove(ruta)
+
+    def _tamaño_volumen(self, volumen: int) -> int:
+        ruta = self.ruta_volumen(volumen)
+        return os.path.getsize(ruta) if os.path.exists(ruta) else 0
+
+    def leer(self, volumen: int) -> bytes:
+        """Un volumen entero en memoria (menos de MAX_VOLUMEN); solo si no hay servidor estático."""
+        with open(self.ruta_volumen(volumen), "rb") as f:
+            return f.read()
+
+    def tamaño(self) -> int:
+        return sum(self._tamaño_volumen(volumen) for volumen in self.volumenes())
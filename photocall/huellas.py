@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+LADO = 64  # La imagen se reduce a 64x64 en gris antes de calcular nada
+
+# Umbrales de distancia de Hamming (sobre 64 bits)
+UMBRAL_DUPLICADA = 6  # Misma foto (recomprimida, reescalada...): se rechaza
+UMBRAL_PARECIDA = 12  # Muy parecida: se acepta pero queda marcada para revisar
+
+
+def _matriz_dct(n: int) -> np.ndarray:
+    """Matriz de la DCT-II ortonormal de tamaño n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matriz = np.sqrt(2 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matriz[0] /= np.sqrt(2)
+    return matriz
+
+
+DCT_32 = _matriz_dct(32)
+
+
+def _bits_a_entero(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def _bloques(gris: np.ndarray, filas: int, columnas: int) -> np.ndarray:
+    """Reduce la imagen a filas x columnas promediando bloques (pueden ser desiguales)."""
+    cortes_f = np.linspace(0, gris.shape[0], filas + 1).astype(int)[:-1]
+    cortes_c = np.linspace(0, gris.shape[1], columnas + 1).astype(int)[:-1]
+    sumas = np.add.reduceat(np.add.reduceat(gris, cortes_f, axis=0), cortes_c, axis=1)
+    areas = np.outer(np.diff(np.append(cortes_f, gris.shape[0])), np.diff(np.append(cortes_c, gris.shape[1])))
+    return sumas / areas
+
+
+def calcular_huella(origen) -> tuple:
+    """
+    Devuelve (phash, dhash) de una imagen como enteros de 64 bits.
+    Solo se decodifica a tamaño reducido (Image.draft) y el resto se hace en NumPy.
+    """
+    imagen = Image.open(origen)
+    imagen.draft("L", (LADO * 2, LADO * 2))
+    imagen = ImageOps.exif_transpose(imagen).convert("L").resize((LADO, LADO), Image.BILINEAR)
+    gris = np.asarray(imagen, dtype=np.float64)
+
+    # pHash: DCT 2D de la versión 32x32 y comparación de las 8x8 frecuencias bajas con su mediana
+    frecuencias = DCT_32 @ _bloques(gris, 32, 32) @ DCT_32.T
+    bajas = frecuencias[:8, :8].ravel()
+    phash = _bits_a_entero(bajas > np.median(bajas[1:]))
+
+    # dHash: gradiente horizontal sobre una rejilla de 8x9
+    rejilla = _bloques(gris, 8, 9)
+    dhash = _bits_a_entero(rejilla[:, 1:] > rejilla[:, :-1])
+    return phash, dhash
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class ArbolBK:
+    """Árbol BK sobre la distancia de Hamming: búsqueda por radio sin recorrer todo."""
+
+    def __init__(self):
+        self._raiz = None  # [huella, {distancia: nodo}, {nombres}]
+
+    def añadir(self, huella: int, nombre: str):
+        if self._raiz is None:
+            self._raiz = [huella, {}, {nombre}]
+            return
+        nodo = self._raiz
+        while True:
+            distancia = hamming(huella, nodo[0])
+            if distancia == 0:
+                nodo[2].add(nombre)
+                return
+            hijo = nodo[1].get(distancia)
+            if hijo is None:
+                nodo[1][distancia] = [huella, {}, {nombre}]
+                return
+            nodo = hijo
+
+    def quitar(self, huella: int, nombre: str):
+        """Las huellas se quedan como nodos vacíos para no tener que rehacer el árbol."""
+        nodo = self._raiz
+        while nodo is not None:
+            distancia = hamming(huella, nodo[0])
+            if distancia == 0:
+                nodo[2].discard(nombre)
+                return
+            nodo = nodo[1].get(distancia)
+
+    def buscar(self, huella: int, radio: int) -> list:
+        """Lista de (distancia, nombre) con distancia <= radio."""
+        encontrados = []
+        pendientes = [self._raiz] if self._raiz is not None else []
+        while pendientes:
+            nodo = pendientes.pop()
+            distancia = hamming(huella, nodo[0])
+            if distancia <= radio:
+                encontrados.extend((distancia, nombre) for nombre in nodo[2])
+            # Desigualdad triangular: solo pueden estar en hijos a distancia ±radio
+            for d_hijo, hijo in nodo[1].items():
+                if distancia - radio <= d_hijo <= distancia + radio:
+                    pendientes.append(hijo)
+        return sorted(encontrados)
+
+
+class IndiceHuellas:
+    """Índice de huellas en memoria compartido por todas las sesiones."""
+
+    def __init__(self, huellas=()):
+        self._arbol = ArbolBK()
+        self._huellas = {}  # nombre -> (phash, dhash)
+        self._lock = threading.Lock()
+        for nombre, phash, dhash in huellas:
+            self._añadir(nombre, phash, dhash)
+
+    def _añadir(self, nombre: str, phash: int, dhash: int):
+        self._huellas[nombre] = (phash, dhash)
+        self._arbol.añadir(phash, nombre)
+
+    def _parecidas(self, phash: int, dhash: int, radio: int) -> list:
+        # Los candidatos del pHash se confirman con el dHash para evitar falsos positivos
+        return sorted(
+            (max(distancia, hamming(dhash, self._huellas[nombre][1])), nombre)
+            for distancia, nombre in self._arbol.buscar(phash, radio)
+            if hamming(dhash, self._huellas[nombre][1]) <= radio
+        )
+
+    def parecidas(self, phash: int, dhash: int, radio=UMBRAL_PARECIDA) -> list:
+        """Fotos a distancia <= radio, como (distancia, nombre) de más a menos parecida."""
+        with self._lock:
+            return self._parecidas(phash, dhash, radio)
+
+    def comprobar_y_añadir(self, nombre: str, phash: int, dhash: int):
+        """
+        Comprueba y registra la huella en un solo paso, para que dos subidas
+        simultáneas de la misma foto no pasen las dos. Devuelve (veredicto, parecida)
+        con veredicto 'duplicada', 'parecida' o 'nueva'.
+        """
+        with self._lock:
+            parecidas = self._parecidas(phash, dhash, UMBRAL_PARECIDA)
+            if parecidas and parecidas[0][0] <= UMBRAL_DUPLICADA:
+                return "duplicada", parecidas[0][1]
+            self._añadir(nombre, phash, dhash)
+            return ("parecida", parecidas[0][1]) if parecidas else ("nueva", None)
+
+    def quitar(self, nombre: str):
+        with self._lock:
+            huella = self._huellas.pop(nombre, None)
+            if huella:
+                self._arbol.quitar(huella[0], nombre)
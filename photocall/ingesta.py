@@ -0,0 +1,193 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+
+from PIL import Image, ImageOps
+
+# Extensión de salida según el códec
+EXTENSIONES = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# Orientación EXIF -> operación equivalente de jpegtran (rotación sin pérdidas)
+TRANSPOSICIONES_JPEGTRAN = {
+    2: ["-flip", "horizontal"],
+    3: ["-rotate", "180"],
+    4: ["-flip", "vertical"],
+    5: ["-transpose"],
+    6: ["-rotate", "90"],
+    7: ["-transverse"],
+    8: ["-rotate", "270"],
+}
+
+ORIENTACION = 0x0112
+JPEGTRAN = shutil.which("jpegtran")
+
+# Segmentos/chunks con metadatos (EXIF con el GPS, XMP, IPTC) que no se copian
+SEGMENTOS_JPEG_FUERA = {0xE1, 0xED}  # APP1 (EXIF/XMP) y APP13 (IPTC)
+CHUNKS_PNG_FUERA = {b"eXIf", b"tEXt", b"zTXt", b"iTXt"}
+
+
+class Cronometro:
+    """Acumula el tiempo de cada etapa del proceso en milisegundos."""
+
+    def __init__(self):
+        self.tiempos = {}
+        self._inicio = time.perf_counter()
+
+    def marca(self, etapa: str):
+        ahora = time.perf_counter()
+        self.tiempos[etapa] = round((ahora - self._inicio) * 1000, 1)
+        self._inicio = ahora
+
+
+def procesar_foto(origen, destino_base: str, calidad=85, max_lado=2560, formato_salida=None) -> dict:
+    """
+    Guarda una foto subida respetando la orientación EXIF y limitando su tamaño.
+    `origen` es un fichero binario (p. ej. el resultado de st.file_uploader) y
+    `destino_base` la ruta sin extensión. Si `formato_salida` es None se conserva el
+    códec original. Devuelve un informe con el archivo, bytes y tiempos por etapa.
+    """
+    crono = Cronometro()
+    origen.seek(0, os.SEEK_END)
+    bytes_entrada = origen.tell()
+    origen.seek(0)
+
+    # 1. Solo la cabecera: formato, tamaño y orientación (no decodifica píxeles)
+    imagen = Image.open(origen)
+    formato = "JPEG" if imagen.format == "MPO" else imagen.format
+    orientacion = imagen.getexif().get(ORIENTACION, 1)
+    cabe = max(imagen.size) <= max_lado
+    destino_formato = formato_salida or (formato if formato in EXTENSIONES else "JPEG")
+    destino = destino_base + EXTENSIONES[destino_formato]
+    crono.marca("cabecera")
+
+    metodo = None
+    if cabe and formato == destino_formato:
+        origen.seek(0)
+        if orientacion == 1:
+            # Ya está derecha y cabe: se copia sin recodificar, pero sin los metadatos (ni la ubicación)
+            if _copiar_sin_metadatos(origen, destino, formato):
+                metodo = "copia"
+        elif formato == "JPEG" and JPEGTRAN and orientacion in TRANSPOSICIONES_JPEGTRAN:
+            if _transponer_sin_perdidas(origen, destino, TRANSPOSICIONES_JPEGTRAN[orientacion]):
+                metodo = "jpegtran"
+        crono.marca("escritura")
+
+    if metodo is None:
+        origen.seek(0)
+        imagen = Image.open(origen)
+        if formato == "JPEG" and not cabe:
+            # Decodificación reducida (1/2, 1/4, 1/8) directamente en el decoder JPEG
+            imagen.draft("RGB", (max_lado, max_lado))
+        imagen.load()
+        crono.marca("decodificacion")
+
+        # Primero reducimos (el límite es cuadrado) y luego giramos la imagen ya pequeña
+        imagen.thumbnail((max_lado, max_lado))
+        crono.marca("redimension")
+
+        imagen = ImageOps.exif_transpose(imagen)
+        crono.marca("orientacion")
+
+        opciones = {"optimize": True}
+        if destino_formato in ("JPEG", "WEBP"):
+            opciones["quality"] = calidad
+            if imagen.mode not in ("RGB", "L"):
+                imagen = imagen.convert("RGB")
+        temporal = destino + ".tmp"
+        imagen.save(temporal, destino_formato, **opciones)
+        os.replace(temporal, destino)
+        metodo = "recodificada"
+        crono.marca("codificacion")
+
+    return {
+        "archivo": os.path.basename(destino),
+        "metodo": metodo,
+        "bytes_entrada": bytes_entrada,
+        "bytes_salida": os.path.getsize(destino),
+        "tiempos_ms": crono.tiempos,
+    }
+
+
+def _transponer_sin_perdidas(origen, destino: str, operacion: list) -> bool:
+    """Gira el JPEG con jpegtran sin recodificar. Devuelve False si no es posible."""
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as entrada:
+        shutil.copyfileobj(origen, entrada, 1024 * 1024)
+    try:
+        # -perfect falla si las dimensiones no son múltiplo del bloque; entonces recodificamos.
+        # -copy none elimina el EXIF, y con él la orientación ya aplicada (y el GPS).
+        resultado = subprocess.run(
+            [JPEGTRAN, "-perfect", "-copy", "none", *operacion, "-outfile", destino, entrada.name],
+            capture_output=True,
+        )
+        return resultado.returncode == 0
+    finally:
+        os.remove(entrada.name)
+
+
+def _copiar_sin_metadatos(origen, destino: str, formato: str) -> bool:
+    """
+    Copia un JPEG o un PNG recorriendo sus segmentos y saltándose los de
+    metadatos; los datos de la imagen se copian tal cual. Devuelve False si
+    el formato no se sabe limpiar así o el archivo no tiene la forma esperada.
+    """
+    copiar = {"JPEG": _copiar_jpeg, "PNG": _copiar_png}.get(formato)
+    if copiar is None:
+        return False
+    temporal = destino + ".tmp"
+    try:
+        with open(temporal, "wb") as f:
+            copiar(origen, f)
+    except (ValueError, struct.error):
+        os.remove(temporal)
+        origen.seek(0)
+        return False
+    os.replace(temporal, destino)
+    return True
+
+
+def _copiar_jpeg(origen, destino):
+    if origen.read(2) != b"\xff\xd8":
+        raise ValueError("No es un JPEG")
+    destino.write(b"\xff\xd8")
+    while True:
+        byte = origen.read(1)
+        if byte != b"\xff":
+            raise ValueError("Marcador JPEG inválido")
+        marcador = origen.read(1)
+        while marcador == b"\xff":  # Relleno entre marcadores
+            marcador = origen.read(1)
+        if not marcador:
+            raise ValueError("JPEG truncado")
+        codigo = marcador[0]
+        if codigo == 0x01 or 0xD0 <= codigo <= 0xD7:
+            destino.write(b"\xff" + marcador)  # Sin longitud
+            continue
+        if codigo == 0xDA:
+            # Inicio de los datos comprimidos: el resto del archivo va entero
+            destino.write(b"\xff" + marcador)
+            shutil.copyfileobj(origen, destino, 1024 * 1024)
+            return
+        longitud = origen.read(2)
+        datos = origen.read(struct.unpack(">H", longitud)[0] - 2)
+        if codigo not in SEGMENTOS_JPEG_FUERA:
+            destino.write(b"\xff" + marcador + longitud + datos)
+
+
+def _copiar_png(origen, destino):
+    firma = origen.read(8)
+    if firma != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("No es un PNG")
+    destino.write(firma)
+    while True:
+        cabecera = origen.read(8)
+        longitud, tipo = struct.unpack(">I4s", cabecera)
+        datos = origen.read(longitud + 4)  # Datos y CRC
+        if len(datos) != longitud + 4:
+            raise ValueError("PNG truncado")
+        if tipo not in CHUNKS_PNG_FUERA:
+            destino.write(cabecera + datos)
+        if tipo == b"IEND":
+            return
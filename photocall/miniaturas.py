@@ -0,0 +1,172 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# Tamaños derivados (lado mayor en píxeles) 🖼️
+VARIANTES = {"mini": 400, "pantalla": 1080}
+
+# JPEG y no WebP: st.image sirve tal cual los JPEG que caben en la página,
+# pero recodifica cualquier otro formato en cada rerun
+FORMATO = "JPEG"
+EXTENSION = ".jpg"
+CALIDAD = 80
+
+
+def codificar(imagen) -> bytes:
+    """Codifica una imagen ya reducida en el formato de las variantes."""
+    buffer = io.BytesIO()
+    imagen.save(buffer, FORMATO, quality=CALIDAD, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class CacheImagenes:
+    """Caché de miniaturas en disco y en memoria, ambas con límite de tamaño (LRU)."""
+
+    def __init__(self, directorio: str, max_bytes_disco=500 * 1024 * 1024, max_bytes_memoria=64 * 1024 * 1024):
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self.max_bytes_memoria = max_bytes_memoria
+        self._memoria = OrderedDict()  # (hash, variante) -> bytes
+        self._bytes_memoria = 0
+        self._hashes = {}  # ruta -> (mtime_ns, tamaño, hash)
+        self._lock = threading.Lock()
+        self._precarga = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precarga")
+        os.makedirs(directorio, exist_ok=True)
+
+    # --- Claves ---
+
+    def clave(self, ruta: str) -> str:
+        """Hash del contenido de la foto, recalculado solo si cambia su mtime o tamaño."""
+        stat = os.stat(ruta)
+        firma = (stat.st_mtime_ns, stat.st_size)
+        memo = self._hashes.get(ruta)
+        if memo and memo[:2] == firma:
+            return memo[2]
+        sha = hashlib.sha1()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(bloque)
+        # El mtime entra en la clave para no servir miniaturas de una foto reemplazada
+        digest = f"{sha.hexdigest()[:20]}_{stat.st_mtime_ns}"
+        self._hashes[ruta] = (*firma, digest)
+        return digest
+
+    def _ruta_cache(self, digest: str, variante: str) -> str:
+        return os.path.join(self.directorio, f"{digest}_{variante}{EXTENSION}")
+
+    # --- Generación ---
+
+    def generar(self, ruta: str) -> dict:
+        """Decodifica la foto una sola vez y guarda todas las variantes."""
+        digest = self.clave(ruta)
+        resultado = {}
+        with Image.open(ruta) as imagen:
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode not in ("RGB", "L"):
+                imagen = imagen.convert("RGB")
+            # De mayor a menor, reutilizando la reducción anterior
+            for variante, lado in sorted(VARIANTES.items(), key=lambda v: -v[1]):
+                imagen.thumbnail((lado, lado))
+                datos = codificar(imagen)
+                self._escribir_disco(digest, variante, datos)
+                self._guardar_memoria((digest, variante), datos)
+                resultado[variante] = datos
+        self._podar_disco()
+        return resultado
+
+    def obtener(self, ruta: str, variante: str) -> bytes:
+        """Bytes de la variante pedida: memoria → disco → generación."""
+        digest = self.clave(ruta)
+        datos = self._leer_memoria((digest, variante))
+        if datos is not None:
+            return datos
+        ruta_cache = self._ruta_cache(digest, variante)
+        try:
+            with open(ruta_cache, "rb") as f:
+                datos = f.read()
+            os.utime(ruta_cache)  # Marca de uso para el LRU de disco
+        except FileNotFoundError:
+            return self.generar(ruta)[variante]
+        self._guardar_memoria((digest, variante), datos)
+        return datos
+
+    def precargar(self, rutas: list, variante: str):
+        """Sube a memoria en segundo plano las variantes que se van a pedir pronto."""
+        for ruta in rutas:
+            self._precarga.submit(self._precargar_una, ruta, variante)
+
+    def _precargar_una(self, ruta: str, variante: str):
+        try:
+            self.obtener(ruta, variante)
+        except (OSError, ValueError):
+            pass  # Foto borrada o ilegible: ya se verá al pedirla de verdad
+
+    def original(self, ruta: str) -> bytes:
+        """La foto original, sin pasar por la caché (solo se pide bajo demanda)."""
+        with open(ruta, "rb") as f:
+            return f.read()
+
+    def descartar(self, ruta: str):
+        """Elimina las variantes de una foto (por ejemplo, al borrarla)."""
+        if not os.path.exists(ruta):
+            self._hashes.pop(ruta, None)
+            return
+        digest = self.clave(ruta)
+        del self._hashes[ruta]
+        for variante in VARIANTES:
+            with self._lock:
+                datos = self._memoria.pop((digest, variante), None)
+                if datos is not None:
+                    self._bytes_memoria -= len(datos)
+            try:
+                os.remove(self._ruta_cache(digest, variante))
+            except FileNotFoundError:
+                pass
+
+    # --- LRU en memoria ---
+
+    def _leer_memoria(self, clave):
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+            return datos
+
+    def _guardar_memoria(self, clave, datos: bytes):
+        with self._lock:
+            anterior = self._memoria.pop(clave, None)
+            if anterior is not None:
+                self._bytes_memoria -= len(anterior)
+            self._memoria[clave] = datos
+            self._bytes_memoria += len(datos)
+            while self._bytes_memoria > self.max_bytes_memoria and len(self._memoria) > 1:
+                _, expulsado = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(expulsado)
+
+    # --- LRU en disco ---
+
+    def _escribir_disco(self, digest: str, variante: str, datos: bytes):
+        destino = self._ruta_cache(digest, variante)
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, destino)
+
+    def _podar_disco(self):
+        """Borra las variantes menos usadas recientemente hasta volver al límite."""
+        with os.scandir(self.directorio) as it:
+            entradas = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in it if e.is_file()]
+        total = sum(tamaño for _, tamaño, _ in entradas)
+        for _, tamaño, ruta in sorted(entradas):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamaño
@@ -1,29 +1,14 @@
 import streamlit as st
 import os
-import json
-from PIL import Image
-from PIL import ExifTags
-import zipfile
-
-def corregir_orientacion(imagen):
-    try:
-        for orientation in ExifTags.TAGS.keys():
-            if ExifTags.TAGS[orientation] == 'Orientation':
-                break
-        exif = dict(imagen._getexif().items())
-
-        if exif[orientation] == 3:
-            imagen = imagen.rotate(180, expand=True)
-        elif exif[orientation] == 6:
-            imagen = imagen.rotate(270, expand=True)
-        elif exif[orientation] == 8:
-            imagen = imagen.rotate(90, expand=True)
-
-    except (AttributeError, KeyError, IndexError):
-        # La imagen no tiene información EXIF
-        pass
-
-    return imagen
+from functools import partial
+from miniaturas import CacheImagenes
+from ingesta import procesar_foto
+from cola import ColaSubidas, PENDIENTE, LISTA, FALLIDA
+from almacen import abrir
+from almacen_fotos import AlmacenFotos
+from exportar import ExportacionZip
+from huellas import IndiceHuellas, calcular_huella
+
 # Añadir un sistema de registro simple
 usuarios_registrados = {}
 def registrar_usuario(user_id):
@@ -42,20 +27,149 @@ st.set_page_config(
 # Carpeta donde se guardarán las fotos 📁
 IMG_DIR = "./fotos"
 
-# Archivo para guardar la info de las fotos 📄
+# La info de las fotos y los votos va en la base de datos compartida por todas las apps (`almacen`) 📄
+# Archivo antiguo: se importa una vez
 IMAGE_INFO_FILE = "./info_fotos.json"
 
-# Cargamos la info de las fotos desde el archivo 🔄
-if os.path.exists(IMAGE_INFO_FILE):
-    with open(IMAGE_INFO_FILE, 'r') as f:
-        info_fotos = json.load(f)
-else:
-    info_fotos = {}
+# Ajustes de las fotos subidas 🗜️
+CALIDAD_FOTOS = 85  # Calidad JPEG/WebP cuando hay que recodificar
+MAX_LADO_FOTOS = 2560  # Lado mayor máximo en píxeles
+FORMATO_FOTOS = None  # None conserva el códec original; o "JPEG" / "WEBP"
+
+# Procesado en segundo plano ⏳
+TRABAJADORES_SUBIDAS = os.cpu_count()  # Hilos que procesan fotos a la vez
+MAX_SUBIDAS_EN_COLA = 32  # Por encima de esto se pide al usuario que reintente
+
+def ruta_foto(foto):
+    return os.path.join(IMG_DIR, foto['archivo'])
+
+# Conexión a la base de datos compartida por todas las sesiones 🔄
+@st.cache_resource
+def obtener_almacen():
+    return AlmacenFotos(abrir(), ruta_json_antiguo=IMAGE_INFO_FILE)
+
+almacen = obtener_almacen()
 
 # Creamos la carpeta si no existe 📂
 if not os.path.exists(IMG_DIR):
     os.makedirs(IMG_DIR)
 
+# Caché de miniaturas compartida por todas las sesiones 🖼️
+@st.cache_resource
+def obtener_cache_imagenes():
+    return CacheImagenes(os.path.join(IMG_DIR, ".miniaturas"))
+
+cache_imagenes = obtener_cache_imagenes()
+
+def procesar_subida(origen, nombre_foto):
+    informe = procesar_foto(
+        origen,
+        os.path.join(IMG_DIR, nombre_foto),
+        calidad=CALIDAD_FOTOS,
+        max_lado=MAX_LADO_FOTOS,
+        formato_salida=FORMATO_FOTOS,
+    )
+    # Generamos las miniaturas ahora para que la galería no tenga que hacerlo 🖼️
+    cache_imagenes.generar(os.path.join(IMG_DIR, informe['archivo']))
+    return informe
+
+def subida_terminada(nombre_foto, informe, error):
+    if error is None:
+        almacen.actualizar_foto(nombre_foto, archivo=informe['archivo'], estado=LISTA)
+    else:
+        almacen.actualizar_foto(nombre_foto, estado=FALLIDA)
+
+@st.cache_resource
+def obtener_cola_subidas():
+    return ColaSubidas(
+        os.path.join(IMG_DIR, ".staging"),
+        procesar_subida,
+        subida_terminada,
+        trabajadores=TRABAJADORES_SUBIDAS,
+        max_pendientes=MAX_SUBIDAS_EN_COLA,
+    )
+
+cola_subidas = obtener_cola_subidas()
+
+# Índice de huellas perceptuales para detectar fotos repetidas 🔍
+@st.cache_resource
+def obtener_indice_huellas():
+    # Las fotos subidas antes de tener huellas se calculan una sola vez al arrancar
+    for info in almacen.fotos_sin_huella():
+        try:
+            almacen.guardar_huella(info['nombre'], *calcular_huella(ruta_foto(info)))
+        except OSError:
+            pass
+    return IndiceHuellas(almacen.huellas())
+
+indice_huellas = obtener_indice_huellas()
+
+# Galería por páginas 📄
+FOTOS_POR_PAGINA = 12
+FOTOS_POR_FILA = 3  # La cuadrícula usa la variante 'mini'; 'pantalla' solo al ampliar una foto
+VISTAS_GALERIA = {  # vista -> (orden, solo fotos ya procesadas)
+    'Top ❤️': ('likes', True),
+    'Nuevas 🆕': ('nuevas', True),
+    'Mis fotos 📷': ('nuevas', False),
+}
+
+def cambiar_pagina(pagina):
+    st.session_state.pagina_galeria = pagina
+
+def volver_a_primera_pagina():
+    st.session_state.pagina_galeria = 0
+
+def alternar_ampliada(nombre_foto):
+    ampliadas = st.session_state.setdefault('fotos_ampliadas', set())
+    ampliadas.symmetric_difference_update({nombre_foto})
+
+# Cada foto es un fragmento: dar like solo vuelve a ejecutar su tarjeta ❤️
+@st.fragment
+def tarjeta_foto(info, ya_votada):
+    nombre_foto = info['nombre']
+    descripcion = nombre_foto  # Aquí puedes reemplazar 'nombre_foto' con la descripción de la foto
+    if info['estado'] == PENDIENTE:
+        st.info(f'⏳ @{info["uploader"]} ➡️ {descripcion}: procesando la foto...')
+        return
+    if info['estado'] == FALLIDA:
+        st.error(f'⚠️ @{info["uploader"]} ➡️ {descripcion}: no se pudo procesar la foto.')
+        return
+    ruta = ruta_foto(info)
+    # En la cuadrícula va la miniatura; la versión de pantalla solo si se amplía y el original solo si se pide 📥
+    ampliada = nombre_foto in st.session_state.get('fotos_ampliadas', set())
+    st.image(cache_imagenes.obtener(ruta, 'pantalla' if ampliada else 'mini'), width='stretch')
+    st.button('🔍 Reducir' if ampliada else '🔍 Ampliar', key=f'ampliar_{nombre_foto}',
+              on_click=alternar_ampliada, args=(nombre_foto,))
+    pie = st.empty()
+    likes = info['likes']
+    st.download_button(
+        '⬇️ Original',
+        data=partial(cache_imagenes.original, ruta),
+        file_name=os.path.basename(ruta),
+        key=f'original_{nombre_foto}',
+        on_click='ignore',
+    )
+    if user_id:
+        if st.button('❤️', key=nombre_foto, help='Vota por esta foto'):
+            # Un voto por persona y foto: los repetidos se ignoran 👍
+            if almacen.votar(nombre_foto, user_id):
+                st.success('¡Has votado por esta foto! ❤️')
+            else:
+                st.write('Ya has votado por esta foto! ❤️')
+            likes = almacen.foto(nombre_foto)['likes']
+        elif ya_votada:
+            st.write('Ya has votado por esta foto! ❤️')
+    pie.write(f'@{info["uploader"]} ➡️ {descripcion} ({likes}❤️)')
+
+# Zips de descarga, actualizados de forma incremental y en volúmenes de menos de 200 MB 📦
+# Con server.enableStaticServing (activado en .streamlit/config.toml) se sirven desde ./static por bloques
+@st.cache_resource
+def obtener_exportacion():
+    return ExportacionZip(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+        os.path.join(IMG_DIR, ".fotos_zip.json"),
+    )
+
 st.title('📸 Sube y vota las mejores fotos!')
 
 # Usar columnas para organizar mejor el contenido
@@ -78,45 +192,78 @@ with col2:
 
 if opcion == "Subir foto 📤":
     # Comprobamos si ya has subido una foto 🔄
-    if user_id in [info['uploader'] for info in info_fotos.values()]:
+    mis_fotos = almacen.fotos_de(user_id)
+    if mis_fotos:
         st.write('Ya has subido la foto. 📸')
+        subida = cola_subidas.estado(mis_fotos[0]['nombre'])
+        if subida and subida['estado'] == PENDIENTE:
+            st.info('⏳ Tu foto se está procesando, aparecerá en la galería en unos segundos.')
+        elif subida and subida['estado'] == FALLIDA:
+            st.error(f"No se pudo procesar la foto: {subida['error']}")
+        elif subida and subida['informe']:
+            informe = subida['informe']
+            tiempos = ', '.join(f'{etapa} {ms} ms' for etapa, ms in informe['tiempos_ms'].items())
+            st.caption(f"{informe['bytes_entrada'] // 1024} KB → {informe['bytes_salida'] // 1024} KB "
+                       f"({informe['metodo']}: {tiempos})")
     else:
         # Sube tu foto 📥
         foto_subida = st.file_uploader("Elige una foto", type=['png', 'jpg', 'jpeg'])
         nombre_foto = st.text_input('Añade la descripcion:')
 
         if foto_subida is not None and nombre_foto and user_id:
-            foto = Image.open(foto_subida)
-            foto = corregir_orientacion(foto)
-            foto.save(os.path.join(IMG_DIR, nombre_foto + '.png'))
+            try:
+                # Huella perceptual: se calcula sobre una versión diminuta, es rápido 🔍
+                phash, dhash = calcular_huella(foto_subida)
+            except OSError:
+                st.error('No se ha podido leer la imagen. ¿Es una foto válida?')
+                st.stop()
+            # Guardamos la info de la foto 📝 (falla si la descripción ya existe)
+            if not almacen.añadir_foto(nombre_foto, user_id, estado=PENDIENTE):
+                st.warning('Ya hay una foto con esa descripción, elige otra.')
+            else:
+                veredicto, parecida = indice_huellas.comprobar_y_añadir(nombre_foto, phash, dhash)
+                if veredicto == 'duplicada':
+                    almacen.borrar_foto(nombre_foto)
+                    st.warning(f'Esta foto ya está en el concurso ("{parecida}"). ¡Sube otra distinta! 📸')
+                # La foto se guarda en staging y se procesa en segundo plano ⏳
+                elif cola_subidas.encolar(nombre_foto, foto_subida):
+                    almacen.guardar_huella(nombre_foto, phash, dhash, similar_a=parecida)
+                    st.success('¡Foto recibida! 🎉 Aparecerá en la galería en cuanto esté procesada.')
+                else:
+                    indice_huellas.quitar(nombre_foto)
+                    almacen.borrar_foto(nombre_foto)
+                    st.warning('Hay muchas fotos procesándose ahora mismo. Inténtalo de nuevo en unos segundos. ⏳')
 
-            # Guardamos la info de la foto 📝
-            info_fotos[nombre_foto] = {'uploader': user_id, 'likes': []}
-            st.success('¡Foto guardada con éxito! 🎉')
+elif opcion == "Ver fotos 📸":
+    vista = st.radio('Ver', list(VISTAS_GALERIA), horizontal=True, key='vista_galeria', on_change=volver_a_primera_pagina)
+    orden, solo_listas = VISTAS_GALERIA[vista]
+    uploader = user_id if vista == 'Mis fotos 📷' else None
+    if vista == 'Mis fotos 📷' and not user_id:
+        st.info('Escribe tu nombre de Instagram arriba para ver tus fotos.')
+    else:
+        # Solo se consulta y se dibuja la página actual, haya las fotos que haya 📄
+        filtro = {'solo_listas': solo_listas, 'uploader': uploader}
+        paginas = max(1, -(-almacen.contar(**filtro) // FOTOS_POR_PAGINA))
+        pagina = min(st.session_state.get('pagina_galeria', 0), paginas - 1)
+        fotos = almacen.fotos(orden, FOTOS_POR_PAGINA, pagina * FOTOS_POR_PAGINA, **filtro)
+        # Dejamos en memoria la página siguiente mientras se ve esta ⏩
+        if pagina + 1 < paginas:
+            siguientes = almacen.fotos(orden, FOTOS_POR_PAGINA, (pagina + 1) * FOTOS_POR_PAGINA, **filtro)
+            cache_imagenes.precargar([ruta_foto(info) for info in siguientes if info['estado'] == LISTA], 'mini')
 
-            # Guardamos la info de las fotos en el archivo 📋
-            with open(IMAGE_INFO_FILE, 'w') as f:
-                json.dump(info_fotos, f)
+        mis_votos = almacen.votos_de(user_id) if user_id else set()
+        # Mostramos las fotos 📸
+        for i in range(0, len(fotos), FOTOS_POR_FILA):
+            for columna, info in zip(st.columns(FOTOS_POR_FILA), fotos[i:i + FOTOS_POR_FILA]):
+                with columna:
+                    tarjeta_foto(info, info['nombre'] in mis_votos)
 
-elif opcion == "Ver fotos 📸":
-    # Ordenamos las fotos por likes ❤️
-    fotos_ordenadas = sorted(info_fotos.items(), key=lambda item: len(item[1]['likes']), reverse=True)
-    # Mostramos las fotos 📸
-    for nombre_foto, info in fotos_ordenadas:
-        foto = Image.open(os.path.join(IMG_DIR, nombre_foto + '.png'))
-        likes = len(info['likes'])
-        descripcion = nombre_foto  # Aquí puedes reemplazar 'nombre_foto' con la descripción de la foto
-        st.image(foto, use_column_width=True)
-        st.write(f'@{info["uploader"]} ➡️ {descripcion} ({likes}❤️)')
-        if user_id:
-            if st.button('❤️', key=nombre_foto, help='Vota por esta foto'):
-                info['likes'].append(user_id)
-                st.success('¡Has votado por esta foto! ❤️')
-                # Actualizamos el archivo de info de las fotos cada vez que se da like 👍
-                with open(IMAGE_INFO_FILE, 'w') as f:
-                    json.dump(info_fotos, f)
-            elif user_id in info['likes']:
-                st.write('Ya has votado por esta foto! ❤️')
+        anterior, indicador, siguiente = st.columns([1, 2, 1])
+        anterior.button('⬅️', key='pagina_anterior', disabled=pagina == 0,
+                        on_click=cambiar_pagina, args=(pagina - 1,))
+        indicador.markdown(f"<p style='text-align: center;'>Página {pagina + 1} de {paginas}</p>", unsafe_allow_html=True)
+        siguiente.button('➡️', key='pagina_siguiente', disabled=pagina + 1 >= paginas,
+                         on_click=cambiar_pagina, args=(pagina + 1,))
 
 elif opcion == "📁":
     # Añade una opción para introducir una contraseña
@@ -124,37 +271,55 @@ elif opcion == "📁":
 
     # Si la contraseña es correcta, muestra el botón de descarga y la opción de borrar fotos
     if password == "Admin1":
-        # Crea un archivo zip
-        with zipfile.ZipFile('fotos.zip', 'w') as zip_f:
-            for nombre_foto in info_fotos.keys():
-                # Añade cada foto al archivo zip
-                zip_f.write(os.path.join(IMG_DIR, nombre_foto + '.png'), arcname=nombre_foto + '.png')
-
-        # Lee el contenido del archivo zip
-        with open('fotos.zip', 'rb') as f:
-            bytes = f.read()
-
-        # Proporciona un botón de descarga para el archivo zip
-        st.download_button(
-            label="Descargar fotos.zip",
-            data=bytes,
-            file_name='fotos.zip',
-            mime='application/zip',
-        )
+        # Pone al día el zip: solo se añaden las fotos nuevas 📦
+        exportacion = obtener_exportacion()
+        exportacion.actualizar({
+            os.path.basename(ruta_foto(info)): ruta_foto(info)
+            for info in almacen.fotos() if info['estado'] == LISTA
+        })
+        volumenes = exportacion.volumenes()
+        megas = exportacion.tamaño() / (1024 * 1024)
+        st.write(f"{len(volumenes)} archivos zip, {megas:.1f} MB en total")
+
+        for volumen in volumenes:
+            ruta_zip = exportacion.ruta_volumen(volumen)
+            nombre_zip = f"fotos-{volumen:03d}.zip"
+            megas_volumen = os.path.getsize(ruta_zip) / (1024 * 1024)
+            if st.get_option('server.enableStaticServing'):
+                # El servidor lo envía desde disco por bloques, sin cargarlo en memoria (ver .streamlit/config.toml)
+                st.markdown(f"[Descargar {nombre_zip}](app/static/{os.path.basename(ruta_zip)}) ({megas_volumen:.1f} MB)")
+            else:
+                # Sin servidor estático: el volumen (de menos de 200 MB) se lee solo al pulsar
+                st.download_button(
+                    label=f"Descargar {nombre_zip} ({megas_volumen:.1f} MB)",
+                    data=partial(exportacion.leer, volumen),
+                    file_name=nombre_zip,
+                    mime='application/zip',
+                    on_click='ignore',
+                    key=f'zip_{volumen}',
+                )
+
+        # Fotos que se parecen mucho a otra ya subida, para revisarlas 🔍
+        parecidas = almacen.parecidas()
+        if parecidas:
+            st.subheader("Fotos parecidas")
+            for foto, similar_a in parecidas:
+                st.write(f'🔍 "{foto}" se parece mucho a "{similar_a}"')
 
         # Opción para borrar fotos
         st.subheader("Borrar fotos")
-        foto_a_borrar = st.selectbox("Selecciona la foto a borrar", list(info_fotos.keys()))
+        foto_a_borrar = st.selectbox("Selecciona la foto a borrar", [info['nombre'] for info in almacen.fotos()])
 
         if st.button('Borrar foto', key='borrar_foto'):
             # Borrar la foto del sistema de archivos
             try:
-                os.remove(os.path.join(IMG_DIR, foto_a_borrar + '.png'))
-                # Borrar la información de la foto
-                del info_fotos[foto_a_borrar]
-                # Actualizar el archivo de info de las fotos
-                with open(IMAGE_INFO_FILE, 'w') as f:
-                    json.dump(info_fotos, f)
+                info = almacen.foto(foto_a_borrar)
+                if info and info['archivo'] and os.path.exists(ruta_foto(info)):
+                    cache_imagenes.descartar(ruta_foto(info))
+                    os.remove(ruta_foto(info))
+                # Borrar la información de la foto (y sus votos y su huella)
+                indice_huellas.quitar(foto_a_borrar)
+                almacen.borrar_foto(foto_a_borrar)
                 st.success('¡Foto borrada con éxito! 🗑️')
             except Exception as e:
                 st.error(f'Error al borrar la foto: {e}')
\ No newline at end of file